@@ -0,0 +1,8 @@
+"""Замеры производительности алгоритмов заданий
+
+Запуск из корня проекта:
+    python -m benchmarks.run --max-size 100000 --output results.json
+    python -m benchmarks.run --baseline results.json   # сравнение с сохранёнными замерами
+
+Наборы данных и измеряемые функции - benchmarks.cases, замеры и сравнение - benchmarks.run
+"""
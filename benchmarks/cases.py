@@ -0,0 +1,99 @@
+"""Измеряемые функции и распределения входных данных
+
+Каждый случай (Case) - функция задания и набор распределений, на которых её
+имеет смысл измерять. Данные генерируются с фиксированным seed, поэтому замеры
+разных запусков сравнимы. Массивы создаются как array('q') - в таком виде их
+передают функциям разбор ввода и загрузка файлов
+"""
+
+import random
+from array import array
+from tasks.optional import numpy
+from tasks.task1 import solve
+from tasks.task5 import count_subarrays_with_sum
+from tasks.task8 import _reverse_large, count_common_with_reverse, reverse_number, reverse_numbers
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+SEED = 2024
+
+# распределение -> диапазон значений [low, high]; "sorted" и "constant" строятся отдельно
+RANGES = {
+    "small": (1, 20),  # как «Сгенерировать» в задании 1
+    "digits3": (10, 999),  # как «Сгенерировать» в задании 8
+    "signed": (-10, 10),  # много подмассивов с одинаковой суммой (задание 5)
+    "wide": (0, 10 ** 12),  # широкий диапазон: сортировка подсчётом и таблицы неприменимы
+}
+
+
+def generate(distribution, n, seed=SEED):
+    """Массив из n чисел заданного распределения
+
+    Args:
+        distribution (str): "small", "digits3", "signed", "wide", "sorted" или "constant"
+        n (int): Длина
+        seed (int): Начальное значение генератора
+
+    Returns:
+        array: Массив array('q')
+    """
+    if distribution == "sorted":
+        return array("q", range(n))
+    if distribution == "constant":
+        return array("q", [7]) * n
+    low, high = RANGES[distribution]
+    np = numpy()
+    if np is not None:
+        values = np.random.default_rng(seed).integers(low, high + 1, size=n, dtype=np.int64)
+        return array("q", values.tobytes())
+    rng = random.Random(seed)
+    return array("q", (rng.randint(low, high) for _ in range(n)))
+
+
+class Case:
+    """Измеряемая функция
+
+    Attributes:
+        name (str): Имя в отчёте
+        distributions (tuple[str]): Распределения входных данных
+        prepare (callable): (распределение, n) -> кортеж аргументов func
+        func (callable): Измеряемая функция
+        setup (callable | None): Вызывается перед каждым вызовом func (сброс кэшей), вне замера
+    """
+
+    __slots__ = ("name", "distributions", "prepare", "func", "setup")
+
+    def __init__(self, name, distributions, prepare, func, setup=None):
+        self.name = name
+        self.distributions = distributions
+        self.prepare = prepare
+        self.func = func
+        self.setup = setup
+
+
+def _two_arrays(distribution, n):
+    return generate(distribution, n, SEED), generate(distribution, n, SEED + 1)
+
+
+def _array_and_target(distribution, n):
+    arr = generate(distribution, n)
+    # цель - сумма первых элементов: хотя бы один подходящий подмассив есть всегда
+    return arr, sum(arr[:3])
+
+
+def _one_array(distribution, n):
+    return (generate(distribution, n),)
+
+
+def _reverse_each(values):
+    # поштучный вызов, как при проверке отдельных чисел
+    for x in values:
+        reverse_number(x)
+
+
+CASES = (
+    Case("solve", ("small", "wide", "sorted"), _two_arrays, solve),
+    Case("count_subarrays_with_sum", ("signed", "small", "constant"), _array_and_target, count_subarrays_with_sum),
+    Case("count_common_with_reverse", ("digits3", "wide", "sorted"), _two_arrays, count_common_with_reverse),
+    Case("reverse_number", ("digits3", "wide"), _one_array, _reverse_each, setup=_reverse_large.cache_clear),
+    Case("reverse_numbers", ("digits3", "wide"), _one_array, reverse_numbers, setup=_reverse_large.cache_clear),
+)
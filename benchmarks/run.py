@@ -0,0 +1,231 @@
+"""Запуск замеров, запись в JSON и сравнение с базовыми замерами
+
+Для каждого случая, распределения и размера:
+- время - time.perf_counter, сборщик мусора отключён; вызов повторяется в замере
+  столько раз, чтобы замер длился не меньше MIN_SAMPLE_TIME, а замеры - пока не
+  наберётся repeats и не истечёт budget; в отчёт идут минимум и медиана на один вызов
+  (сравнивается минимум: он меньше всего зависит от посторонней нагрузки).
+  У случая с setup (сброс кэшей) setup выполняется перед каждым вызовом и
+  в замер не входит - иначе все вызовы после первого шли бы по тёплому кэшу
+- пик памяти - отдельный вызов под tracemalloc (учитываются и буферы NumPy)
+
+Сравнение с базой (--baseline): минимальное время или пик памяти, выросшие больше
+чем на tolerance (и больше шумового порога), считаются регрессией - код
+возврата 1
+
+Пример:
+    python -m benchmarks.run --max-size 100000 --output base.json
+    python -m benchmarks.run --max-size 100000 --baseline base.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from benchmarks.cases import CASES, SIZES
+from tasks.optional import numpy
+
+# замер короче этого времени недостоверен: вызов повторяется внутри замера, сек
+MIN_SAMPLE_TIME = 0.005
+# больше стольких замеров одной точки не делается
+MAX_REPEATS = 50
+# различия меньше этих порогов считаются шумом
+TIME_NOISE = 20e-6  # сек на вызов
+MEMORY_NOISE = 64 * 1024  # байт
+
+
+def measure_time(case, args, repeats=3, budget=1.0):
+    """Время одного вызова case.func(*args)
+
+    Args:
+        case (Case): Измеряемый случай
+        args (tuple): Аргументы
+        repeats (int): Минимальное количество замеров
+        budget (float): Сколько секунд можно потратить на дополнительные замеры
+
+    Returns:
+        dict: number (вызовов в замере), repeats, min, median (сек на вызов)
+    """
+    number = 1
+    while True:
+        elapsed = _sample(case, args, number)
+        if elapsed >= MIN_SAMPLE_TIME or number >= 1_000_000:
+            break
+        number *= 10
+    samples = [elapsed / number]
+    started = time.perf_counter()
+    while len(samples) < MAX_REPEATS and (len(samples) < repeats or time.perf_counter() - started < budget):
+        samples.append(_sample(case, args, number) / number)
+    return {"number": number, "repeats": len(samples), "min": min(samples), "median": statistics.median(samples)}
+
+
+def _sample(case, args, number):
+    func, setup = case.func, case.setup
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if setup is None:
+            start = time.perf_counter()
+            for _ in range(number):
+                func(*args)
+            return time.perf_counter() - start
+        # каждый вызов - с чистого состояния; время setup не учитывается
+        elapsed = 0.0
+        for _ in range(number):
+            setup()
+            start = time.perf_counter()
+            func(*args)
+            elapsed += time.perf_counter() - start
+        return elapsed
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure_memory(case, args):
+    # пик памяти одного вызова, байт (входные данные созданы до начала отслеживания)
+    if case.setup is not None:
+        case.setup()
+    tracemalloc.start()
+    try:
+        case.func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(cases, sizes, repeats=3, budget=1.0, log=print):
+    """Выполняет замеры
+
+    Returns:
+        list[dict]: Результаты: case, distribution, size + поля measure_time и peak_bytes
+    """
+    results = []
+    for case in cases:
+        for distribution in case.distributions:
+            for size in sizes:
+                args = case.prepare(distribution, size)
+                result = {"case": case.name, "distribution": distribution, "size": size}
+                result.update(measure_time(case, args, repeats, budget))
+                result["peak_bytes"] = measure_memory(case, args)
+                results.append(result)
+                log(_format_row(result))
+                del args
+    return results
+
+
+def environment():
+    # сведения об окружении: замеры сравнимы только на одной машине и с теми же библиотеками
+    np = numpy()
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "numpy": np.__version__ if np is not None else None,
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Сравнивает результаты с базовыми
+
+    Args:
+        results (list[dict]): Текущие замеры
+        baseline (list[dict]): Базовые замеры
+        tolerance (float): Допустимый относительный рост (0.2 - на 20%)
+
+    Returns:
+        list[tuple[dict, dict, list[str]]]: (замер, базовый замер, список регрессий) для общих точек
+    """
+    base = {(r["case"], r["distribution"], r["size"]): r for r in baseline}
+    report = []
+    for result in results:
+        old = base.get((result["case"], result["distribution"], result["size"]))
+        if old is None:
+            continue
+        problems = []
+        if result["min"] > old["min"] * (1 + tolerance) and result["min"] - old["min"] > TIME_NOISE:
+            problems.append(f"время x{result['min'] / old['min']:.2f}")
+        if (result["peak_bytes"] > old["peak_bytes"] * (1 + tolerance)
+                and result["peak_bytes"] - old["peak_bytes"] > MEMORY_NOISE):
+            problems.append(f"память x{result['peak_bytes'] / max(old['peak_bytes'], 1):.2f}")
+        report.append((result, old, problems))
+    return report
+
+
+def _format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} мкс"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} мс"
+    return f"{seconds:.2f} с"
+
+
+def _format_bytes(size):
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} КБ"
+    return f"{size / (1024 * 1024):.1f} МБ"
+
+
+def _format_row(result, suffix=""):
+    return (f"{result['case']:<26} {result['distribution']:<9} {result['size']:>10} "
+            f"{_format_time(result['min']):>11} {_format_time(result['median']):>11} "
+            f"{_format_bytes(result['peak_bytes']):>10}{suffix}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры алгоритмов заданий 1, 5 и 8")
+    parser.add_argument("--cases", help="случаи через запятую (по умолчанию - все)")
+    parser.add_argument("--sizes", help="размеры через запятую (по умолчанию 10 ... 10^7)")
+    parser.add_argument("--max-size", type=int, help="не измерять размеры больше этого")
+    parser.add_argument("--repeats", type=int, default=3, help="минимальное количество замеров точки")
+    parser.add_argument("--budget", type=float, default=1.0, help="время на дополнительные замеры точки, сек")
+    parser.add_argument("--output", help="записать результаты в JSON-файл")
+    parser.add_argument("--baseline", help="сравнить с результатами из JSON-файла")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост времени и памяти (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    cases = CASES
+    if args.cases:
+        names = set(args.cases.split(","))
+        unknown = names - {case.name for case in CASES}
+        if unknown:
+            parser.error(f"неизвестные случаи: {', '.join(sorted(unknown))}")
+        cases = [case for case in CASES if case.name in names]
+    sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else list(SIZES)
+    if args.max_size:
+        sizes = [size for size in sizes if size <= args.max_size]
+
+    print(f"{'случай':<26} {'данные':<9} {'размер':>10} {'минимум':>11} {'медиана':>11} {'память':>10}")
+    results = run(cases, sizes, args.repeats, args.budget)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты записаны в {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    current_env, base_env = environment(), baseline.get("environment", {})
+    for key in ("python", "machine", "numpy"):
+        if current_env[key] != base_env.get(key):
+            print(f"Внимание: {key} отличается от базы ({base_env.get(key)} -> {current_env[key]})")
+    report = compare(results, baseline["results"], args.tolerance)
+    regressions = [(result, old, problems) for result, old, problems in report if problems]
+    print(f"\nСравнение с {args.baseline}: точек {len(report)}, регрессий {len(regressions)}")
+    for result, old, problems in regressions:
+        print(_format_row(result, f"  было {_format_time(old['min'])}, {_format_bytes(old['peak_bytes'])}: "
+                                  f"{', '.join(problems)}"))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
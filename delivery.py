@@ -0,0 +1,121 @@
+"""Доставка ответов с учётом ограничения Telegram на длину сообщения
+
+- Строки и короткие отчёты отправляются обычным сообщением
+- Отчёт длиннее 4096 символов, но не больше max_pages страниц, разбивается на страницы;
+  страницы один раз рендерятся и кэшируются, листание - кнопками ◀ / ▶ под сообщением
+  (сообщение редактируется на месте, новых сообщений не появляется)
+- Ещё более длинный отчёт отправляется CSV-файлом, собранным в памяти (io.BytesIO),
+  без построения текстового представления целиком
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+from outbound import MAX_MESSAGE_LENGTH
+from tasks.messages import Messages
+from tasks.report import Report
+
+# префикс callback_data кнопок листания: "page:<номер отчёта>:<номер страницы>"
+PAGE_CALLBACK_PREFIX = "page:"
+# callback_data кнопки с номером текущей страницы (нажатие ничего не меняет)
+_PAGE_NOOP = PAGE_CALLBACK_PREFIX + "noop"
+
+
+class ResultDelivery:
+    """Отправляет ответы FSM, выбирая способ по размеру
+
+    Attributes:
+        outbound (OutboundScheduler): Очередь исходящих вызовов
+        page_size (int): Максимальная длина одной страницы
+        max_pages (int): Больше страниц - отправка файлом
+        cache_size (int): Сколько постраничных отчётов хранить для листания
+    """
+
+    def __init__(self, outbound, page_size=MAX_MESSAGE_LENGTH, max_pages=10, cache_size=500):
+        self.outbound = outbound
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.cache_size = cache_size
+        self._pages = OrderedDict()  # номер отчёта -> (chat_id, список страниц)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def deliver(self, chat_id, response, reply_markup=None):
+        """Отправляет ответ пользователю
+
+        Args:
+            chat_id (int): Идентификатор чата
+            response (str | Report): Ответ обработчика
+            reply_markup: Клавиатура для обычного сообщения
+        """
+        if not isinstance(response, Report) or not response.length_exceeds(self.page_size):
+            self.outbound.send_message(chat_id, str(response), reply_markup=reply_markup)
+        elif not response.length_exceeds(self.page_size * self.max_pages):
+            self._send_paged(chat_id, response)
+        else:
+            self._send_document(chat_id, response)
+
+    def _send_paged(self, chat_id, report):
+        pages = list(report.pages(self.page_size))
+        with self._lock:
+            report_id = next(self._ids)
+            self._pages[report_id] = (chat_id, pages)
+            while len(self._pages) > self.cache_size:
+                self._pages.popitem(last=False)
+        self.outbound.send_message(chat_id, pages[0], reply_markup=_page_keyboard(report_id, 0, len(pages)),
+                                   coalesce=False)
+
+    def _send_document(self, chat_id, report):
+        caption = report.scalars()[:1024] or None  # ограничение Telegram на подпись
+        self.outbound.submit(chat_id, "send_document", {
+            "chat_id": chat_id,
+            "document": report.to_csv(),
+            "visible_file_name": "result.csv",
+            "caption": caption,
+        })
+
+    def show_page(self, call):
+        """Обрабатывает нажатие кнопки листания: редактирует сообщение на месте
+
+        Args:
+            call (telebot.types.CallbackQuery): Нажатие inline-кнопки
+        """
+        chat_id = call.message.chat.id
+        if call.data == _PAGE_NOOP:
+            self.outbound.submit(chat_id, "answer_callback_query", {"callback_query_id": call.id})
+            return
+        try:
+            _, report_id, page = call.data.split(":")
+            report_id, page = int(report_id), int(page)
+        except ValueError:
+            report_id, page = None, 0
+        with self._lock:
+            cached = self._pages.get(report_id)
+            if cached is not None:
+                self._pages.move_to_end(report_id)
+        if cached is None or cached[0] != chat_id or not 0 <= page < len(cached[1]):
+            self.outbound.submit(chat_id, "answer_callback_query",
+                                 {"callback_query_id": call.id, "text": Messages.PAGE_EXPIRED})
+            return
+        pages = cached[1]
+        self.outbound.submit(chat_id, "edit_message_text", {
+            "chat_id": chat_id,
+            "message_id": call.message.message_id,
+            "text": pages[page],
+            "reply_markup": _page_keyboard(report_id, page, len(pages)),
+        })
+        self.outbound.submit(chat_id, "answer_callback_query", {"callback_query_id": call.id})
+
+
+def _page_keyboard(report_id, page, total):
+    # кнопки листания: ◀  2/5  ▶ (крайние кнопки скрываются на первой и последней странице)
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀", callback_data=f"{PAGE_CALLBACK_PREFIX}{report_id}:{page - 1}"))
+    buttons.append(InlineKeyboardButton(f"{page + 1}/{total}", callback_data=_PAGE_NOOP))
+    if page < total - 1:
+        buttons.append(InlineKeyboardButton("▶", callback_data=f"{PAGE_CALLBACK_PREFIX}{report_id}:{page + 1}"))
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(*buttons)
+    return keyboard
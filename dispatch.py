@@ -0,0 +1,172 @@
+"""Таблица переходов, скомпилированная из декларативного автомата fsm_bot.TelegramBotFSM
+
+Автомат описан один раз (fsm_bot.py); при запуске бота compile_fsm() превращает
+его в таблицу с целочисленными индексами:
+    transitions[номер состояния][номер кнопки] -> (событие, целевое состояние) или None
+Последний столбец (other) - любой текст, не являющийся кнопкой
+
+По этой таблице строятся обработчики главного меню (main.py) и каждого задания
+(tasks.fsm.TaskFSM.compile), так что обработка сообщения - два обращения
+к словарям и одно к списку вместо цепочки if/elif по состоянию и тексту
+Новое задание добавляется описанием его состояний и переходов в fsm_bot.py
+
+Импорт python-statemachine и разбор автомата занимают заметную часть запуска,
+поэтому load_table() сохраняет таблицу в JSON-файл и при следующем запуске
+читает её оттуда, если fsm_bot.py и dispatch.py не изменились (сверяется хеш
+их исходного текста); fsm_bot и statemachine тогда не импортируются вовсе
+"""
+
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import re
+
+# состояние задания: "<задание>_<состояние в FSM задания>" (task1_input_manual)
+_TASK_STATE = re.compile(r"^(task\d+)_(.+)$")
+
+
+class TransitionTable:
+    """Скомпилированный автомат
+
+    Attributes:
+        states (tuple[str]): Состояния (идентификаторы из fsm_bot)
+        state_index (dict[str, int]): Состояние -> номер
+        inputs (tuple[str]): Тексты кнопок
+        input_index (dict[str, int]): Текст кнопки -> номер
+        other (int): Номер столбца для текста, не являющегося кнопкой
+        transitions (tuple[tuple]): [состояние][кнопка] -> (событие, целевое состояние) или None
+    """
+
+    def __init__(self, states, inputs, transitions):
+        self.states = tuple(states)
+        self.state_index = {state: i for i, state in enumerate(self.states)}
+        self.inputs = tuple(inputs)
+        self.input_index = {text: i for i, text in enumerate(self.inputs)}
+        self.other = len(self.inputs)
+        self.transitions = tuple(tuple(row) for row in transitions)
+
+    def lookup(self, state, text):
+        """Переход из состояния по тексту сообщения
+
+        Returns:
+            tuple[str, str] | None: (событие, целевое состояние) или None, если перехода нет
+        """
+        return self.transitions[self.state_index[state]][self.input_index.get(text, self.other)]
+
+    def task_of(self, state):
+        # задание, к которому относится состояние ("task1_menu" -> "task1"), или None
+        match = _TASK_STATE.match(state)
+        return match.group(1) if match else None
+
+    def task_states(self, task):
+        """Состояния задания
+
+        Args:
+            task (str): Идентификатор задания ("task1")
+
+        Returns:
+            list[tuple[str, str]]: (состояние в таблице, состояние в FSM задания)
+        """
+        result = []
+        for state in self.states:
+            match = _TASK_STATE.match(state)
+            if match and match.group(1) == task:
+                result.append((state, match.group(2)))
+        return result
+
+    def to_dict(self):
+        # для кэша: переходы - списки [событие, цель] или None
+        return {
+            "states": list(self.states),
+            "inputs": list(self.inputs),
+            "transitions": [[list(entry) if entry else None for entry in row] for row in self.transitions],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        transitions = [[tuple(entry) if entry else None for entry in row] for row in data["transitions"]]
+        return cls(data["states"], data["inputs"], transitions)
+
+
+def event_action(event):
+    # действие события без префикса задания: "task5_target" -> "target"
+    match = _TASK_STATE.match(event)
+    return match.group(2) if match else event
+
+
+def compile_fsm(fsm_class, event_buttons):
+    """Компилирует автомат python-statemachine в таблицу переходов
+
+    Args:
+        fsm_class (type[StateMachine]): Класс автомата (fsm_bot.TelegramBotFSM)
+        event_buttons (dict[str, str]): Действие события -> текст кнопки (fsm_bot.EVENT_BUTTONS)
+
+    Returns:
+        TransitionTable: Таблица переходов
+
+    Raises:
+        ValueError: Если из одного состояния одна кнопка ведёт по двум разным переходам
+    """
+    states = [state.id for state in fsm_class.states]
+    inputs = sorted(set(event_buttons.values()))
+    input_index = {text: i for i, text in enumerate(inputs)}
+    state_index = {state: i for i, state in enumerate(states)}
+    transitions = [[None] * (len(inputs) + 1) for _ in states]
+    for state in fsm_class.states:
+        row = transitions[state_index[state.id]]
+        for transition in state.transitions:
+            for event in transition.events:
+                button = event_buttons.get(event_action(str(event)))
+                if button is None:
+                    continue  # переход без кнопки (возврат в меню после ввода)
+                column = input_index[button]
+                entry = (str(event), transition.target.id)
+                if row[column] is not None and row[column] != entry:
+                    raise ValueError(f"Кнопка '{button}' в состоянии {state.id}: {row[column][0]} и {entry[0]}")
+                row[column] = entry
+    return TransitionTable(states, inputs, transitions)
+
+
+def _source_digest(module):
+    # хеш исходного текста модуля и самого компилятора: кэш устаревает при изменении любого из них
+    digest = hashlib.sha256()
+    for path in (importlib.util.find_spec(module).origin, __file__):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_table(cache_path, module="fsm_bot", fsm_name="TelegramBotFSM", buttons_name="EVENT_BUTTONS"):
+    """Таблица переходов из кэша или компиляцией автомата
+
+    Args:
+        cache_path (str | None): JSON-файл кэша (None - всегда компилировать)
+        module (str): Модуль с описанием автомата
+        fsm_name (str): Класс автомата в модуле
+        buttons_name (str): Словарь "действие -> текст кнопки" в модуле
+
+    Returns:
+        TransitionTable: Таблица переходов
+    """
+    digest = _source_digest(module) if cache_path else None
+    if cache_path:
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("source") == digest:
+                return TransitionTable.from_dict(data["table"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # кэша нет или он повреждён - компилируем заново
+    fsm_module = importlib.import_module(module)
+    table = compile_fsm(getattr(fsm_module, fsm_name), getattr(fsm_module, buttons_name))
+    if cache_path:
+        tmp_path = f"{cache_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"source": digest, "table": table.to_dict()}, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # каталог только для чтения: в следующий раз скомпилируем снова
+    return table
@@ -0,0 +1,111 @@
+"""Исполнитель входящих обновлений с сохранением порядка для каждого пользователя
+
+Обновления разных пользователей обрабатываются параллельно пулом потоков,
+а сообщения одного пользователя - строго по очереди, в порядке поступления
+
+Устройство:
+- Пул из N рабочих потоков, у каждого своя ограниченная очередь (шард)
+- Пользователь всегда попадает в один и тот же шард: user_id % N
+- Внутри шарда задачи выполняются последовательно -> порядок по user_id сохраняется,
+  а состояние сессии пользователя никогда не изменяется из двух потоков одновременно
+- Ограниченные очереди дают обратное давление: при переполнении submit ждёт
+  освобождения места не дольше timeout и сообщает об отказе
+"""
+
+import logging
+import queue
+import threading
+
+# маркер остановки рабочего потока
+_STOP = object()
+
+
+class UserOrderedExecutor:
+    """Шардированный пул потоков с упорядоченной обработкой по пользователям
+
+    Attributes:
+        workers (int): Количество рабочих потоков (шардов)
+        queue_size (int): Максимальная длина очереди одного шарда
+    """
+
+    def __init__(self, workers=8, queue_size=256, name="updates", logger=None):
+        if workers <= 0 or queue_size <= 0:
+            raise ValueError("workers и queue_size должны быть положительными")
+        self.workers = workers
+        self.queue_size = queue_size
+        self._name = name
+        self._logger = logger or logging.getLogger(__name__)
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        # запускает рабочие потоки (повторный вызов ничего не делает)
+        with self._lock:
+            if self._threads:
+                return self
+            for index, shard in enumerate(self._queues):
+                thread = threading.Thread(
+                    target=self._run, args=(shard,),
+                    name=f"{self._name}-{index}", daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def shard_of(self, user_id):
+        # номер шарда, в котором обрабатываются сообщения пользователя
+        return hash(user_id) % self.workers
+
+    def submit(self, user_id, func, *args, timeout=None):
+        """Ставит задачу пользователя в очередь его шарда
+
+        Args:
+            user_id (int): Идентификатор пользователя (ключ упорядочивания)
+            func (callable): Функция-обработчик
+            *args: Аргументы обработчика
+            timeout (float | None): Сколько ждать места в очереди (None - ждать всегда)
+
+        Returns:
+            bool: True, если задача принята; False, если очередь переполнена или пул остановлен
+        """
+        if self._closed:
+            return False
+        try:
+            self._queues[self.shard_of(user_id)].put((func, args), timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def qsize(self):
+        # суммарное количество задач, ожидающих обработки
+        return sum(shard.qsize() for shard in self._queues)
+
+    def shutdown(self, wait=True):
+        """Останавливает пул: уже принятые задачи будут выполнены
+
+        Args:
+            wait (bool): Дождаться завершения рабочих потоков
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for shard in self._queues:
+            shard.put((_STOP, ()))
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _run(self, shard):
+        # цикл рабочего потока: задачи шарда выполняются строго последовательно
+        while True:
+            func, args = shard.get()
+            if func is _STOP:
+                return
+            try:
+                func(*args)
+            except Exception:
+                self._logger.error("Необработанная ошибка в обработчике обновления", exc_info=True)
@@ -1,5 +1,26 @@
 from statemachine import StateMachine, State
 
+# кнопки, вызывающие события: имя события (без префикса задания "taskN_") -> текст кнопки
+# события без кнопки (*_done*) - возврат в меню задания после ввода или выполнения
+EVENT_BUTTONS = {
+    "to_task1": "Задание 1",
+    "to_task5": "Задание 5",
+    "to_task8": "Задание 8",
+    "to_all_tasks": "Все задания",
+    "manual": "Ввести вручную",
+    "random": "Сгенерировать",
+    "exec": "Выполнить",
+    "result": "Результат",
+    "target": "Новая цель",
+    "append": "Добавить элементы",
+    "histogram": "Распределение сумм",
+    "back_from_menu": "Назад",
+    "back_from_manual": "Назад",
+    "back_from_random": "Назад",
+    "back_from_target": "Назад",
+    "back_from_append": "Назад",
+}
+
 
 class TelegramBotFSM(StateMachine):
     # главное меню
@@ -18,6 +39,8 @@ class TelegramBotFSM(StateMachine):
     task5_input_random = State()
     task5_execute = State()
     task5_show_result = State()
+    task5_input_target = State()
+    task5_input_append = State()
 
     # задание 8
     task8_menu = State()
@@ -53,6 +76,11 @@ class TelegramBotFSM(StateMachine):
     task5_back_from_random = task5_input_random.to(main_menu)
     task5_back_from_execute = task5_execute.to(main_menu)
     task5_back_from_result = task5_show_result.to(main_menu)
+    task5_target = task5_menu.to(task5_input_target)
+    task5_append = task5_menu.to(task5_input_append)
+    task5_histogram = task5_menu.to(task5_menu)  # ответ без смены состояния
+    task5_back_from_target = task5_input_target.to(main_menu)
+    task5_back_from_append = task5_input_append.to(main_menu)
 
     # задание 8: переходы
     task8_manual = task8_menu.to(task8_input_manual)
@@ -77,6 +105,8 @@ class TelegramBotFSM(StateMachine):
     task5_input_done_random = task5_input_random.to(task5_menu)
     task5_exec_done = task5_execute.to(task5_menu)
     task5_result_done = task5_show_result.to(task5_menu)
+    task5_input_done_target = task5_input_target.to(task5_menu)
+    task5_input_done_append = task5_input_append.to(task5_menu)
 
     # задание 8
     task8_input_done_manual = task8_input_manual.to(task8_menu)
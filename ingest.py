@@ -0,0 +1,143 @@
+"""Пакетная обработка входящих обновлений: повторы и лишние нажатия меню
+
+Обновления приходят пачками: getUpdates возвращает всё, что накопилось с
+прошлого опроса, webhook.WebhookServer передаёт накопившееся в очереди.
+Прежде чем раздать пачку обработчикам, BatchingTeleBot отбрасывает:
+- duplicate - обновление с уже обработанным update_id (повторная доставка
+  webhook, повтор getUpdates после перезапуска)
+- superseded - нажатие меню, за которым в той же пачке у того же пользователя
+  сразу следует нажатие из той же группы (два раза /start, «Задание 1» и
+  затем «Задание 5»): выполняется только последнее
+- repeated - то же нажатие, что пользователь уже сделал меньше repeat_window
+  секунд назад, если между ними от него ничего не приходило: состояние
+  сессии после первого нажатия такое же, повтор только сбросил бы её и
+  отправил те же сообщения
+
+Любое другое обновление пользователя (ввод данных, файл, кнопка задания,
+листание страниц) прерывает серию: следующее нажатие меню выполняется всегда.
+Порядок оставшихся обновлений не меняется
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+import telebot
+
+
+class BatchingTeleBot(telebot.TeleBot):
+    """TeleBot, отбрасывающий повторные и перекрытые обновления перед обработкой
+
+    Attributes:
+        repeat_window (float): Сколько секунд повтор того же нажатия меню не выполняется
+        dropped (dict[str, int]): Отброшено обновлений по причинам (duplicate, superseded, repeated)
+    """
+
+    def __init__(self, token, menu_groups=(), repeat_window=3.0, dedup_size=10000, metrics=None, logger=None,
+                 clock=time.monotonic, **kwargs):
+        """
+        Args:
+            token (str): Токен бота
+            menu_groups (Iterable[Iterable[str]]): Группы нажатий меню (тексты кнопок и команды);
+                из подряд идущих нажатий одной группы выполняется последнее
+            repeat_window (float): Окно подавления повторного нажатия, сек (0 - не подавлять)
+            dedup_size (int): Сколько последних update_id помнить
+            metrics (BotMetrics | None): Счётчики отброшенных обновлений и размеры пачек
+            logger (logging.Logger | None): Журнал
+            clock (Callable[[], float]): Источник времени
+            **kwargs: Параметры telebot.TeleBot
+        """
+        super().__init__(token, **kwargs)
+        self.repeat_window = repeat_window
+        self.dropped = {"duplicate": 0, "superseded": 0, "repeated": 0}
+        self._groups = {text: index for index, group in enumerate(menu_groups) for text in group}
+        self._metrics = metrics
+        self._logger = logger or logging.getLogger(__name__)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._seen_order = deque()
+        self._dedup_size = dedup_size
+        self._last_press = OrderedDict()  # user_id -> (группа, текст, время) последнего выполненного нажатия
+
+    def process_new_updates(self, updates):
+        if self._metrics is not None and updates:
+            self._metrics.observe_batch(len(updates))
+        with self._lock:
+            updates = self._filter(updates)
+        if updates:
+            super().process_new_updates(updates)
+
+    def _filter(self, updates):
+        now = self._clock()
+        self._forget_presses(now)
+        kept = []
+        in_batch = {}  # user_id -> позиция его последнего нажатия меню в kept
+        for update in updates:
+            if update.update_id in self._seen:
+                self._drop("duplicate", update)
+                continue
+            self._remember(update.update_id)
+            press = self._menu_press(update)
+            if press is None:
+                kept.append(update)
+                continue
+            user_id, group, text = press
+            if group is None:
+                # не нажатие меню: серия прерывается
+                self._last_press.pop(user_id, None)
+                in_batch.pop(user_id, None)
+                kept.append(update)
+                continue
+            last = self._last_press.get(user_id)
+            if last is not None and last[0] == group:
+                position = in_batch.get(user_id)
+                if position is not None:
+                    self._drop("superseded", kept[position])
+                    kept[position] = None
+                elif last[1] == text and now - last[2] < self.repeat_window:
+                    self._drop("repeated", update)
+                    continue
+            self._last_press[user_id] = (group, text, now)
+            self._last_press.move_to_end(user_id)
+            in_batch[user_id] = len(kept)
+            kept.append(update)
+        return [update for update in kept if update is not None]
+
+    def _menu_press(self, update):
+        # (user_id, группа, текст) для нажатия меню, (user_id, None, None) для прочих
+        # обновлений пользователя, None для обновлений без пользователя
+        message = update.message
+        if message is None:
+            query = update.callback_query
+            return (query.from_user.id, None, None) if query is not None else None
+        if message.from_user is None:
+            return None
+        text = (message.text or "").strip()
+        if text.startswith("/"):
+            text = text.split(maxsplit=1)[0].split("@", 1)[0]  # /start@bot_name -> /start
+        group = self._groups.get(text) if message.content_type == "text" else None
+        return message.from_user.id, group, (text if group is not None else None)
+
+    def _remember(self, update_id):
+        self._seen.add(update_id)
+        self._seen_order.append(update_id)
+        if len(self._seen_order) > self._dedup_size:
+            self._seen.discard(self._seen_order.popleft())
+
+    def _forget_presses(self, now):
+        # нажатия старше окна больше не нужны (словарь упорядочен по времени)
+        while self._last_press:
+            user_id, (_, _, pressed) = next(iter(self._last_press.items()))
+            if now - pressed < self.repeat_window:
+                break
+            del self._last_press[user_id]
+
+    def _drop(self, reason, update):
+        self.dropped[reason] += 1
+        if self._metrics is not None:
+            self._metrics.observe_dropped_update(reason)
+        message = update.message
+        if message is not None and message.from_user is not None:
+            self._logger.debug(f"Обновление {update.update_id} пользователя {message.from_user.id} "
+                               f"отброшено ({reason}): '{message.text}'")
@@ -0,0 +1,90 @@
+"""Клавиатуры бота
+
+Клавиатуры сериализуются в JSON один раз при загрузке модуля: telebot
+передаёт строку в reply_markup без изменений, поэтому отправка не строит
+ReplyKeyboardMarkup и не сериализует его заново
+
+Telegram показывает последнюю отправленную reply-клавиатуру, пока её не
+заменят, поэтому одну и ту же клавиатуру повторно отправлять не нужно:
+markup_for() возвращает её только если у пользователя сейчас другая
+(запоминается в Session.keyboard). Если сообщение с клавиатурой так и не
+отправлено (403, исчерпаны повторы), forget_shown() сбрасывает запомненную
+"""
+
+import json
+from telebot.types import ReplyKeyboardMarkup
+
+# клавиатура -> ряды кнопок; имена клавиатур заданий совпадают с Session.state
+LAYOUTS = {
+    "main_menu": (
+        ("Задание 1", "Задание 5", "Задание 8"),
+        ("Все задания",),
+    ),
+    "task1": (
+        ("Ввести вручную", "Сгенерировать"),
+        ("Выполнить", "Результат"),
+        ("Назад",),
+    ),
+    "task5": (
+        ("Ввести вручную", "Сгенерировать"),
+        ("Выполнить", "Результат"),
+        ("Новая цель", "Добавить элементы"),
+        ("Распределение сумм",),
+        ("Назад",),
+    ),
+    "task8": (
+        ("Ввести вручную", "Сгенерировать"),
+        ("Выполнить", "Результат"),
+        ("Назад",),
+    ),
+}
+MAIN = "main_menu"
+
+# все тексты кнопок
+BUTTONS = frozenset(button for rows in LAYOUTS.values() for row in rows for button in row)
+
+
+def _serialize(rows):
+    kb = ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=False)
+    for row in rows:
+        kb.row(*row)
+    # компактнее, чем to_json(): без пробелов, кириллица без \uXXXX
+    return json.dumps(json.loads(kb.to_json()), ensure_ascii=False, separators=(",", ":"))
+
+
+# клавиатура -> готовый JSON для reply_markup
+KEYBOARDS = {name: _serialize(rows) for name, rows in LAYOUTS.items()}
+
+
+def markup_for(session, name):
+    """Клавиатура для очередного сообщения пользователю
+
+    Args:
+        session (Session | None): Сессия пользователя
+        name (str): Имя клавиатуры (MAIN или идентификатор задания)
+
+    Returns:
+        str | None: JSON клавиатуры или None, если у пользователя уже показана эта клавиатура
+    """
+    if session is None:
+        return KEYBOARDS[name]
+    if session.keyboard == name:
+        return None
+    session.keyboard = name
+    return KEYBOARDS[name]
+
+
+def forget_shown(session, name):
+    """Отмечает, что клавиатура до пользователя не дошла (сообщение с ней не отправлено)
+
+    markup_for() запоминает клавиатуру при постановке сообщения в очередь; если
+    отправка не удалась, следующее сообщение должно отправить её заново.
+    Вызывается из потока отправки: клавиатура забывается, только если сессия
+    всё ещё считает показанной именно её (более поздняя уже заменила бы её у клиента)
+
+    Args:
+        session (Session): Сессия пользователя
+        name (str): Имя клавиатуры, отправленной с неудавшимся сообщением
+    """
+    if session.keyboard == name:
+        session.keyboard = None
@@ -0,0 +1,7 @@
+"""Нагрузочные испытания бота целиком: от getUpdates до отправки ответа
+
+Запуск из корня проекта:
+    python -m loadtest.run --users 50 --duration 30 --latency 0.05 --error-429 0.01
+
+Сервер-замена Bot API - loadtest.fake_api, клиент с виртуальными пользователями - loadtest.run
+"""
@@ -0,0 +1,306 @@
+"""Локальная замена Telegram Bot API для нагрузочных испытаний
+
+FakeBotAPI - HTTP-сервер, реализующий методы, которыми пользуется бот:
+getUpdates (long polling), setWebhook, deleteWebhook, sendMessage,
+sendChatAction, sendDocument, editMessageText, answerCallbackQuery, getFile,
+getMe. Бот подключается к нему через telebot.apihelper.API_URL = api.api_url
+
+- Входящие сообщения пользователей добавляются методом push_message и
+  отдаются боту через getUpdates с учётом offset, как в настоящем API
+- После setWebhook обновления, как в Telegram, отправляются POST-запросом
+  на адрес webhook с заголовком X-Telegram-Bot-Api-Secret-Token; ответ не 200
+  (503 при переполнении очереди бота) - повтор с нарастающей паузой;
+  getUpdates при установленном webhook отвечает 409
+- Исходящие сообщения запоминаются по чатам; wait_for ждёт сообщение
+  с нужным текстом - так нагрузочный клиент измеряет время ответа
+- latency / jitter - задержка каждого ответа на вызов отправки
+- error_rates - доля вызовов отправки, завершающихся ошибкой:
+  403 (пользователь заблокировал бота), 400 (сообщение слишком длинное),
+  429 (слишком много запросов, retry_after секунд). Текст длиннее 4096
+  символов отклоняется с ошибкой 400 всегда, как в Telegram
+"""
+
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# максимальная длина текста сообщения в Telegram
+MAX_MESSAGE_LENGTH = 4096
+# методы отправки: к ним применяются задержка и ошибки
+SEND_METHODS = frozenset({"sendMessage", "sendChatAction", "sendDocument", "editMessageText"})
+# повторы доставки на webhook и пауза перед первым из них, сек (дальше - вдвое больше)
+WEBHOOK_RETRIES = 5
+WEBHOOK_RETRY_DELAY = 0.05
+
+_ERRORS = {
+    403: "Forbidden: bot was blocked by the user",
+    400: "Bad Request: message is too long",
+    429: "Too Many Requests: retry after {retry_after}",
+}
+
+
+class FakeBotAPI:
+    """Сервер, имитирующий Telegram Bot API
+
+    Attributes:
+        latency (float): Задержка ответа на вызов отправки, сек
+        jitter (float): Случайная добавка к задержке (от 0 до jitter), сек
+        error_rates (dict[int, float]): Код ошибки (403, 400, 429) -> доля вызовов отправки
+        retry_after (int): retry_after в ответах 429, сек
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rates=None, retry_after=1,
+                 seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rates = dict(error_rates or {})
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Condition()
+        self._updates = []  # ожидающие обновления (по возрастанию update_id)
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._sent = defaultdict(list)  # chat_id -> [(время получения, текст)]
+        self._calls = Counter()
+        self._errors = Counter()
+        self._webhook = None  # (url, secret_token) после setWebhook
+        self._webhook_stats = Counter()  # delivered, retried, failed
+        self._closed = False
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_url(self):
+        # шаблон для telebot.apihelper.API_URL
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot{{0}}/{{1}}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-bot-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        # освобождает ожидающие getUpdates и останавливает сервер
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def push_message(self, user_id, text):
+        """Добавляет входящее текстовое сообщение пользователя (или отправляет его на webhook)
+
+        Returns:
+            float: Момент добавления (time.monotonic) - начало отсчёта времени ответа
+        """
+        with self._lock:
+            message_id = self._next_message_id
+            self._next_message_id += 1
+            message = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Load", "username": f"load{user_id}"},
+                "text": text,
+            }
+            if text.startswith("/"):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+            update = {"update_id": self._next_update_id, "message": message}
+            self._next_update_id += 1
+            webhook = self._webhook
+            pushed = time.monotonic()
+            if webhook is None:
+                self._updates.append(update)
+                self._lock.notify_all()
+                return pushed
+        self._post_update(webhook, update)
+        return pushed
+
+    def _post_update(self, webhook, update):
+        # доставка на webhook, как это делает Telegram: повтор, пока бот не ответит 200
+        url, secret_token = webhook
+        data = json.dumps(update, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if secret_token:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = secret_token
+        delay = WEBHOOK_RETRY_DELAY
+        for attempt in range(WEBHOOK_RETRIES + 1):
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, data, headers), timeout=10) as response:
+                    response.read()
+                with self._lock:
+                    self._webhook_stats["delivered"] += 1
+                return
+            except (urllib.error.URLError, OSError):
+                pass  # HTTPError (не 200) - тоже URLError
+            if attempt < WEBHOOK_RETRIES:
+                with self._lock:
+                    self._webhook_stats["retried"] += 1
+                time.sleep(delay)
+                delay *= 2
+        with self._lock:
+            self._webhook_stats["failed"] += 1
+
+    def sent_count(self, chat_id):
+        # сколько сообщений получено для чата (позиция для wait_for)
+        with self._lock:
+            return len(self._sent[chat_id])
+
+    def wait_for(self, chat_id, marker, start=0, timeout=10.0):
+        """Ждёт сообщение в чат, содержащее marker
+
+        Args:
+            chat_id (int): Чат
+            marker (str): Подстрока текста
+            start (int): С какого по счёту сообщения искать
+            timeout (float): Сколько ждать, сек
+
+        Returns:
+            tuple[int, float] | None: (позиция следующего сообщения, время получения) или None
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            position = start
+            while True:
+                sent = self._sent[chat_id]
+                while position < len(sent):
+                    received, text = sent[position]
+                    position += 1
+                    if marker in text:
+                        return position, received
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    return None
+                self._lock.wait(remaining)
+
+    def stats(self):
+        """Счётчики сервера
+
+        Returns:
+            dict: calls (вызовы по методам), errors (внедрённые ошибки по кодам),
+                webhook (доставки на webhook: delivered, retried, failed)
+        """
+        with self._lock:
+            return {"calls": dict(self._calls), "errors": {str(code): n for code, n in self._errors.items()},
+                    "webhook": dict(self._webhook_stats)}
+
+    def _call(self, method, params):
+        # выполняет метод API: (HTTP-код, ответ)
+        with self._lock:
+            self._calls[method] += 1
+        if method == "getUpdates":
+            if self._webhook is not None:
+                return 409, {"ok": False, "error_code": 409,
+                             "description": "Conflict: can't use getUpdates method while webhook is active"}
+            return 200, {"ok": True, "result": self._get_updates(params)}
+        if method in ("setWebhook", "deleteWebhook"):
+            url = params.get("url") if method == "setWebhook" else None
+            with self._lock:
+                self._webhook = (url, params.get("secret_token")) if url else None
+            return 200, {"ok": True, "result": True}
+        if method in SEND_METHODS:
+            error = self._injected_error(method, params)
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            if delay:
+                time.sleep(delay)
+            if error is not None:
+                return error
+            return 200, {"ok": True, "result": self._send(method, params)}
+        if method == "getMe":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}}
+        if method == "getFile":
+            return 200, {"ok": True, "result": {"file_id": params.get("file_id", ""), "file_unique_id": "u",
+                                                "file_path": "documents/file"}}
+        return 200, {"ok": True, "result": True}
+
+    def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                self._updates = [update for update in self._updates if update["update_id"] >= offset]
+                if self._updates or self._closed:
+                    return self._updates[:limit]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._lock.wait(remaining)
+
+    def _injected_error(self, method, params):
+        text = params.get("text") or ""
+        if method in ("sendMessage", "editMessageText") and len(text) > MAX_MESSAGE_LENGTH:
+            return self._error(400)
+        for code, rate in self.error_rates.items():
+            if rate and self._random.random() < rate:
+                return self._error(code)
+        return None
+
+    def _error(self, code):
+        with self._lock:
+            self._errors[code] += 1
+        response = {"ok": False, "error_code": code,
+                    "description": _ERRORS[code].format(retry_after=self.retry_after)}
+        if code == 429:
+            response["parameters"] = {"retry_after": self.retry_after}
+        return code, response
+
+    def _send(self, method, params):
+        chat_id = int(params.get("chat_id") or 0)
+        with self._lock:
+            message_id = self._next_message_id
+            self._next_message_id += 1
+            if method == "sendChatAction":
+                return True
+            if method in ("sendMessage", "editMessageText"):
+                self._sent[chat_id].append((time.monotonic(), params.get("text") or ""))
+                self._lock.notify_all()
+        return {"message_id": message_id, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text") or ""}
+
+
+def _handler(api):
+    # класс обработчика запросов, привязанный к экземпляру FakeBotAPI
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self._dispatch()
+
+        def do_POST(self):
+            self._dispatch()
+
+        def _dispatch(self):
+            url = urlsplit(self.path)
+            method = url.path.rsplit("/", 1)[-1]
+            params = dict(parse_qsl(url.query))
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            content_type = self.headers.get("Content-Type") or ""
+            if content_type.startswith("application/x-www-form-urlencoded"):
+                params.update(parse_qsl(body.decode("utf-8")))
+            elif content_type.startswith("application/json") and body:
+                params.update(json.loads(body))
+            # multipart (sendDocument): параметры telebot передаёт в строке запроса, файл не разбираем
+            status, response = api._call(method, params)
+            data = json.dumps(response, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # журнал запросов не нужен: счётчики - в FakeBotAPI.stats()
+
+    return Handler
@@ -0,0 +1,290 @@
+"""Нагрузочный клиент: N виртуальных пользователей проходят сценарии бота
+
+Бот (main.py) запускается в этом же процессе и работает с FakeBotAPI вместо
+Telegram: опрос getUpdates, исполнитель обновлений, очередь исходящих и
+процессы-вычислители - всё как при обычном запуске. Файлы bot.log и
+sessions.db создаются во временном каталоге. С ключом --webhook бот вместо
+опроса принимает обновления встроенным сервером (webhook.WebhookServer), а
+FakeBotAPI отправляет их туда POST-запросами, как Telegram
+
+Каждый пользователь - отдельный поток, который, как человек, отправляет
+следующее сообщение только после ответа на предыдущее:
+    /start -> Задание N -> (Сгенерировать -> размер | Ввести вручную -> данные)
+    -> Выполнить -> Результат -> Назад
+Время ответа шага - от добавления сообщения в getUpdates (или отправки на webhook) до получения ботовского
+сообщения с ожидаемым текстом. Шаг без ответа за step_timeout - ошибка;
+после ошибки пользователь начинает сценарий заново
+
+Итог: пропускная способность (шагов в секунду), p50/p90/p99 времени ответа
+(всего и по шагам), доля ошибок и счётчики вызовов Bot API
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import defaultdict
+from loadtest.fake_api import FakeBotAPI
+from tasks.messages import Messages
+
+# токен для FakeBotAPI (настоящий не нужен)
+FAKE_TOKEN = "123456:loadtest"
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# задание -> (кнопка, пример ручного ввода, текст результата)
+TASKS = {
+    "task1": ("Задание 1", "5 7 4; 4 9 3", Messages.TASK1_RESULT),
+    "task5": ("Задание 5", "1 2 3 -1 1; 3", Messages.TASK5_RESULT_PREFIX),
+    "task8": ("Задание 8", "12 34 56; 21 65 78", Messages.TASK8_RESULT_PREFIX),
+}
+_MANUAL_PROMPTS = {
+    "task1": Messages.INPUT_MANUAL_TASK1,
+    "task5": Messages.INPUT_MANUAL_TASK5,
+    "task8": Messages.INPUT_MANUAL_TASK8,
+}
+
+
+def scenario(task, manual, size):
+    """Шаги сценария: (название шага, текст пользователя, ожидаемый текст ответа)
+
+    Args:
+        task (str): "task1", "task5" или "task8"
+        manual (bool): Ввод данных вручную (иначе - генерация)
+        size (int): Размер генерируемых массивов
+    """
+    button, manual_input, result_marker = TASKS[task]
+    steps = [("start", "/start", Messages.GREETING), ("task", button, Messages.ACTION_PROMPT)]
+    if manual:
+        steps += [("manual", "Ввести вручную", _MANUAL_PROMPTS[task]), ("data", manual_input, Messages.DATA_SAVED)]
+    else:
+        steps += [("generate", "Сгенерировать", Messages.INPUT_RANDOM_SIZE),
+                  ("size", str(size), Messages.GENERATED_SUCCESS)]
+    steps += [("execute", "Выполнить", Messages.ALGORITHM_DONE), ("result", "Результат", result_marker),
+              ("back", "Назад", Messages.BACK_TO_MAIN)]
+    return steps
+
+
+class Stats:
+    """Потокобезопасный сбор результатов шагов"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)  # шаг -> [сек]
+        self.errors = defaultdict(int)  # шаг -> количество
+
+    def ok(self, step, latency):
+        with self._lock:
+            self.latencies[step].append(latency)
+
+    def error(self, step):
+        with self._lock:
+            self.errors[step] += 1
+
+
+def user_loop(api, user_id, stats, deadline, size, think, step_timeout, rng):
+    # сценарии одного пользователя до истечения deadline
+    position = api.sent_count(user_id)
+    while time.monotonic() < deadline:
+        steps = scenario(rng.choice(list(TASKS)), rng.random() < 0.5, size)
+        for step, text, marker in steps:
+            if time.monotonic() >= deadline:
+                return
+            sent = api.push_message(user_id, text)
+            found = api.wait_for(user_id, marker, position, step_timeout)
+            if found is None:
+                stats.error(step)
+                position = api.sent_count(user_id)
+                break  # сценарий сначала
+            position, received = found
+            stats.ok(step, received - sent)
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+
+
+def percentile(values, q):
+    # q-й процентиль (0..100) по методу ближайшего ранга
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(stats, duration, api_stats):
+    """Итоговые показатели
+
+    Returns:
+        dict: steps, errors, error_rate, throughput, latency (p50/p90/p99 всего и по шагам), api
+    """
+    all_latencies = [x for values in stats.latencies.values() for x in values]
+    completed = len(all_latencies)
+    errors = sum(stats.errors.values())
+    total = completed + errors
+
+    def distribution(values):
+        return {"p50": percentile(values, 50), "p90": percentile(values, 90), "p99": percentile(values, 99),
+                "max": max(values) if values else None, "count": len(values)}
+
+    steps = sorted(set(stats.latencies) | set(stats.errors))
+    return {
+        "duration": duration,
+        "steps": completed,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "throughput": completed / duration if duration else 0.0,
+        "latency": distribution(all_latencies),
+        "by_step": {step: {**distribution(stats.latencies.get(step, [])), "errors": stats.errors.get(step, 0)}
+                    for step in steps},
+        "api": api_stats,
+    }
+
+
+def start_bot(api, webhook=False):
+    """Импортирует main.py, направив его на FakeBotAPI, и запускает все его компоненты
+
+    Args:
+        api (FakeBotAPI): Замена Bot API
+        webhook (bool): Принимать обновления через webhook вместо опроса getUpdates
+
+    Returns:
+        tuple[module, threading.Thread | WebhookServer]: Модуль main и поток опроса или сервер webhook
+    """
+    from telebot import apihelper
+    apihelper.API_URL = api.api_url
+    if _ROOT not in sys.path:
+        sys.path.insert(0, _ROOT)
+    try:
+        import config  # noqa: F401 - настоящий config.py не нужен, но и не мешает
+    except ImportError:
+        config = types.ModuleType("config")
+        config.TOKEN = FAKE_TOKEN
+        sys.modules["config"] = config
+    import main
+    main.bot.token = FAKE_TOKEN
+    # действия каждого пользователя в консоль при нагрузке не выводим
+    main.console_handler.setLevel(logging.WARNING)
+    main.log_listener.start()
+    main.outbound.start()
+    main.executor.start()
+    main.uploads.start()
+    main.offloader.start()
+    if webhook:
+        from webhook import WebhookServer
+        server = WebhookServer(
+            main.bot, "127.0.0.1", 0, secret_token=secrets.token_urlsafe(16),
+            queue_size=main.WEBHOOK_QUEUE_SIZE, logger=main.logger,
+        ).start()
+        host, port = server.address
+        server.set_webhook(f"http://{host}:{port}{server.path}")
+        return main, server
+    thread = threading.Thread(
+        target=main.bot.polling, kwargs={"non_stop": True, "interval": 0, "long_polling_timeout": 1},
+        name="polling", daemon=True,
+    )
+    thread.start()
+    return main, thread
+
+
+def stop_bot(main, ingress):
+    if isinstance(ingress, threading.Thread):
+        main.bot.stop_polling()
+        ingress.join(timeout=10)
+    else:
+        ingress.shutdown()
+    main.offloader.shutdown(wait=True)
+    main.uploads.shutdown(wait=True)
+    main.executor.shutdown(wait=True)
+    main.sessions.close()
+    main.outbound.shutdown()
+    main.log_listener.stop()
+
+
+def _format_latency(value):
+    return "-" if value is None else f"{value * 1000:.0f} мс"
+
+
+def print_report(report):
+    latency = report["latency"]
+    print(f"\nДлительность: {report['duration']:.1f} с")
+    print(f"Шагов выполнено: {report['steps']}, ошибок: {report['errors']} ({report['error_rate']:.1%})")
+    print(f"Пропускная способность: {report['throughput']:.1f} шагов/с")
+    print(f"Время ответа: p50 {_format_latency(latency['p50'])}, p90 {_format_latency(latency['p90'])}, "
+          f"p99 {_format_latency(latency['p99'])}, максимум {_format_latency(latency['max'])}")
+    print(f"\n{'шаг':<10} {'выполнено':>10} {'ошибок':>7} {'p50':>9} {'p99':>9}")
+    for step, values in report["by_step"].items():
+        print(f"{step:<10} {values['count']:>10} {values['errors']:>7} "
+              f"{_format_latency(values['p50']):>9} {_format_latency(values['p99']):>9}")
+    print(f"\nВызовы Bot API: {report['api']['calls']}")
+    if report["api"].get("webhook"):
+        print(f"Доставка на webhook: {report['api']['webhook']}")
+    if report["api"]["errors"]:
+        print(f"Внедрённые ошибки: {report['api']['errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочное испытание бота с локальной заменой Bot API")
+    parser.add_argument("--users", type=int, default=20, help="количество одновременных пользователей")
+    parser.add_argument("--duration", type=float, default=30, help="длительность, сек")
+    parser.add_argument("--size", type=int, default=20, help="размер генерируемых массивов")
+    parser.add_argument("--think", type=float, default=0.0, help="средняя пауза пользователя между шагами, сек")
+    parser.add_argument("--step-timeout", type=float, default=15, help="сколько ждать ответа на шаг, сек")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа Bot API, сек")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, сек")
+    parser.add_argument("--error-403", type=float, default=0.0, help="доля отправок с ошибкой 403")
+    parser.add_argument("--error-400", type=float, default=0.0, help="доля отправок с ошибкой 400")
+    parser.add_argument("--error-429", type=float, default=0.0, help="доля отправок с ошибкой 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, сек")
+    parser.add_argument("--webhook", action="store_true", help="обновления через webhook вместо getUpdates")
+    parser.add_argument("--seed", type=int, default=None, help="начальное значение генераторов")
+    parser.add_argument("--output", help="записать итог в JSON-файл")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output) if args.output else None
+    api = FakeBotAPI(
+        latency=args.latency, jitter=args.jitter, retry_after=args.retry_after, seed=args.seed,
+        error_rates={403: args.error_403, 400: args.error_400, 429: args.error_429},
+    ).start()
+    work_dir = tempfile.mkdtemp(prefix="loadtest-")
+    os.chdir(work_dir)  # bot.log и sessions.db бота - во временном каталоге
+    bot_main, ingress = start_bot(api, webhook=args.webhook)
+
+    stats = Stats()
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+    deadline = started + args.duration
+    users = [
+        threading.Thread(
+            target=user_loop,
+            args=(api, 1_000_000 + i, stats, deadline, args.size, args.think, args.step_timeout,
+                  random.Random(rng.random())),
+            name=f"user-{i}", daemon=True,
+        )
+        for i in range(args.users)
+    ]
+    print(f"Пользователей: {args.users}, длительность: {args.duration:g} с (рабочий каталог {work_dir})")
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    duration = time.monotonic() - started
+
+    stop_bot(bot_main, ingress)
+    api.close()
+    report = summarize(stats, duration, api.stats())
+    print_report(report)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nИтог записан в {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Асинхронное журналирование: запись в консоль и файл вне потоков обработки
+
+Вызов logger.info(...) в обработчике только создаёт запись и кладёт её в
+ограниченную очередь (DroppingQueueHandler). Форматирование и запись выполняет
+один фоновый поток (BatchingQueueListener):
+- записи пишутся в буферы обработчиков без сброса после каждой строки;
+  буферы сбрасываются, когда очередь опустела, после batch_size записей
+  или не реже чем раз в flush_interval секунд
+- файл журнала переключается (bot.log -> bot.log.1 -> ...) по размеру и/или
+  по времени; проверка выполняется при сбросе буфера, поэтому файл может
+  превысить max_bytes на одну пачку записей
+- при переполнении очереди действует политика overflow:
+  "drop_low" - записи ниже WARNING отбрасываются, остальные ждут места до block_timeout;
+  "drop_new" - отбрасывается любая новая запись;
+  "block" - запись ждёт места до block_timeout
+  Количество отброшенных записей попадает в журнал, как только очередь освободится
+"""
+
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+OVERFLOW_POLICIES = ("drop_low", "drop_new", "block")
+
+
+class CustomFormatter(logging.Formatter):
+    """Формат журнала бота: ГГГГ-ММ-ДД ЧЧ:ММ:СС - id (@username) - действие
+
+    Строка времени вычисляется один раз в секунду; результат запоминается
+    в записи, чтобы консоль и файл не форматировали её дважды
+    """
+
+    PLAIN_MESSAGES = frozenset({"ЗАПУСК TELEGRAM-БОТА", "Бот остановлен пользователем"})
+
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._time_str = ""
+
+    def format(self, record):
+        text = getattr(record, "formatted_text", None)
+        if text is None:
+            text = self._format(record)
+            record.formatted_text = text
+        return text
+
+    def _format(self, record):
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._time_str = self.formatTime(record, "%Y-%m-%d %H:%M:%S")
+        time_str = self._time_str
+        if record.msg in self.PLAIN_MESSAGES:
+            return f"{time_str} - {record.msg}"
+        if record.levelno >= logging.ERROR:
+            return f"{time_str} - {record.name} - {record.levelname} - {record.getMessage()}"
+        action = getattr(record, "action", None)
+        if action is not None and hasattr(record, "user_id") and hasattr(record, "username"):
+            return f"{time_str} - {record.user_id} (@{record.username}) - {action}"
+        return f"{time_str} - {record.getMessage()}"
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Кладёт записи в ограниченную очередь; при переполнении - политика overflow
+
+    Attributes:
+        overflow (str): "drop_low", "drop_new" или "block"
+        block_timeout (float): Сколько ждать места в очереди, сек
+        dropped (int): Сколько записей отброшено за всё время
+    """
+
+    def __init__(self, log_queue, overflow="drop_low", block_timeout=1.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"неизвестная политика переполнения: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record):
+        # запись остаётся в этом процессе: аргументы подставляются сразу (они могут измениться),
+        # а traceback и формат строки - забота потока записи
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "drop_new" or (self.overflow == "drop_low" and record.levelno < logging.WARNING):
+                self._drop()
+                return
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._drop()
+                return
+        if self._unreported:
+            self._report_dropped(record)
+
+    # enqueue вызывается из handle() под блокировкой обработчика - счётчики без своей блокировки
+    def _drop(self):
+        self.dropped += 1
+        self._unreported += 1
+
+    def _report_dropped(self, record):
+        count, self._unreported = self._unreported, 0
+        warning = logging.makeLogRecord({
+            "name": record.name, "levelno": logging.WARNING, "levelname": "WARNING",
+            "msg": f"Очередь журнала переполнена, пропущено записей: {count}",
+        })
+        try:
+            self.queue.put_nowait(warning)
+        except queue.Full:
+            self._unreported += count
+
+
+class BatchedStreamHandler(logging.StreamHandler):
+    """StreamHandler без сброса буфера после каждой записи (сброс - flush_batch)"""
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def flush_batch(self):
+        self.flush()
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """Файл журнала с буферизованной записью и переключением по размеру и времени
+
+    Attributes:
+        maxBytes (int): Размер файла, после которого он переключается (0 - не переключать по размеру)
+        backupCount (int): Сколько старых файлов хранить (bot.log.1 ... bot.log.N)
+        interval (float): Период переключения по времени, сек (0 - не переключать по времени)
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=5, interval=0, encoding="utf-8"):
+        super().__init__(filename, mode="a", maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.interval = interval
+        self._rollover_at = time.time() + interval if interval else None
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def flush_batch(self):
+        # сброс пачки на диск и, если пора, переключение файла
+        with self.lock:
+            if self.stream is None:
+                return
+            self.stream.flush()
+            if self._rollover_due():
+                self.doRollover()
+
+    def _rollover_due(self):
+        if self.backupCount <= 0:
+            return False
+        if self.maxBytes and self.stream.tell() >= self.maxBytes:
+            return True
+        return self._rollover_at is not None and time.time() >= self._rollover_at
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self._rollover_at = time.time() + self.interval
+
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener, сбрасывающий буферы обработчиков пачками
+
+    Attributes:
+        flush_interval (float): Максимальная задержка записи на диск при непрерывном потоке, сек
+        batch_size (int): После скольких записей буферы сбрасываются принудительно
+    """
+
+    def __init__(self, log_queue, *handlers, flush_interval=0.5, batch_size=512):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._batched = 0
+        self._flush_at = time.monotonic() + flush_interval
+
+    def dequeue(self, block):
+        try:
+            record = self.queue.get_nowait()
+        except queue.Empty:
+            if not block:
+                raise
+            # очередь пуста: всё накопленное - на диск, затем ожидание
+            self._flush()
+            return self.queue.get()
+        if self._batched >= self.batch_size or time.monotonic() >= self._flush_at:
+            self._flush()
+        self._batched += 1
+        return record
+
+    def stop(self):
+        # записывает оставшиеся в очереди записи и сбрасывает буферы
+        super().stop()
+        self._flush()
+
+    def _flush(self):
+        if self._batched:
+            for handler in self.handlers:
+                try:
+                    getattr(handler, "flush_batch", handler.flush)()
+                except Exception:
+                    pass  # ошибка записи журнала не должна останавливать поток
+        self._batched = 0
+        self._flush_at = time.monotonic() + self.flush_interval
@@ -10,104 +10,357 @@
 
 Архитектура:
 - Нисходящее проектирование: от главного файла к модулям задач
-- FSM через словарь состояний (согласно лекции "Автоматное программирование")
+- FSM через словарь состояний (согласно лекции "Автоматное программирование"):
+  автомат описан в fsm_bot.py и при запуске компилируется в таблицу
+  переходов (dispatch), общую для главного меню и всех заданий; таблица
+  кэшируется в файле, поэтому при обычном перезапуске fsm_bot не импортируется
+- Модули заданий загружаются при первом выборе задания (task_registry);
+  куда уходит время запуска, показывает startup_report.py
+- Обновления приходят опросом getUpdates или, с ключом --webhook URL,
+  POST-запросами Telegram на встроенный HTTP-сервер (webhook.WebhookServer);
+  пачка обновлений проходит через ingest.BatchingTeleBot: повторы по update_id
+  и лишние нажатия меню подряд отбрасываются до обработки
 - Многопользовательская поддержка через сессии (user_id -> FSM)
-- Текстовые кнопки вместо цифрового ввода для удобства пользователя
+  с ограничением по времени простоя и количеству (sessions.SessionStore);
+  сессии переживают перезапуск бота (session_backend.SQLiteSessionBackend)
+- Параллельная обработка разных пользователей с сохранением порядка сообщений
+  каждого пользователя (executor.UserOrderedExecutor)
+- Исходящие сообщения идут через очередь с ограничением скорости и объединением
+  (outbound.OutboundScheduler)
+- Длинные ответы с массивами листаются по страницам или приходят CSV-файлом
+  (delivery.ResultDelivery)
+- Данные можно прислать файлом .txt/.csv/.npy: он скачивается блоками и
+  разбирается потоково (uploads.DocumentDownloader, tasks.parsing) в отдельном
+  пуле потоков, чтобы медленная загрузка не задерживала других пользователей шарда
+- Вычисления на больших массивах выполняются в отдельных процессах с
+  ограничением времени (offload.ProcessOffloader, tasks.compute)
+- Метрики (время обработчиков и вызовов API, очереди, сессии) - по HTTP
+  в формате Prometheus и снимком в файл (metrics)
+- Журнал пишется фоновым потоком пачками, с переключением файла и
+  ограниченной очередью (log_pipeline)
+- Текстовые кнопки вместо цифрового ввода для удобства пользователя;
+  клавиатуры сериализуются один раз и не отправляются повторно, если
+  пользователь их уже видит (keyboards)
 """
 
-import telebot
+import argparse
+import functools
 import logging
+import queue
+import secrets
 import sys
+import threading
 import time
-from telebot.types import ReplyKeyboardMarkup, KeyboardButton
-from telebot.apihelper import ApiTelegramException
-from tasks.task1 import Task1FSM
-from tasks.task5 import Task5FSM
-from tasks.task8 import Task8FSM
+from tasks.fsm import EXIT
+from dispatch import load_table
+from task_registry import TaskRegistry
 from tasks.messages import Messages
+from executor import UserOrderedExecutor
+from sessions import SessionStore
+from session_backend import SQLiteSessionBackend
+from outbound import OutboundScheduler
+from keyboards import BUTTONS, LAYOUTS, MAIN, forget_shown, markup_for
+from ingest import BatchingTeleBot
+from delivery import ResultDelivery, PAGE_CALLBACK_PREFIX
+from uploads import DocumentDownloader
+from offload import ProcessOffloader
+from metrics import BotMetrics, MetricsServer, SnapshotWriter
+from webhook import WebhookServer
+from log_pipeline import (
+    BatchedRotatingFileHandler, BatchedStreamHandler, BatchingQueueListener, CustomFormatter, DroppingQueueHandler,
+)
+from tasks.cache import result_cache
+from tasks.compute import ComputeRequest
+from tasks.errors import ComputeCancelledError, ComputeFailedError, ComputeTimeoutError, InvalidInputError
+from tasks.parsing import FILE_EXTENSIONS, read_file_arrays
+from tasks.report import Report
+import os
+from urllib.parse import urlsplit
 from config import TOKEN
 
 
-# безопасная отправка "печатает..."
+# параметры исполнителя обновлений
+EXECUTOR_WORKERS = 8  # количество рабочих потоков (шардов)
+EXECUTOR_QUEUE_SIZE = 256  # максимальная длина очереди одного шарда
+SUBMIT_TIMEOUT = 5  # сколько поток опроса ждёт места в очереди, сек
+
+# скачивание и разбор файлов с данными (вне шардов исполнителя)
+UPLOAD_WORKERS = 4  # одновременных загрузок
+UPLOAD_QUEUE_SIZE = 16  # ожидающих загрузок на поток
+
+# лимиты исходящих сообщений (рекомендации Telegram Bot API)
+GLOBAL_SEND_RATE = 30  # сообщений в секунду на весь бот
+CHAT_SEND_RATE = 1  # сообщений в секунду в один чат
+CHAT_SEND_BURST = 3  # сколько сообщений в чат можно отправить подряд без ожидания
+OUTBOUND_SENDERS = 4  # потоков, выполняющих вызовы Bot API
+
+# сессии: удаляются после SESSION_TTL секунд простоя, хранится не больше SESSION_MAX_ENTRIES
+SESSION_TTL = 6 * 3600
+SESSION_MAX_ENTRIES = 10000
+SESSION_DB = "sessions.db"  # файл постоянного хранилища сессий
+SESSION_FLUSH_INTERVAL = 2  # период фоновой записи изменённых сессий, сек
+
+# длинные ответы: до RESULT_MAX_PAGES страниц - листание, больше - CSV-файл
+RESULT_MAX_PAGES = 10
+
+# вычисления на больших массивах (порог - tasks.compute.OFFLOAD_THRESHOLD)
+OFFLOAD_WORKERS = 2  # процессов-исполнителей
+COMPUTE_TIMEOUT = 120  # ограничение времени одного вычисления, сек
+STILL_COMPUTING_AFTER = 5  # через сколько секунд сообщить, что вычисление ещё идёт
+
+# журнал (log_pipeline): очередь записей, сброс на диск пачками, переключение файла
+LOG_QUEUE_SIZE = 10000  # записей в очереди, дальше - политика LOG_OVERFLOW
+LOG_OVERFLOW = "drop_low"  # при переполнении отбрасываются записи ниже WARNING
+LOG_FLUSH_INTERVAL = 0.5  # максимальная задержка записи на диск, сек
+LOG_MAX_BYTES = 10 * 1024 * 1024  # размер bot.log, после которого он переключается
+LOG_ROTATE_INTERVAL = 24 * 3600  # переключение bot.log по времени, сек
+LOG_BACKUP_COUNT = 5  # сколько старых файлов журнала хранить
+
+# метрики: GET http://METRICS_HOST:METRICS_PORT/metrics и снимок в файл
+METRICS_HOST = "127.0.0.1"  # только локальные подключения
+METRICS_PORT = 9108  # None - не запускать HTTP-сервер метрик
+METRICS_SNAPSHOT = "metrics.json"
+METRICS_SNAPSHOT_INTERVAL = 60  # период записи снимка, сек
+
+# webhook (python main.py --webhook https://адрес/путь): сервер слушает WEBHOOK_LISTEN:WEBHOOK_PORT,
+# путь берётся из адреса; секрет для заголовка X-Telegram-Bot-Api-Secret-Token создаётся при каждом запуске
+WEBHOOK_LISTEN = "0.0.0.0"
+WEBHOOK_PORT = 8443  # Telegram отправляет только на порты 443, 80, 88, 8443
+WEBHOOK_QUEUE_SIZE = 1024  # принятых, но ещё не переданных боту обновлений; дальше - ответ 503
+WEBHOOK_CERT = None  # сертификат и ключ, если TLS не снимает обратный прокси
+WEBHOOK_KEY = None
+
+# скомпилированный автомат fsm_bot (пересоздаётся при изменении fsm_bot.py)
+FSM_TABLE_CACHE = "fsm_table.json"
+
+# задания: идентификатор в автомате бота (fsm_bot) -> ("модуль:класс FSM", описание);
+# модуль импортируется при первом выборе задания
+TASKS = {
+    "task1": ("tasks.task1:Task1FSM", Messages.TASK1_DESCRIPTION),
+    "task5": ("tasks.task5:Task5FSM", Messages.TASK5_DESCRIPTION),
+    "task8": ("tasks.task8:Task8FSM", Messages.TASK8_DESCRIPTION),
+}
+
+# нажатия меню: из подряд идущих нажатий одной группы выполняется последнее, а повтор того же
+# нажатия в течение UPDATE_REPEAT_WINDOW секунд (без других сообщений между ними) не выполняется
+MENU_GROUPS = (
+    ("/start",),
+    ("/help",),
+    tuple(button for row in LAYOUTS[MAIN] for button in row),  # выбор задания
+    ("Назад",),
+)
+UPDATE_REPEAT_WINDOW = 3  # сек, 0 - выполнять все повторы
+UPDATE_DEDUP_SIZE = 10000  # сколько последних update_id помнить для отбрасывания повторной доставки
+
+# команды, которые учитываются в метриках как отдельные действия (кнопки - keyboards.BUTTONS)
+COMMANDS = frozenset({"/start", "/help"})
+
+
+# безопасная отправка "печатает..." (через очередь исходящих)
 def safe_send_chat_action(user_id, action="typing"):
-    try:
-        bot.send_chat_action(user_id, action)
-    except ApiTelegramException:
-        pass  # игнорировать 403
+    outbound.send_chat_action(user_id, action)
 
 
-# безопасная отправка сообщений
+# безопасная отправка сообщений: ошибки 403/429 обрабатывает планировщик
 def safe_send_message(user_id, text, reply_markup=None):
-    try:
-        bot.send_message(user_id, text, reply_markup=reply_markup)
-    except ApiTelegramException as e:
-        if e.error_code == 403 and "bot was blocked by the user" in e.description:
-            logger.warning(f"Пользователь {user_id} заблокировал бота. Сообщение не отправлено.")
-        else:
-            logger.error(f"Ошибка отправки сообщения пользователю {user_id}: {e}", exc_info=True)
-
+    outbound.send_message(user_id, text, reply_markup=reply_markup)
 
-# кастомный форматтер для логов
-class CustomFormatter(logging.Formatter):
-    def format(self, record):
-        time_str = self.formatTime(record, "%Y-%m-%d %H:%M:%S")
-        if record.msg in ["ЗАПУСК TELEGRAM-БОТА", "Бот остановлен пользователем"]:
-            return f"{time_str} - {record.msg}"
-        if record.levelno >= logging.ERROR:
-            return f"{time_str} - {record.name} - {record.levelname} - {record.getMessage()}"
-        if hasattr(record, 'user_id') and hasattr(record, 'username') and hasattr(record, 'action'):
-            return f"{time_str} - {record.user_id} (@{record.username}) - {record.action}"
-        return f"{time_str} - {record.getMessage()}"
 
-
-# настройка логгера
+# настройка логгера: обработчики только ставят записи в очередь, пишет фоновый поток
 formatter = CustomFormatter()
-console_handler = logging.StreamHandler(sys.stdout)
+console_handler = BatchedStreamHandler(sys.stdout)
 console_handler.setFormatter(formatter)
-file_handler = logging.FileHandler("bot.log", encoding="utf-8")
+file_handler = BatchedRotatingFileHandler(
+    "bot.log", max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, interval=LOG_ROTATE_INTERVAL,
+)
 file_handler.setFormatter(formatter)
+log_queue = queue.Queue(LOG_QUEUE_SIZE)
+log_listener = BatchingQueueListener(log_queue, console_handler, file_handler, flush_interval=LOG_FLUSH_INTERVAL)
+queue_handler = DroppingQueueHandler(log_queue, overflow=LOG_OVERFLOW)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
-
-
-bot = telebot.TeleBot(TOKEN)
-sessions = {}
-
-
-def get_main_keyboard():
-    kb = ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=False)
-    kb.row("Задание 1", "Задание 5", "Задание 8")
-    kb.row("Все задания")
-    return kb
-
-
-def get_task1_actions():
-    kb = ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=False)
-    kb.row("Ввести вручную", "Сгенерировать")
-    kb.row("Выполнить", "Результат")
-    kb.row("Назад")
-    return kb
+logger.addHandler(queue_handler)
+
+
+# декларативный автомат fsm_bot компилируется в таблицу переходов главного меню и заданий
+transitions = load_table(FSM_TABLE_CACHE)
+task_registry = TaskRegistry({task: path for task, (path, _) in TASKS.items()}, transitions, logger=logger)
+
+# threaded=False: поток опроса только раскладывает обновления по очередям исполнителя
+metrics = BotMetrics()
+bot = BatchingTeleBot(
+    TOKEN, menu_groups=MENU_GROUPS, repeat_window=UPDATE_REPEAT_WINDOW, dedup_size=UPDATE_DEDUP_SIZE,
+    metrics=metrics, logger=logger, threaded=False,
+)
+executor = UserOrderedExecutor(EXECUTOR_WORKERS, EXECUTOR_QUEUE_SIZE, logger=logger)
+uploads = UserOrderedExecutor(UPLOAD_WORKERS, UPLOAD_QUEUE_SIZE, name="uploads", logger=logger)
+outbound = OutboundScheduler(
+    bot, global_rate=GLOBAL_SEND_RATE, chat_rate=CHAT_SEND_RATE,
+    chat_burst=CHAT_SEND_BURST, senders=OUTBOUND_SENDERS, metrics=metrics, logger=logger,
+)
+delivery = ResultDelivery(outbound, max_pages=RESULT_MAX_PAGES)
+downloader = DocumentDownloader(bot, logger=logger)
+offloader = ProcessOffloader(OFFLOAD_WORKERS, timeout=COMPUTE_TIMEOUT, slow_after=STILL_COMPUTING_AFTER, logger=logger)
+sessions = SessionStore(
+    ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES,
+    backend=SQLiteSessionBackend(SESSION_DB, flush_interval=SESSION_FLUSH_INTERVAL, logger=logger),
+)
+
+
+snapshot_writer = SnapshotWriter(metrics.registry, METRICS_SNAPSHOT, METRICS_SNAPSHOT_INTERVAL, logger=logger)
+metrics.registry.gauge("bot_sessions_active", "Сессий в памяти", lambda: len(sessions))
+metrics.registry.gauge("bot_updates_queued", "Обновлений в очередях исполнителя", executor.qsize)
+metrics.registry.gauge("bot_uploads_queued", "Файлов, ожидающих скачивания", uploads.qsize)
+metrics.registry.gauge("bot_outbound_pending", "Вызовов Bot API в очереди отправки", outbound.pending)
+metrics.registry.gauge("bot_compute_pending", "Вычислений, ожидающих процесса", offloader.pending)
+metrics.registry.gauge("bot_compute_running", "Вычислений пользователей в работе", lambda: len(computations))
+metrics.registry.gauge("bot_result_cache_bytes", "Объём кэша результатов", lambda: result_cache.stats()["bytes"])
+metrics.registry.counter_func(
+    "bot_result_cache_hits_total", "Попаданий в кэш результатов", lambda: result_cache.stats()["hits"])
+metrics.registry.counter_func(
+    "bot_result_cache_misses_total", "Промахов кэша результатов", lambda: result_cache.stats()["misses"])
+metrics.registry.gauge("bot_log_dropped", "Записей журнала, отброшенных при переполнении", lambda: queue_handler.dropped)
+
+
+def _handler_labels(user_id, message):
+    # метки метрики времени обработки: FSM задания, её состояние и действие пользователя
+    session = sessions.get(user_id)
+    if session is None:
+        fsm, state = "none", "new"
+    elif session.fsm is None:
+        fsm, state = "main", session.state
+    else:
+        fsm, state = type(session.fsm).__name__, session.fsm.state
+    text = message.text
+    if text is None:
+        action = message.content_type
+    elif text.startswith("/"):
+        command = text.split(maxsplit=1)[0]
+        action = command if command in COMMANDS else "command"
+    else:
+        text = text.strip()
+        action = text if text in BUTTONS else "input"
+        if action == "input":
+            metrics.observe_input("text", len(text))
+    return fsm, state, action
+
+
+def _handle_and_persist(handler, user_id, update):
+    # после обработки изменившаяся сессия сериализуется здесь же, в потоке пользователя;
+    # на диск её снимок попадёт в фоне
+    labels = _handler_labels(user_id, update)
+    started = time.perf_counter()
+    try:
+        handler(update)
+    finally:
+        metrics.observe_handler(*labels, time.perf_counter() - started)
+        sessions.mark_dirty(user_id)
+
+
+def per_user(handler):
+    # передаёт обработку сообщения в очередь пользователя вместо выполнения в потоке опроса
+    @functools.wraps(handler)
+    def wrapper(message):
+        user_id = message.from_user.id
+        if not executor.submit(user_id, _handle_and_persist, handler, user_id, message, timeout=SUBMIT_TIMEOUT):
+            logger.warning(f"Очередь обработки переполнена, сообщение пользователя {user_id} отброшено")
+    return wrapper
+
+
+def per_user_callback(handler):
+    # то же для нажатий inline-кнопок: порядок сохраняется вместе с сообщениями пользователя
+    @functools.wraps(handler)
+    def wrapper(call):
+        user_id = call.from_user.id
+        if not executor.submit(user_id, handler, call, timeout=SUBMIT_TIMEOUT):
+            logger.warning(f"Очередь обработки переполнена, нажатие кнопки пользователем {user_id} отброшено")
+    return wrapper
+
+
+# вычисления, выполняющиеся в отдельных процессах: user_id -> (задание, FSM, запустившая его)
+computations = {}
+computations_lock = threading.Lock()
+
+
+def start_computation(user_id, fsm, request):
+    # запускает вычисление в отдельном процессе; ответ придёт, когда оно закончится
+    with computations_lock:
+        running = computations.get(user_id)
+    if running is not None:
+        if running[1] is fsm and running[0].request.key == request.key:
+            safe_send_message(user_id, Messages.COMPUTE_ALREADY_RUNNING)
+            return
+        running[0].cancel()
+    safe_send_chat_action(user_id, "typing")
+    metrics.observe_input("compute", request.size)
+    job = offloader.submit(
+        request,
+        on_done=functools.partial(_computation_done, user_id, fsm),
+        on_slow=functools.partial(safe_send_message, user_id, Messages.COMPUTE_STILL_RUNNING),
+    )
+    if job is None:
+        # исполнитель перегружен или остановлен - считаем в текущем потоке
+        try:
+            response = request.complete(request.run())
+        except Exception as e:
+            response = request.fail(e)
+        finish_computation(user_id, fsm, response)
+        return
+    with computations_lock:
+        computations[user_id] = (job, fsm)
 
 
-def get_task5_actions():
-    kb = ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=False)
-    kb.row("Ввести вручную", "Сгенерировать")
-    kb.row("Выполнить", "Результат")
-    kb.row("Назад")
-    return kb
+def cancel_computation(user_id):
+    # отменяет вычисление пользователя (при выходе из задания или перезапуске)
+    with computations_lock:
+        running = computations.pop(user_id, None)
+    if running is not None:
+        running[0].cancel()
 
 
-def get_task8_actions():
-    kb = ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=False)
-    kb.row("Ввести вручную", "Сгенерировать")
-    kb.row("Выполнить", "Результат")
-    kb.row("Назад")
-    return kb
+def _computation_done(user_id, fsm, result, error):
+    # вызывается в потоке исполнителя: результат применяется в очереди пользователя,
+    # чтобы состояние сессии менялось только из одного потока
+    if isinstance(error, ComputeCancelledError):
+        return
+    if not executor.submit(user_id, _apply_computation, user_id, fsm, result, error, timeout=SUBMIT_TIMEOUT):
+        logger.warning(f"Очередь обработки переполнена, результат вычисления пользователя {user_id} отброшен")
+
+
+def _apply_computation(user_id, fsm, result, error):
+    with computations_lock:
+        running = computations.get(user_id)
+        if running is None or running[1] is not fsm:
+            return  # пользователь вышел из задания
+        job = computations.pop(user_id)[0]
+    if isinstance(error, (ComputeTimeoutError, ComputeFailedError)):
+        logger.warning(f"Вычисление пользователя {user_id} не выполнено: {error!r}")
+    response = job.request.fail(error) if error is not None else job.request.complete(result)
+    sessions.mark_dirty(user_id)
+    finish_computation(user_id, fsm, response)
+
+
+def finish_computation(user_id, fsm, response):
+    session = sessions.get(user_id)
+    delivery.deliver(user_id, response)
+    if session is not None and session.fsm is fsm:
+        send_prompt(user_id, Messages.NEXT_ACTION_PROMPT, session.state, session)
+
+
+def send_prompt(user_id, text, keyboard, session):
+    # сообщение с клавиатурой; клавиатура, которую пользователь уже видит, повторно не отправляется
+    markup = markup_for(session, keyboard)
+    if markup is None or session is None:
+        safe_send_message(user_id, text, reply_markup=markup)
+        return
+    # сообщение не дошло - клавиатура не показана, следующее сообщение отправит её снова
+    if not outbound.send_message(user_id, text, reply_markup=markup,
+                                 on_error=lambda error: forget_shown(session, keyboard)):
+        forget_shown(session, keyboard)
 
 
 @bot.message_handler(commands=['start'])
+@per_user
 def start(message):
     user_id = message.from_user.id
     username = message.from_user.username or "unknown"
@@ -116,11 +369,13 @@ def start(message):
         'username': username,
         'action': "Пользователь запустил бота (/start)"
     })
-    sessions[user_id] = {"state": "main_menu", "fsm": None}
-    safe_send_message(user_id, Messages.GREETING, reply_markup=get_main_keyboard())
+    cancel_computation(user_id)
+    session = sessions.create(user_id)
+    send_prompt(user_id, Messages.GREETING, MAIN, session)
 
 
 @bot.message_handler(commands=['help'])
+@per_user
 def help_command(message):
     # отправляет справку по командам
     user_id = message.from_user.id
@@ -134,71 +389,128 @@ def help_command(message):
         "2. Нажмите «Ввести вручную» или «Сгенерировать»\n"
         "3. Выполните алгоритм\n"
         "4. Посмотрите результат\n\n"
+        "Данные можно прислать файлом (до 20 МБ):\n"
+        "• .txt - как при ручном вводе (массивы через ';')\n"
+        "• .csv - по столбцу на массив\n"
+        "• .npy - массив NumPy из целых чисел\n"
+        "Для задания 5 цель можно указать в подписи к файлу\n\n"
         "Используйте кнопки - они упрощают работу!"
     )
     safe_send_message(user_id, help_text, reply_markup=None)
 
 
+@bot.callback_query_handler(func=lambda call: (call.data or "").startswith(PAGE_CALLBACK_PREFIX))
+@per_user_callback
+def turn_page(call):
+    # листание длинного результата кнопками ◀ / ▶
+    delivery.show_page(call)
+
+
+@bot.message_handler(content_types=['document'])
+@per_user
+def handle_document(message):
+    # массивы из файла: скачивание и разбор - в пуле загрузок, результат применяется в очереди пользователя
+    user_id = message.from_user.id
+    username = message.from_user.username or "unknown"
+    document = message.document
+
+    session = sessions.get(user_id)
+    if session is None or session.fsm is None:
+        if session is None:
+            session = sessions.create(user_id)
+        send_prompt(user_id, Messages.DOCUMENT_CHOOSE_TASK, MAIN, session)
+        return
+    if os.path.splitext(document.file_name or "")[1].lower() not in FILE_EXTENSIONS:
+        safe_send_message(user_id, Messages.DOCUMENT_UNSUPPORTED)
+        return
+
+    logger.info("", extra={
+        'user_id': user_id,
+        'username': username,
+        'action': f"Пользователь отправил файл '{document.file_name}' ({document.file_size} байт)"
+    })
+    metrics.observe_input("document", document.file_size or 0)
+    safe_send_chat_action(user_id, "typing")
+    if not uploads.submit(user_id, _read_document, user_id, session.fsm, message, timeout=SUBMIT_TIMEOUT):
+        logger.warning(f"Очередь загрузок переполнена, файл пользователя {user_id} отброшен")
+        safe_send_message(user_id, Messages.DOCUMENT_FAILED)
+
+
+def _read_document(user_id, fsm, message):
+    # поток загрузок: скачивание и разбор не занимают шард, в котором ждут сообщения других пользователей
+    arrays = error = None
+    try:
+        with downloader.download(message.document) as path:
+            arrays = read_file_arrays(path, message.document.file_name)
+    except InvalidInputError as e:
+        error = f"{Messages.INVALID_INPUT}: {e}"
+    except Exception as e:
+        logger.error(f"Ошибка загрузки файла у пользователя {user_id}: {e}", exc_info=True)
+        error = Messages.DOCUMENT_FAILED
+    if not executor.submit(user_id, _apply_document, user_id, fsm, arrays, message.caption, error,
+                           timeout=SUBMIT_TIMEOUT):
+        logger.warning(f"Очередь обработки переполнена, файл пользователя {user_id} отброшен")
+
+
+def _apply_document(user_id, fsm, arrays, caption, error):
+    # очередь пользователя: данные попадают в FSM, только если пользователь не вышел из задания
+    session = sessions.get(user_id)
+    if session is None or session.fsm is not fsm:
+        safe_send_message(user_id, Messages.DOCUMENT_STALE)
+        return
+    response = error
+    if response is None:
+        try:
+            response = fsm.load_arrays(arrays, caption)
+        except InvalidInputError as e:
+            response = f"{Messages.INVALID_INPUT}: {e}"
+        except Exception as e:
+            logger.error(f"Ошибка загрузки файла у пользователя {user_id}: {e}", exc_info=True)
+            response = Messages.DOCUMENT_FAILED
+        sessions.mark_dirty(user_id)
+    delivery.deliver(user_id, response)
+    send_prompt(user_id, Messages.NEXT_ACTION_PROMPT, session.state, session)
+
+
 @bot.message_handler(func=lambda m: True)
+@per_user
 def handle_message(message):
     user_id = message.from_user.id
     username = message.from_user.username or "unknown"
     text = message.text.strip()
 
-    if user_id not in sessions:
+    session = sessions.get(user_id)
+    if session is None:
         logger.info("", extra={
             'user_id': user_id,
             'username': username,
             'action': "Новый пользователь"
         })
-        sessions[user_id] = {"state": "main_menu", "fsm": None}
-        safe_send_message(user_id, Messages.MAIN_MENU_PROMPT, reply_markup=get_main_keyboard())
+        session = sessions.create(user_id)
+        send_prompt(user_id, Messages.MAIN_MENU_PROMPT, MAIN, session)
         return
 
-    session = sessions[user_id]
-
-    if session["state"] == "main_menu":
-        if text == "Задание 1":
-            logger.info("", extra={
-                'user_id': user_id,
-                'username': username,
-                'action': "Пользователь выбрал Задание 1"
-            })
-            fsm = Task1FSM()
-            sessions[user_id] = {"state": "task1", "fsm": fsm}
-            safe_send_message(user_id, Messages.TASK1_DESCRIPTION)
-            safe_send_message(user_id, Messages.ACTION_PROMPT, reply_markup=get_task1_actions())
-
-        elif text == "Задание 5":
-            logger.info("", extra={
-                'user_id': user_id,
-                'username': username,
-                'action': "Пользователь выбрал Задание 5"
-            })
-            fsm = Task5FSM()
-            sessions[user_id] = {"state": "task5", "fsm": fsm}
-            safe_send_message(user_id, Messages.TASK5_DESCRIPTION)
-            safe_send_message(user_id, Messages.ACTION_PROMPT, reply_markup=get_task5_actions())
-
-        elif text == "Задание 8":
+    if session.state == MAIN:
+        entry = transitions.lookup(MAIN, text)
+        task = transitions.task_of(entry[1]) if entry is not None else None
+        if task in task_registry:
             logger.info("", extra={
                 'user_id': user_id,
                 'username': username,
-                'action': "Пользователь выбрал Задание 8"
+                'action': f"Пользователь выбрал {text}"
             })
-            fsm = Task8FSM()
-            sessions[user_id] = {"state": "task8", "fsm": fsm}
-            safe_send_message(user_id, Messages.TASK8_DESCRIPTION)
-            safe_send_message(user_id, Messages.ACTION_PROMPT, reply_markup=get_task8_actions())
+            session.reset(task, task_registry.get(task)())
+            safe_send_message(user_id, TASKS[task][1])
+            send_prompt(user_id, Messages.ACTION_PROMPT, task, session)
 
-        elif text == "Все задания":
+        elif entry is not None and entry[0] == "to_all_tasks":
             logger.info("", extra={
                 'user_id': user_id,
                 'username': username,
                 'action': "Пользователь запросил все задания"
             })
             safe_send_message(user_id, Messages.ALL_TASKS_DESCRIPTION)
-            safe_send_message(user_id, Messages.MAIN_MENU_PROMPT, reply_markup=get_main_keyboard())
+            send_prompt(user_id, Messages.MAIN_MENU_PROMPT, MAIN, session)
 
         else:
             logger.info("", extra={
@@ -206,56 +518,99 @@ def handle_message(message):
                 'username': username,
                 'action': f"Пользователь отправил неизвестную команду: '{text}'"
             })
-            safe_send_message(user_id, Messages.INVALID_MAIN_CHOICE, reply_markup=get_main_keyboard())
+            send_prompt(user_id, Messages.INVALID_MAIN_CHOICE, MAIN, session)
 
     else:
-        fsm = session["fsm"]
+        fsm = session.fsm
         try:
+            # сессия могла быть восстановлена из хранилища до первой загрузки задания
+            task_registry.get(session.state)
             response = fsm.handle(text)
 
-            if response == "exit":
+            if isinstance(response, ComputeRequest):
+                # большие массивы: вычисление в отдельном процессе, поток обработки не занят
+                start_computation(user_id, fsm, response)
+            elif response == EXIT:
                 logger.info("", extra={
                     'user_id': user_id,
                     'username': username,
                     'action': "Пользователь вернулся в главное меню"
                 })
-                sessions[user_id] = {"state": "main_menu", "fsm": None}
-                safe_send_message(user_id, Messages.BACK_TO_MAIN, reply_markup=get_main_keyboard())
+                cancel_computation(user_id)
+                session.reset()
+                send_prompt(user_id, Messages.BACK_TO_MAIN, MAIN, session)
             else:
                 # анимация "печатает..." для действий, требующих обработки
-                if "Сгенерировано" in response or "Результат:" in response or "выполнен" in response.lower():
+                if isinstance(response, Report) or "выполнен" in response.lower():
                     safe_send_chat_action(user_id, "typing")
-                    time.sleep(0.4)
 
-                safe_send_message(user_id, response)
+                # длинные ответы с массивами - по страницам или файлом
+                delivery.deliver(user_id, response)
 
                 current_state = fsm.state
                 if current_state == "menu":
-                    prompt_msg = Messages.NEXT_ACTION_PROMPT
-                    if session["state"] == "task1":
-                        safe_send_message(user_id, prompt_msg, reply_markup=get_task1_actions())
-                    elif session["state"] == "task5":
-                        safe_send_message(user_id, prompt_msg, reply_markup=get_task5_actions())
-                    elif session["state"] == "task8":
-                        safe_send_message(user_id, prompt_msg, reply_markup=get_task8_actions())
+                    send_prompt(user_id, Messages.NEXT_ACTION_PROMPT, session.state, session)
 
         except Exception as e:
             logger.error(f"Ошибка у пользователя {user_id} (@{username}): {e}", exc_info=True)
             safe_send_message(user_id, f"{Messages.INVALID_INPUT}: {e}")
-            if session["state"] == "task1":
-                safe_send_message(user_id, Messages.ACTION_PROMPT, reply_markup=get_task1_actions())
-            elif session["state"] == "task5":
-                safe_send_message(user_id, Messages.ACTION_PROMPT, reply_markup=get_task5_actions())
-            elif session["state"] == "task8":
-                safe_send_message(user_id, Messages.ACTION_PROMPT, reply_markup=get_task8_actions())
+            send_prompt(user_id, Messages.ACTION_PROMPT, session.state, session)
             return
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telegram-бот для заданий по обработке массивов")
+    parser.add_argument("--webhook", metavar="URL",
+                        help="принимать обновления на этот публичный HTTPS-адрес вместо опроса getUpdates")
+    args = parser.parse_args()
+
+    log_listener.start()
     logger.info("ЗАПУСК TELEGRAM-БОТА")
+    outbound.start()
+    executor.start()
+    uploads.start()
+    offloader.start()
+    snapshot_writer.start()
+    metrics_server = None
+    if METRICS_PORT is not None:
+        try:
+            metrics_server = MetricsServer(metrics.registry, METRICS_HOST, METRICS_PORT, logger=logger).start()
+        except OSError as e:
+            logger.warning(f"Сервер метрик не запущен ({METRICS_HOST}:{METRICS_PORT}): {e}")
+    webhook = None
     try:
-        bot.polling(none_stop=True)
+        if args.webhook:
+            webhook = WebhookServer(
+                bot, WEBHOOK_LISTEN, WEBHOOK_PORT, urlsplit(args.webhook).path or "/",
+                secret_token=secrets.token_urlsafe(32), queue_size=WEBHOOK_QUEUE_SIZE,
+                certfile=WEBHOOK_CERT, keyfile=WEBHOOK_KEY, logger=logger,
+            )
+            metrics.registry.gauge("bot_webhook_pending", "Обновлений webhook в очереди", webhook.pending)
+            metrics.registry.gauge("bot_webhook_rejected", "Обновлений webhook, отклонённых при переполнении",
+                                   lambda: webhook.rejected)
+            webhook.set_webhook(args.webhook)
+            logger.info(f"Обновления принимаются через webhook: {args.webhook}")
+            webhook.serve_forever()
+        else:
+            try:
+                # getUpdates не работает, пока установлен webhook (например, после запуска с --webhook)
+                bot.remove_webhook()
+            except Exception as e:
+                logger.warning(f"Не удалось удалить webhook: {e}")
+            bot.polling(none_stop=True)
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
     except Exception as e:
-        logger.critical("КРИТИЧЕСКАЯ ОШИБКА: Бот завершил работу с ошибкой", exc_info=True)
\ No newline at end of file
+        logger.critical("КРИТИЧЕСКАЯ ОШИБКА: Бот завершил работу с ошибкой", exc_info=True)
+    finally:
+        if webhook is not None:
+            webhook.shutdown()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        uploads.shutdown(wait=True)
+        offloader.shutdown(wait=True)
+        executor.shutdown(wait=True)
+        sessions.close()
+        outbound.shutdown()
+        snapshot_writer.shutdown()
+        log_listener.stop()
\ No newline at end of file
@@ -0,0 +1,402 @@
+"""Метрики работы бота в формате Prometheus
+
+- Counter, Histogram - счётчики и гистограммы с метками; наблюдение - одно
+  сложение (и bisect по границам корзин) под короткой блокировкой, поэтому
+  сбор можно не выключать в рабочем режиме
+- Registry - набор метрик и «датчиков» (gauge): функций, значение которых
+  читается только при выдаче метрик (длины очередей, число сессий);
+  счётчик, который ведёт сам компонент (попадания в кэш), выдаётся как
+  counter через counter_func
+- MetricsServer - локальный HTTP-сервер, GET /metrics отдаёт текстовый формат
+  Prometheus; без запросов не расходует процессор
+- SnapshotWriter - раз в interval секунд записывает все метрики в JSON-файл
+  (атомарно, через временный файл)
+- BotMetrics - метрики бота: время обработчиков по заданию, состоянию FSM и
+  действию, время и ошибки вызовов Bot API, размеры входных данных, пачки
+  входящих обновлений и отброшенные повторы
+
+Пример:
+    metrics = BotMetrics()
+    metrics.registry.gauge("bot_sessions_active", "Сессий в памяти", lambda: len(sessions))
+    MetricsServer(metrics.registry, port=9108).start()
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# границы корзин времени, сек
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# границы корзин размеров (символов, байт, элементов)
+SIZE_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+# границы корзин размеров пачек обновлений (getUpdates отдаёт до 100)
+BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик с метками
+
+    Attributes:
+        name (str): Имя метрики
+        help (str): Описание
+        labels (tuple[str]): Имена меток
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}  # значения меток -> число
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        # [(имя, метки, значение)] для выдачи
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _label_text(self.labels, values), value) for values, value in items]
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(zip(self.labels, values)), "value": value} for values, value in self._values.items()]
+
+
+class FunctionCounter:
+    """Счётчик без меток, значение которого ведёт другой компонент
+
+    Значение читается функцией при выдаче метрик; функция должна возвращать
+    неубывающее число (например, число попаданий в кэш с момента запуска)
+
+    Attributes:
+        name (str): Имя метрики (с суффиксом _total)
+        help (str): Описание
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help, func):
+        self.name = name
+        self.help = help
+        self._func = func
+
+    def _read(self):
+        try:
+            return self._func()
+        except Exception:
+            return None  # компонент недоступен (например, уже остановлен)
+
+    def samples(self):
+        value = self._read()
+        return [] if value is None else [(self.name, "", value)]
+
+    def snapshot(self):
+        value = self._read()
+        return [] if value is None else [{"labels": {}, "value": value}]
+
+
+class Histogram:
+    """Гистограмма с метками: количество наблюдений по корзинам, сумма и число
+
+    Attributes:
+        name (str): Имя метрики
+        help (str): Описание
+        labels (tuple[str]): Имена меток
+        buckets (tuple[float]): Верхние границы корзин (по возрастанию)
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # значения меток -> [счётчики корзин..., +Inf, сумма]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        # контекстный менеджер: измеряет время блока with
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            items = [(values, list(series)) for values, series in self._series.items()]
+        result = []
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                result.append((f"{self.name}_bucket", _label_text(self.labels, values, f'le="{_number(bound)}"'),
+                               cumulative))
+            labels = _label_text(self.labels, values)
+            result.append((f"{self.name}_sum", labels, series[-1]))
+            result.append((f"{self.name}_count", labels, cumulative))
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            items = [(values, list(series)) for values, series in self._series.items()]
+        return [
+            {"labels": dict(zip(self.labels, values)), "count": sum(series[:-1]), "sum": series[-1],
+             "buckets": dict(zip(map(_number, self.buckets + (float("inf"),)), series[:-1]))}
+            for values, series in items
+        ]
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class Registry:
+    """Набор метрик и датчиков"""
+
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []  # (имя, описание, функция)
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def counter_func(self, name, help, func):
+        # счётчик, который ведёт сам компонент: func() вызывается при каждой выдаче метрик
+        return self._add(FunctionCounter(name, help, func))
+
+    def gauge(self, name, help, func):
+        # датчик: func() вызывается при каждой выдаче метрик
+        with self._lock:
+            self._gauges.append((name, help, func))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def _read_gauges(self):
+        values = []
+        for name, help, func in self._gauges:
+            try:
+                values.append((name, help, func()))
+            except Exception:
+                continue  # датчик недоступен (например, компонент уже остановлен)
+        return values
+
+    def render(self):
+        """Текстовый формат Prometheus (text/plain; version=0.0.4)
+
+        Returns:
+            str: Все метрики и датчики
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        for name, help, value in self._read_gauges():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Все метрики в виде словаря (для JSON)
+
+        Returns:
+            dict: time, metrics (имя -> ряды), gauges (имя -> значение)
+        """
+        return {
+            "time": time.time(),
+            "metrics": {metric.name: metric.snapshot() for metric in self._metrics},
+            "gauges": {name: value for name, _, value in self._read_gauges()},
+        }
+
+
+class MetricsServer:
+    """HTTP-сервер метрик: GET /metrics
+
+    Attributes:
+        registry (Registry): Выдаваемые метрики
+    """
+
+    def __init__(self, registry, host="127.0.0.1", port=9108, logger=None):
+        self.registry = registry
+        self._logger = logger or logging.getLogger(__name__)
+        self._server = ThreadingHTTPServer((host, port), _handler(registry))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+        self._logger.debug(f"Метрики доступны на http://{self.address[0]}:{self.address[1]}/metrics")
+        return self
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _handler(registry):
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            data = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # запросы сборщика метрик в журнал бота не пишем
+
+    return Handler
+
+
+class SnapshotWriter:
+    """Периодическая запись метрик в JSON-файл
+
+    Attributes:
+        path (str): Файл снимка
+        interval (float): Период записи, сек
+    """
+
+    def __init__(self, registry, path="metrics.json", interval=60, logger=None):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._logger = logger or logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def shutdown(self):
+        # последний снимок - при остановке
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._write_safely()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write_safely()
+
+    def _write_safely(self):
+        try:
+            self.write()
+        except OSError as e:
+            self._logger.warning(f"Не удалось записать снимок метрик {self.path}: {e}")
+
+
+class BotMetrics:
+    """Метрики бота
+
+    Attributes:
+        registry (Registry): Реестр, в котором они зарегистрированы
+        handler_seconds (Histogram): Время обработки обновления: fsm, state, action
+        api_seconds (Histogram): Время вызова Bot API: method
+        api_errors (Counter): Ошибки Bot API: method, code
+        input_size (Histogram): Размер входных данных: kind (text - символов, document - байт,
+            compute - элементов в вычислении)
+        update_batch (Histogram): Обновлений в одной пачке (getUpdates или webhook)
+        updates_dropped (Counter): Отброшенные обновления: reason (duplicate, superseded, repeated)
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry or Registry()
+        self.handler_seconds = self.registry.histogram(
+            "bot_handler_seconds", "Время обработки обновления", ("fsm", "state", "action"))
+        self.api_seconds = self.registry.histogram(
+            "bot_api_call_seconds", "Время вызова Bot API", ("method",))
+        self.api_errors = self.registry.counter(
+            "bot_api_errors_total", "Ошибки вызовов Bot API", ("method", "code"))
+        self.input_size = self.registry.histogram(
+            "bot_input_size", "Размер входных данных", ("kind",), buckets=SIZE_BUCKETS)
+        self.update_batch = self.registry.histogram(
+            "bot_update_batch_size", "Обновлений в пачке", buckets=BATCH_BUCKETS)
+        self.updates_dropped = self.registry.counter(
+            "bot_updates_dropped_total", "Отброшенные повторные и перекрытые обновления", ("reason",))
+
+    def observe_handler(self, fsm, state, action, seconds):
+        self.handler_seconds.observe(seconds, fsm, state, action)
+
+    def observe_api_call(self, method, seconds, error_code=None):
+        self.api_seconds.observe(seconds, method)
+        if error_code is not None:
+            self.api_errors.inc(method, str(error_code))
+
+    def observe_input(self, kind, size):
+        self.input_size.observe(size, kind)
+
+    def observe_batch(self, size):
+        self.update_batch.observe(size)
+
+    def observe_dropped_update(self, reason):
+        self.updates_dropped.inc(reason)
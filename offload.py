@@ -0,0 +1,492 @@
+"""Выполнение тяжёлых вычислений в отдельных процессах
+
+Большой расчёт в обработчике сообщения занимает поток шарда (и GIL) на всё время
+вычисления. ProcessOffloader выполняет такие расчёты в пуле процессов:
+
+- Каждым процессом-исполнителем управляет свой поток-надзиратель; задания берутся
+  из общей ограниченной очереди. Надзиратель только ждёт ответа процесса
+  (poll без GIL), поэтому опрос Telegram и обработка сообщений не замедляются
+- Процессы запускаются командой `python -m offload`, а не через fork/spawn
+  multiprocessing: при spawn дочерний процесс заново выполняет main.py, который
+  создаёт бота и открывает хранилище сессий. Связь - multiprocessing.connection
+  с ключом аутентификации
+- Массивы передаются через multiprocessing.shared_memory. Копий ровно две:
+  родитель один раз копирует входные массивы из своей памяти в общий блок
+  (array('q') - напрямую, список сначала упаковывается в array('q')) прямо в
+  submit - это снимок данных, по которым посчитан ключ кэша: изменения массивов
+  в контексте, пока задание ждёт в очереди, на вычисление не влияют, а готовый
+  результат-массив - из блока в array('q'). Процесс-исполнитель копий не делает:
+  функция получает представления memoryview формата "q" прямо на блок, блок
+  остаётся подключённым, пока функция работает. Результат-массив процесс пишет
+  в блок, заранее выделенный родителем. По каналу идут только имя функции,
+  имена блоков, длины и параметры
+- У каждого задания есть ограничение времени: по его истечении процесс убивается
+  и перезапускается, задание завершается ComputeTimeoutError. Так же прерывается
+  отменённое задание (ComputeJob.cancel)
+- Если задание выполняется дольше slow_after секунд, вызывается on_slow
+
+Пример:
+    offloader = ProcessOffloader(workers=2, timeout=60).start()
+    offloader.submit(request, on_done=lambda result, error: ...)
+"""
+
+import gc
+import itertools
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from tasks.errors import ComputeCancelledError, ComputeFailedError, ComputeTimeoutError
+
+ITEM_SIZE = array("q").itemsize
+# как часто надзиратель проверяет отмену задания, сек
+POLL_INTERVAL = 0.25
+# сколько ждать запуска процесса-исполнителя, сек
+START_TIMEOUT = 30
+# переменная окружения с ключом аутентификации для процесса-исполнителя
+_AUTHKEY_ENV = "OFFLOAD_AUTHKEY"
+# каталог, из которого запускаются процессы (чтобы находился пакет tasks)
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+# маркер остановки надзирателя
+_STOP = object()
+
+
+class ComputeJob:
+    """Задание, принятое исполнителем
+
+    Attributes:
+        request (tasks.compute.ComputeRequest): Что вычислить
+        timeout (float): Ограничение времени, сек
+    """
+
+    __slots__ = ("request", "timeout", "_on_done", "_on_slow", "_cancelled", "_layout", "_shm_in")
+
+    def __init__(self, request, on_done, on_slow=None, timeout=None):
+        self.request = request
+        self.timeout = timeout
+        self._on_done = on_done
+        self._on_slow = on_slow
+        self._cancelled = threading.Event()
+        # снимок входных массивов (см. _share_arrays), делается при постановке в очередь
+        self._layout, self._shm_in = _share_arrays(request.arrays)
+
+    def _release(self):
+        # освобождает блок со снимком входных данных (вызывается один раз, по завершении)
+        if self._shm_in is not None:
+            _free(self._shm_in)
+            self._shm_in = None
+
+    def cancel(self):
+        # прерывает задание (процесс, выполняющий его, будет перезапущен)
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class ProcessOffloader:
+    """Пул процессов для тяжёлых вычислений с ограничением времени и отменой
+
+    Входные массивы копируются в общую память один раз (в submit), функция в процессе читает
+    их оттуда без копирования; результат-массив копируется из общей памяти один раз
+
+    Attributes:
+        workers (int): Количество процессов
+        queue_size (int): Максимальное количество ожидающих заданий
+        timeout (float): Ограничение времени одного задания по умолчанию, сек
+        slow_after (float): Через сколько секунд вызывается on_slow, сек
+    """
+
+    def __init__(self, workers=2, queue_size=64, timeout=120, slow_after=5, logger=None):
+        if workers <= 0 or queue_size <= 0:
+            raise ValueError("workers и queue_size должны быть положительными")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.slow_after = slow_after
+        self._logger = logger or logging.getLogger(__name__)
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._authkey = os.urandom(32)
+        self._ids = itertools.count()
+        self._tmp_dir = None
+        self._threads = []
+        self._running = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        # запускает надзирателей; процессы стартуют в их потоках (повторный вызов ничего не делает)
+        with self._lock:
+            if self._threads:
+                return self
+            self._tmp_dir = tempfile.mkdtemp(prefix="offload-")
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._supervise, name=f"offload-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, request, on_done, on_slow=None, timeout=None):
+        """Ставит вычисление в очередь
+
+        on_done(result, error) и on_slow() вызываются в потоке надзирателя
+        Входные массивы копируются в общую память здесь же: процесс получит их
+        такими, какими они были при вызове submit
+
+        Args:
+            request (tasks.compute.ComputeRequest): Что вычислить
+            on_done (callable): Вызывается по завершении: (результат, None) или (None, исключение)
+            on_slow (callable | None): Вызывается, если задание выполняется дольше slow_after
+            timeout (float | None): Ограничение времени (по умолчанию self.timeout)
+
+        Returns:
+            ComputeJob | None: Принятое задание; None, если очередь заполнена или пул не запущен
+        """
+        if self._closed or not self._threads or self._jobs.full():
+            return None
+        try:
+            job = ComputeJob(request, on_done, on_slow, timeout or self.timeout)
+        except OSError:
+            self._logger.error("Не удалось выделить общую память для вычисления", exc_info=True)
+            return None
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            job._release()
+            return None
+        return job
+
+    def pending(self):
+        # количество заданий, ожидающих процесса
+        return self._jobs.qsize()
+
+    def shutdown(self, wait=True):
+        """Останавливает пул: выполняемые и ожидающие задания отменяются
+
+        Args:
+            wait (bool): Дождаться остановки процессов
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+            running = list(self._running)
+        for job in running:
+            job.cancel()
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(job, None, ComputeCancelledError())
+        for _ in threads:
+            self._jobs.put(_STOP)
+        if wait:
+            for thread in threads:
+                thread.join()
+            if self._tmp_dir:
+                shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def _supervise(self):
+        # цикл надзирателя: один процесс, задания выполняются по одному
+        worker = self._spawn()
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                break
+            if job.cancelled:
+                # отменено, пока ждало в очереди: процесс ещё не занят
+                self._finish(job, None, ComputeCancelledError())
+                continue
+            with self._lock:
+                self._running.add(job)
+            result = error = None
+            started = time.monotonic()
+            try:
+                if worker is None:
+                    worker = _WorkerProcess(self._new_address(), self._authkey)
+                result = self._run(worker, job)
+            except (ComputeTimeoutError, ComputeCancelledError) as e:
+                error = e
+                worker = self._restart(worker)
+            except (EOFError, OSError) as e:
+                # процесс завершился аварийно (например, не хватило памяти)
+                self._logger.error(f"Процесс-исполнитель завершился во время вычисления: {e!r}")
+                error = ComputeFailedError(str(e))
+                worker = self._restart(worker)
+            except Exception as e:
+                error = e
+            finally:
+                with self._lock:
+                    self._running.discard(job)
+            self._logger.debug(
+                f"Вычисление {getattr(job.request.func, '__name__', job.request.func)} "
+                f"({job.request.size} эл.) за {time.monotonic() - started:.2f} сек: "
+                f"{'успешно' if error is None else type(error).__name__}"
+            )
+            self._finish(job, result, error)
+        if worker is not None:
+            worker.stop()
+
+    def _spawn(self):
+        try:
+            return _WorkerProcess(self._new_address(), self._authkey)
+        except Exception:
+            self._logger.error("Не удалось запустить процесс-исполнитель", exc_info=True)
+            return None
+
+    def _restart(self, worker):
+        # убивает процесс (он мог не закончить вычисление) и запускает новый
+        if worker is not None:
+            worker.kill()
+        return None if self._closed else self._spawn()
+
+    def _new_address(self):
+        if sys.platform == "win32":
+            return rf"\\.\pipe\offload-{os.getpid()}-{next(self._ids)}"
+        return os.path.join(self._tmp_dir, f"worker{next(self._ids)}.sock")
+
+    def _run(self, worker, job):
+        # передаёт задание процессу через общую память и ждёт ответа
+        request = job.request
+        shm_in = job._shm_in
+        shm_out = None
+        try:
+            if request.result_items is not None:
+                shm_out = shared_memory.SharedMemory(create=True, size=max(1, request.result_items * ITEM_SIZE))
+            worker.conn.send((
+                request.func, shm_in and shm_in.name, job._layout, request.params,
+                shm_out and shm_out.name, request.result_items,
+            ))
+            status, value = self._wait(worker, job)
+            if status == "error":
+                raise value
+            if status == "array":
+                # единственная копия результата: блок удаляется сразу после ответа
+                result = array("q")
+                result.frombytes(shm_out.buf[:value * ITEM_SIZE])
+                return result
+            return value
+        finally:
+            if shm_out is not None:
+                _free(shm_out)
+
+    def _wait(self, worker, job):
+        # ждёт ответа, проверяя отмену, ограничение времени и порог "ещё считается"
+        start = time.monotonic()
+        deadline = start + job.timeout
+        slow_at = start + self.slow_after if job._on_slow is not None else None
+        while True:
+            if job.cancelled:
+                raise ComputeCancelledError()
+            now = time.monotonic()
+            if now >= deadline:
+                raise ComputeTimeoutError(f"{job.timeout:g}")
+            if slow_at is not None and now >= slow_at:
+                slow_at = None
+                self._notify(job._on_slow)
+            wake = min(deadline, now + POLL_INTERVAL, slow_at or deadline)
+            if worker.conn.poll(max(0.0, wake - now)):
+                return worker.conn.recv()
+
+    def _finish(self, job, result, error):
+        job._release()
+        self._notify(job._on_done, result, error)
+
+    def _notify(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception:
+            self._logger.error("Ошибка в обработчике завершения вычисления", exc_info=True)
+
+
+class _WorkerProcess:
+    """Процесс-исполнитель и соединение с ним"""
+
+    def __init__(self, address, authkey):
+        env = dict(os.environ)
+        env[_AUTHKEY_ENV] = authkey.hex()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "offload", address],
+            cwd=_ROOT, env=env, stdout=subprocess.PIPE, text=True,
+        )
+        # процесс сообщает о готовности строкой в stdout; пустая строка - он завершился
+        timer = threading.Timer(START_TIMEOUT, self.process.kill)
+        timer.start()
+        try:
+            ready = self.process.stdout.readline().strip()
+        finally:
+            timer.cancel()
+        if ready != "ready":
+            self.kill()
+            raise ComputeFailedError("процесс-исполнитель не запустился")
+        self.conn = Client(address, authkey=authkey)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+        self._close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+        self._close()
+
+    def _close(self):
+        conn = getattr(self, "conn", None)
+        if conn is not None:
+            conn.close()
+        self.process.stdout.close()
+
+
+def _share_arrays(arrays):
+    # копирует массивы int64 в один блок общей памяти; массивы вне int64 передаются по каналу
+    layout = []
+    packed = []
+    for values in arrays:
+        if not (isinstance(values, array) and values.typecode == "q"):
+            try:
+                values = array("q", values)
+            except (OverflowError, TypeError):
+                layout.append(list(values))
+                continue
+        layout.append(len(values))
+        packed.append(values)
+    total = sum(len(values) for values in packed)
+    if not packed:
+        return layout, None
+    shm = shared_memory.SharedMemory(create=True, size=max(1, total * ITEM_SIZE))
+    offset = 0
+    for values in packed:
+        size = len(values) * ITEM_SIZE
+        shm.buf[offset:offset + size] = memoryview(values).cast("B")
+        offset += size
+    return layout, shm
+
+
+def _free(shm):
+    # блок родителя больше не нужен ни ему, ни процессу
+    shm.close()
+    shm.unlink()
+
+
+def _attach(name):
+    # подключение к блоку родителя; удалять блок - забота родителя
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            # иначе resource_tracker этого процесса удалит блок при его завершении
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _serve(conn):
+    # цикл процесса-исполнителя: задания выполняются по одному, до None или закрытия канала
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        func, in_name, layout, params, out_name, out_items = message
+        try:
+            conn.send(_execute(func, in_name, layout, params, out_name, out_items))
+        except Exception as e:
+            try:
+                conn.send(("error", e))
+            except Exception:
+                # исключение не сериализуется
+                conn.send(("error", RuntimeError(repr(e))))
+
+
+def _execute(func, in_name, layout, params, out_name, out_items):
+    # функция работает с массивами прямо в общем блоке: memoryview формата "q" без копирования
+    shm = _attach(in_name) if in_name is not None else None
+    views = []
+    arrays = []
+    offset = 0
+    for item in layout:
+        if isinstance(item, list):
+            arrays.append(item)
+            continue
+        raw = shm.buf[offset:offset + item * ITEM_SIZE]
+        views += [raw, raw.cast("q")]
+        arrays.append(views[-1])
+        offset += item * ITEM_SIZE
+    error = None
+    try:
+        result = func(*arrays, *params)
+        if isinstance(result, memoryview):
+            result = result.tolist()  # результат не должен ссылаться на блок
+    except Exception as e:
+        # traceback держит кадры функции, а с ними и представления блока
+        error = e.with_traceback(None)
+    del arrays
+    if shm is not None:
+        _release(views, shm)
+    if error is not None:
+        raise error
+    if out_name is None:
+        return "value", result
+    if isinstance(result, array) and result.typecode == "q":
+        packed = result
+    else:
+        try:
+            packed = array("q", result)
+        except (OverflowError, TypeError):
+            return "value", result
+    if len(packed) != out_items:
+        return "value", result
+    shm = _attach(out_name)
+    try:
+        shm.buf[:len(packed) * ITEM_SIZE] = memoryview(packed).cast("B")
+    finally:
+        shm.close()
+    return "array", len(packed)
+
+
+def _release(views, shm):
+    # представления освобождаются до отключения блока (иначе close() - BufferError);
+    # если на них ещё ссылается что-то, кроме циклов мусора, блок остаётся
+    # подключённым до завершения процесса - удаляет его всё равно родитель
+    for _ in range(2):
+        try:
+            for view in reversed(views):
+                view.release()
+            shm.close()
+            return
+        except BufferError:
+            gc.collect()
+
+
+def _worker_main(address):
+    # Ctrl+C в консоли получает вся группа процессов - останавливает исполнителей родитель
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    authkey = bytes.fromhex(os.environ.pop(_AUTHKEY_ENV))
+    with Listener(address, authkey=authkey) as listener:
+        print("ready", flush=True)
+        # дальше stdout никто не читает: случайный вывод не должен заполнить канал
+        sys.stdout = open(os.devnull, "w")
+        with listener.accept() as conn:
+            _serve(conn)
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1])
@@ -0,0 +1,341 @@
+"""Планировщик исходящих сообщений Telegram
+
+Все вызовы Bot API на отправку проходят через общую очередь:
+- Ограничение скорости "ведром токенов": глобально (~30 сообщений/с на бота)
+  и для каждого чата отдельно (~1 сообщение/с с небольшим запасом на всплеск)
+- Объединение подряд идущих текстов одного чата в одно сообщение
+  (например, описание задания + "Выберите действие:" с клавиатурой)
+- Ответ 429 Too Many Requests не теряет сообщение: оно возвращается в начало
+  очереди чата и отправляется после retry_after. До того же момента
+  приостанавливается и вся отправка бота: retry_after относится к боту целиком
+  (флуд-контроль Telegram), и вызовы в другие чаты тоже получили бы 429
+- Ответ 403 (пользователь заблокировал бота) - предупреждение в лог, сообщение отбрасывается
+- Вызов, который так и не удалось выполнить (403, исчерпаны повторы, другая
+  ошибка), сообщает об этом своему on_error - например, чтобы сессия не
+  считала клавиатуру показанной
+
+Порядок сообщений внутри одного чата сохраняется: чат, по которому идёт отправка,
+не выдаётся другим потокам-отправителям до завершения вызова
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from telebot.apihelper import ApiTelegramException
+
+# ограничение Telegram на длину текста одного сообщения
+MAX_MESSAGE_LENGTH = 4096
+# разделитель при объединении сообщений
+COALESCE_SEPARATOR = "\n\n"
+# как часто удалять из памяти простаивающие чаты, сек
+SWEEP_INTERVAL = 60
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас"""
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def delay(self, now):
+        # через сколько секунд будет доступен токен (0 - уже доступен)
+        self._refill(now)
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def consume(self, now):
+        self._refill(now)
+        self._tokens -= 1
+
+    def full(self, now):
+        self._refill(now)
+        return self._tokens >= self.capacity
+
+
+class _Item:
+    # одна отложенная отправка: имя метода TeleBot, его аргументы и обработчики неудачи
+    # (у объединённого сообщения - обработчики всех вошедших в него)
+    __slots__ = ("method", "kwargs", "coalesce", "enqueued", "attempts", "on_error")
+
+    def __init__(self, method, kwargs, coalesce, enqueued, on_error=()):
+        self.method = method
+        self.kwargs = kwargs
+        self.coalesce = coalesce
+        self.enqueued = enqueued
+        self.attempts = 0
+        self.on_error = on_error
+
+
+class _Chat:
+    # очередь и лимиты одного чата
+    __slots__ = ("items", "bucket", "not_before", "busy")
+
+    def __init__(self, bucket):
+        self.items = deque()
+        self.bucket = bucket
+        self.not_before = 0.0
+        self.busy = False
+
+
+class OutboundScheduler:
+    """Очередь исходящих вызовов Bot API с ограничением скорости и объединением
+
+    Attributes:
+        global_rate (float): Допустимое число отправок в секунду для всего бота
+        chat_rate (float): Допустимое число отправок в секунду в один чат
+        chat_burst (int): Сколько отправок подряд можно сделать в чат без ожидания
+        linger (float): Сколько ждать перед отправкой, чтобы собрать соседние сообщения, сек
+        max_pending (int): Максимальное число ожидающих отправки вызовов
+        max_attempts (int): Сколько раз повторять вызов после 429
+        metrics (BotMetrics | None): Куда сообщать время и ошибки вызовов
+    """
+
+    def __init__(self, bot, global_rate=30, chat_rate=1, chat_burst=3, linger=0.05,
+                 senders=4, max_pending=10000, max_attempts=5, metrics=None, logger=None):
+        self.bot = bot
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.linger = linger
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.metrics = metrics
+        self._senders = senders
+        self._logger = logger or logging.getLogger(__name__)
+        self._global = TokenBucket(global_rate, global_rate)
+        self._global_not_before = 0.0  # до какого момента отправка приостановлена после 429
+        self._chats = {}
+        self._ready = deque()  # чаты, у которых есть что отправить и нет отправки в процессе
+        self._pending = 0
+        self._next_wakeup = None
+        self._last_sweep = time.monotonic()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    # постановка в очередь
+
+    def send_message(self, chat_id, text, reply_markup=None, coalesce=True, on_error=None):
+        """Ставит текстовое сообщение в очередь
+
+        Args:
+            chat_id (int): Идентификатор чата
+            text (str): Текст сообщения
+            reply_markup: Клавиатура (необязательно)
+            coalesce (bool): Можно ли объединять с соседними сообщениями этого чата
+            on_error (Callable[[Exception], None] | None): Вызывается в потоке отправки,
+                если сообщение так и не отправлено
+
+        Returns:
+            bool: True, если сообщение принято в очередь
+        """
+        return self.submit(chat_id, "send_message",
+                           {"chat_id": chat_id, "text": text, "reply_markup": reply_markup},
+                           coalesce=coalesce, on_error=on_error)
+
+    def send_chat_action(self, chat_id, action="typing"):
+        # ставит в очередь индикатор действия ("печатает...")
+        return self.submit(chat_id, "send_chat_action", {"chat_id": chat_id, "action": action})
+
+    def submit(self, chat_id, method, kwargs, coalesce=False, timeout=5, on_error=None):
+        """Ставит в очередь произвольный вызов метода TeleBot
+
+        Вызовы с одинаковым chat_id выполняются по порядку и подчиняются лимиту этого чата
+        При переполнении очереди ждёт освобождения места не дольше timeout
+
+        Args:
+            chat_id (int): Чат, к очереди и лимитам которого относится вызов
+            method (str): Имя метода TeleBot (например, "send_document")
+            kwargs (dict): Именованные аргументы метода (включая chat_id, если он нужен методу)
+            coalesce (bool): Можно ли объединять с соседними сообщениями (только для send_message)
+            timeout (float): Сколько ждать места в переполненной очереди, сек
+            on_error (Callable[[Exception], None] | None): Вызывается в потоке отправки, если вызов
+                не выполнен (ошибка Bot API или исчерпаны повторы после 429); при отказе в постановке
+                в очередь не вызывается - об этом сообщает результат submit
+
+        Returns:
+            bool: True, если вызов принят в очередь
+        """
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                return False
+            if self._pending >= self.max_pending:
+                self._cond.wait_for(lambda: self._pending < self.max_pending or self._closed, timeout)
+                if self._pending >= self.max_pending or self._closed:
+                    self._logger.warning(f"Очередь отправки переполнена, сообщение в чат {chat_id} отброшено")
+                    return False
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat(TokenBucket(self.chat_rate, self.chat_burst))
+            if not chat.items and not chat.busy:
+                self._ready.append(chat_id)
+            chat.items.append(_Item(method, kwargs, coalesce, now, (on_error,) if on_error is not None else ()))
+            self._pending += 1
+            self._cond.notify_all()
+        return True
+
+    def pending(self):
+        # количество вызовов, ожидающих отправки
+        return self._pending
+
+    # жизненный цикл
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return self
+            for index in range(self._senders):
+                thread = threading.Thread(target=self._run, name=f"outbound-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def shutdown(self, timeout=10):
+        """Отправляет накопленное (не дольше timeout секунд) и останавливает потоки"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending == 0, timeout)
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    # отправка
+
+    def _run(self):
+        while True:
+            with self._cond:
+                picked = self._pick()
+                while picked is None:
+                    if self._closed:
+                        return
+                    self._cond.wait(self._next_wakeup)
+                    picked = self._pick()
+                chat_id, chat, item, taken = picked
+            self._deliver(chat_id, chat, item, taken)
+
+    def _pick(self):
+        # выбирает чат, который можно обслужить прямо сейчас (вызывается под блокировкой)
+        now = time.monotonic()
+        wakeup = None
+        global_wait = max(self._global.delay(now), self._global_not_before - now)
+        for _ in range(len(self._ready)):
+            chat_id = self._ready.popleft()
+            chat = self._chats[chat_id]
+            wait = max(global_wait, chat.not_before - now, chat.bucket.delay(now),
+                       chat.items[0].enqueued + self.linger - now)
+            if wait <= 0:
+                item, taken = self._take(chat)
+                chat.busy = True
+                chat.bucket.consume(now)
+                self._global.consume(now)
+                return chat_id, chat, item, taken
+            self._ready.append(chat_id)
+            wakeup = wait if wakeup is None else min(wakeup, wait)
+        self._next_wakeup = wakeup
+        return None
+
+    def _take(self, chat):
+        # снимает с очереди чата один вызов, объединяя подряд идущие тексты
+        items = chat.items
+        item = items.popleft()
+        taken = 1
+        # индикатор "печатает..." не нужен, если за ним уже ждёт сообщение
+        while item.method == "send_chat_action" and items:
+            item = items.popleft()
+            taken += 1
+        if item.method != "send_message" or not item.coalesce:
+            return item, taken
+        text = item.kwargs["text"]
+        markup = item.kwargs["reply_markup"]
+        on_error = item.on_error
+        merged = False
+        while items and items[0].method == "send_message" and items[0].coalesce:
+            following = items[0].kwargs
+            combined = f"{text}{COALESCE_SEPARATOR}{following['text']}"
+            if len(combined) > MAX_MESSAGE_LENGTH:
+                break
+            on_error += items.popleft().on_error
+            taken += 1
+            text = combined
+            markup = following["reply_markup"] or markup
+            merged = True
+        if merged:
+            merged_item = _Item("send_message", {**item.kwargs, "text": text, "reply_markup": markup},
+                                True, item.enqueued, on_error)
+            merged_item.attempts = item.attempts
+            item = merged_item
+        return item, taken
+
+    def _deliver(self, chat_id, chat, item, taken):
+        retry_after = None
+        error_code = None
+        error = None
+        started = time.perf_counter()
+        try:
+            getattr(self.bot, item.method)(**item.kwargs)
+        except ApiTelegramException as e:
+            error = e
+            error_code = e.error_code
+            if e.error_code == 429 and item.attempts + 1 < self.max_attempts:
+                retry_after = ((e.result_json or {}).get("parameters") or {}).get("retry_after", 1)
+                self._logger.warning(f"Превышен лимит Telegram (чат {chat_id}), отправка приостановлена на {retry_after} с")
+            elif e.error_code == 403 and "bot was blocked by the user" in e.description:
+                self._logger.warning(f"Пользователь {chat_id} заблокировал бота. Сообщение не отправлено.")
+            else:
+                self._logger.error(f"Ошибка отправки сообщения пользователю {chat_id}: {e}", exc_info=True)
+        except Exception as e:
+            error = e
+            error_code = type(e).__name__
+            self._logger.error(f"Ошибка отправки сообщения пользователю {chat_id}: {e}", exc_info=True)
+        if self.metrics is not None:
+            self.metrics.observe_api_call(item.method, time.perf_counter() - started, error_code)
+        if error is not None and retry_after is None:
+            # вызов окончательно не выполнен; чат ещё занят, поэтому обработчики
+            # срабатывают раньше, чем уйдёт следующий вызов этого чата
+            self._failed(chat_id, item, error)
+
+        with self._cond:
+            now = time.monotonic()
+            chat.busy = False
+            if retry_after is not None:
+                # возвращаем (уже объединённый) вызов в начало очереди чата
+                item.attempts += 1
+                chat.items.appendleft(item)
+                chat.not_before = now + retry_after
+                self._global_not_before = max(self._global_not_before, chat.not_before)
+                taken -= 1
+            self._pending -= taken
+            if chat.items:
+                self._ready.append(chat_id)
+            elif chat.bucket.full(now):
+                del self._chats[chat_id]
+            if now - self._last_sweep > SWEEP_INTERVAL:
+                self._sweep(now)
+            self._cond.notify_all()
+
+    def _failed(self, chat_id, item, error):
+        for callback in item.on_error:
+            try:
+                callback(error)
+            except Exception:
+                self._logger.error(f"Ошибка обработчика неудачной отправки в чат {chat_id}", exc_info=True)
+
+    def _sweep(self, now):
+        # забывает простаивающие чаты, ведро которых уже восполнилось
+        self._last_sweep = now
+        idle = [chat_id for chat_id, chat in self._chats.items()
+                if not chat.items and not chat.busy and chat.bucket.full(now)]
+        for chat_id in idle:
+            del self._chats[chat_id]
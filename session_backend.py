@@ -0,0 +1,177 @@
+"""Постоянное хранение сессий между перезапусками бота
+
+SessionBackend - интерфейс хранилища, SQLiteSessionBackend - реализация на SQLite:
+- save() сериализует сессию в потоке вызывающего (потоке пользователя) и
+  откладывает готовые байты (без обращения к диску)
+- фоновый поток раз в flush_interval секунд записывает все изменённые сессии
+  одной транзакцией (write-behind); сами объекты сессий он не трогает
+- load() читает одну сессию по user_id - вызывается, только когда от пользователя
+  пришло сообщение, а его сессии нет в памяти (ленивое восстановление)
+- close() записывает оставшееся при остановке бота
+
+Сессия сериализуется через pickle целиком (состояние + FSM задания с контекстом)
+База локальная и пишется только самим ботом
+"""
+
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class SessionBackend:
+    """Интерфейс постоянного хранилища сессий"""
+
+    def load(self, user_id):
+        # возвращает (state, fsm) или None
+        raise NotImplementedError
+
+    def save(self, user_id, session):
+        # снимок сессии, который нужно сохранить; True - снимок принят
+        raise NotImplementedError
+
+    def delete(self, user_id):
+        raise NotImplementedError
+
+    def flush(self):
+        # записывает все отложенные изменения
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Хранилище сессий в файле SQLite с отложенной пакетной записью
+
+    Attributes:
+        path (str): Путь к файлу базы
+        flush_interval (float): Период фоновой записи, сек
+        retention (float): Сколько хранить сессию без обращений, сек (старые удаляются при запуске)
+    """
+
+    def __init__(self, path="sessions.db", flush_interval=2.0, retention=30 * 24 * 3600, logger=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._logger = logger or logging.getLogger(__name__)
+        self._dirty = {}  # user_id -> pickle (state, fsm) последней версии, ещё не записанной
+        self._deleted = set()
+        # то, что сейчас записывается: видно load() до фиксации транзакции
+        self._flushing = {}
+        self._flushing_deleted = set()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()  # соединения для чтения - по одному на поток
+        self._stop = threading.Event()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "user_id INTEGER PRIMARY KEY, data BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - retention,))
+        conn.commit()
+        self._writer_conn = conn
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def load(self, user_id):
+        """Читает сессию пользователя из базы
+
+        Returns:
+            tuple[str, object] | None: (state, fsm) или None, если сессии нет
+        """
+        with self._lock:
+            if user_id in self._deleted:
+                return None
+            pending = self._dirty.get(user_id)
+            if pending is None:
+                if user_id in self._flushing_deleted:
+                    return None
+                pending = self._flushing.get(user_id)
+        if pending is None:
+            row = self._reader().execute("SELECT data FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                return None
+            pending = row[0]
+        try:
+            return pickle.loads(pending)
+        except Exception:
+            # формат сохранённой сессии устарел - пользователь начнёт с главного меню
+            self._logger.warning(f"Не удалось восстановить сессию пользователя {user_id}", exc_info=True)
+            return None
+
+    def save(self, user_id, session):
+        """Сериализует сессию и откладывает её до следующей фоновой записи
+
+        Вызывается из потока, владеющего сессией: фоновый поток получает только байты
+
+        Returns:
+            bool: False, если сессию не удалось сериализовать
+        """
+        try:
+            data = pickle.dumps((session.state, session.fsm), pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            self._logger.error(f"Не удалось сериализовать сессию пользователя {user_id}", exc_info=True)
+            return False
+        with self._lock:
+            self._dirty[user_id] = data
+            self._deleted.discard(user_id)
+        return True
+
+    def delete(self, user_id):
+        with self._lock:
+            self._dirty.pop(user_id, None)
+            self._deleted.add(user_id)
+
+    def flush(self):
+        """Записывает все изменённые сессии одной транзакцией"""
+        with self._write_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                deleted, self._deleted = self._deleted, set()
+                self._flushing, self._flushing_deleted = dirty, deleted
+            if not dirty and not deleted:
+                return
+            now = time.time()
+            rows = [(user_id, data, now) for user_id, data in dirty.items()]
+            try:
+                with self._writer_conn:
+                    self._writer_conn.executemany(
+                        "INSERT OR REPLACE INTO sessions (user_id, data, updated) VALUES (?, ?, ?)", rows)
+                    self._writer_conn.executemany(
+                        "DELETE FROM sessions WHERE user_id = ?", [(user_id,) for user_id in deleted])
+            except sqlite3.Error:
+                self._logger.error("Ошибка записи сессий в базу", exc_info=True)
+                # не записанное вернётся в очередь, если за это время его не заменили более новым
+                with self._lock:
+                    for user_id, data in dirty.items():
+                        if user_id not in self._deleted:
+                            self._dirty.setdefault(user_id, data)
+                    self._deleted.update(user_id for user_id in deleted if user_id not in self._dirty)
+            finally:
+                with self._lock:
+                    self._flushing, self._flushing_deleted = {}, set()
+
+    def close(self):
+        # останавливает фоновую запись и сохраняет всё накопленное
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._writer_conn.close()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
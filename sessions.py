@@ -0,0 +1,235 @@
+"""Хранилище пользовательских сессий с ограничением по времени простоя и количеству
+
+- Сессия - компактный объект с __slots__ (состояние, FSM задания, время последнего обращения)
+- Сессия, к которой не обращались дольше ttl секунд, удаляется
+- При превышении max_entries вытесняется сессия, к которой обращались раньше всех (LRU)
+- memory_report() оценивает память, занимаемую сессиями вместе с массивами в контекстах FSM
+- С постоянным хранилищем (session_backend) вытесненная или потерянная при перезапуске
+  сессия восстанавливается из него при следующем сообщении пользователя
+
+Память процесса ограничена числом активных пользователей, а не всеми, кто когда-либо
+запускал бота. Без постоянного хранилища вернувшийся после вытеснения пользователь
+начинает с главного меню
+"""
+
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# как часто (не чаще) проходить по всем сессиям в поисках просроченных, сек
+SWEEP_INTERVAL = 60
+
+
+class Session:
+    """Сессия пользователя
+
+    Attributes:
+        state (str): "main_menu" или идентификатор задания ("task1", "task5", "task8")
+        fsm: Конечный автомат выбранного задания (None в главном меню)
+        last_seen (float): Время последнего обращения (time.monotonic)
+        keyboard (str | None): Клавиатура, которую сейчас показывает клиент (None - неизвестно);
+            не сохраняется в постоянном хранилище - после перезапуска клавиатура отправится заново
+        saved (tuple | None): version() на момент последнего сохранения в постоянное хранилище
+    """
+
+    __slots__ = ("state", "fsm", "last_seen", "keyboard", "saved")
+
+    def __init__(self, state="main_menu", fsm=None):
+        self.state = state
+        self.fsm = fsm
+        self.last_seen = time.monotonic()
+        self.keyboard = None
+        self.saved = None
+
+    def reset(self, state="main_menu", fsm=None):
+        # переводит сессию в новое состояние, отбрасывая FSM предыдущего задания
+        self.state = state
+        self.fsm = fsm
+
+    def version(self):
+        # меняется вместе с сохраняемыми данными: состоянием сессии, состоянием FSM и его контекстом
+        fsm = self.fsm
+        if fsm is None:
+            return (self.state,)
+        return self.state, id(fsm), fsm.state, getattr(fsm.context, "version", None)
+
+
+class SessionStore:
+    """Потокобезопасное хранилище сессий с TTL и LRU-вытеснением
+
+    Attributes:
+        ttl (float): Время простоя, после которого сессия удаляется, сек
+        max_entries (int): Максимальное количество сессий
+        backend (SessionBackend | None): Постоянное хранилище сессий
+    """
+
+    def __init__(self, ttl=6 * 3600, max_entries=10000, backend=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self._clock = clock
+        self._sessions = OrderedDict()  # от давно использованных к недавним
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+        self.evicted = 0
+
+    def get(self, user_id):
+        """Возвращает сессию пользователя и отмечает обращение к ней
+
+        Если сессии нет в памяти, она загружается из постоянного хранилища
+
+        Returns:
+            Session | None: Сессия или None, если её нет или она просрочена
+        """
+        now = self._clock()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                if now - session.last_seen <= self.ttl:
+                    session.last_seen = now
+                    self._sessions.move_to_end(user_id)
+                    return session
+                del self._sessions[user_id]
+                self.evicted += 1
+        if self.backend is None:
+            return None
+        stored = self.backend.load(user_id)
+        if stored is None:
+            return None
+        session = Session(*stored)
+        session.saved = session.version()
+        return self._put(user_id, session)
+
+    def create(self, user_id, state="main_menu", fsm=None):
+        """Создаёт (или заменяет) сессию пользователя
+
+        Returns:
+            Session: Новая сессия
+        """
+        session = self._put(user_id, Session(state, fsm))
+        self.mark_dirty(user_id)
+        return session
+
+    def _put(self, user_id, session):
+        session.last_seen = self._clock()
+        with self._lock:
+            self._sessions[user_id] = session
+            self._sessions.move_to_end(user_id)
+            self._enforce_limits(session.last_seen)
+        return session
+
+    def mark_dirty(self, user_id):
+        """Передаёт постоянному хранилищу снимок сессии, если она изменилась с прошлого сохранения
+
+        Вызывается в потоке, который обрабатывает сообщения пользователя (его очередь
+        в executor.UserOrderedExecutor): снимок сериализуется здесь же, пока сессию
+        никто не меняет, а на диск он попадёт в фоне
+        """
+        if self.backend is None:
+            return
+        with self._lock:
+            session = self._sessions.get(user_id)
+        if session is None:
+            return
+        version = session.version()
+        if version != session.saved and self.backend.save(user_id, session):
+            session.saved = version
+
+    def discard(self, user_id):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+        if self.backend is not None:
+            self.backend.delete(user_id)
+
+    def close(self):
+        # сохраняет накопленные изменения при остановке бота
+        if self.backend is not None:
+            self.backend.close()
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def evict_expired(self):
+        """Удаляет все просроченные сессии
+
+        Returns:
+            int: Количество удалённых сессий
+        """
+        with self._lock:
+            return self._evict_expired(self._clock())
+
+    def _enforce_limits(self, now):
+        # вызывается под блокировкой
+        if now - self._last_sweep >= SWEEP_INTERVAL:
+            self._evict_expired(now)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def _evict_expired(self, now):
+        self._last_sweep = now
+        removed = 0
+        # сессии упорядочены по времени обращения: просроченные - в начале
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.ttl:
+                break
+            del self._sessions[user_id]
+            removed += 1
+        self.evicted += removed
+        return removed
+
+    def memory_report(self, top=10):
+        """Оценивает память, занимаемую сессиями
+
+        Args:
+            top (int): Сколько самых "тяжёлых" сессий перечислить
+
+        Returns:
+            dict: {"sessions": количество, "total_bytes": всего,
+                   "largest": [(user_id, байт), ...] по убыванию}
+        """
+        with self._lock:
+            items = list(self._sessions.items())
+        sizes = [(user_id, deep_sizeof(session)) for user_id, session in items]
+        sizes.sort(key=lambda item: item[1], reverse=True)
+        return {
+            "sessions": len(sizes),
+            "total_bytes": sum(size for _, size in sizes),
+            "largest": sizes[:top],
+        }
+
+
+def deep_sizeof(obj, seen=None):
+    """Приблизительный размер объекта вместе со всем, на что он ссылается, в байтах
+
+    Учитывает __slots__, __dict__, списки, кортежи, словари, множества и array
+    Общие объекты (например, малые int) считаются один раз в пределах вызова
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, array, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "nbytes"):
+        # массивы NumPy: getsizeof уже учитывает собственный буфер данных
+        return size
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(obj, name):
+                size += deep_sizeof(getattr(obj, name), seen)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(obj.__dict__, seen)
+    return size
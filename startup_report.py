@@ -0,0 +1,159 @@
+"""Отчёт о времени запуска бота
+
+Запускает `python -X importtime -c "import main"` в отдельном процессе (во
+временном каталоге, чтобы не трогать bot.log и sessions.db) и сводит вывод
+importtime в таблицы:
+- время import main целиком и его прямых импортов (накопительное)
+- самые медленные модули по собственному времени
+- время загрузки каждого задания при первом выборе (task_registry)
+
+Первый запуск идёт без кэша таблицы переходов (fsm_bot и statemachine
+импортируются), следующие - с кэшем, как при обычном перезапуске бота
+
+Пример:
+    python startup_report.py --repeat 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# выполняется в дочернем процессе; настоящий config.py не нужен
+_PROBE = """
+import json, sys, time, types
+try:
+    import config
+except ImportError:
+    config = types.ModuleType("config")
+    config.TOKEN = "0:startup-report"
+    sys.modules["config"] = config
+started = time.perf_counter()
+import main
+ready = time.perf_counter()
+numpy_at_start = "numpy" in sys.modules
+for task in main.task_registry:
+    main.task_registry.get(task)
+main.sessions.close()
+print(json.dumps({"main": ready - started, "tasks": main.task_registry.load_seconds, "numpy": numpy_at_start}))
+"""
+
+
+class ImportEntry:
+    """Строка вывода -X importtime
+
+    Attributes:
+        name (str): Имя модуля
+        self_us (int): Собственное время импорта, мкс
+        cumulative_us (int): Время вместе с вложенными импортами, мкс
+        children (list[ImportEntry]): Модули, импортированные при его загрузке
+    """
+
+    __slots__ = ("name", "self_us", "cumulative_us", "children")
+
+    def __init__(self, name, self_us, cumulative_us):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = []
+
+
+def parse_importtime(text):
+    """Разбирает вывод -X importtime в дерево импортов
+
+    importtime печатает модуль после всех его вложенных импортов, с отступом
+    в два пробела на уровень вложенности
+
+    Args:
+        text (str): stderr процесса
+
+    Returns:
+        tuple[list[ImportEntry], list[ImportEntry]]: Импорты верхнего уровня и все модули
+    """
+    pending = {}  # уровень -> модули, ещё не отнесённые к родителю
+    entries = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок
+        raw_name = parts[2][1:]
+        name = raw_name.lstrip(" ")
+        level = (len(raw_name) - len(name)) // 2
+        entry = ImportEntry(name, int(parts[0]), int(parts[1]))
+        entry.children = pending.pop(level + 1, [])
+        pending.setdefault(level, []).append(entry)
+        entries.append(entry)
+    return pending.get(0, []), entries
+
+
+def run_probe(workdir):
+    """Один запуск: import main под -X importtime
+
+    Returns:
+        tuple[dict, str]: Замеры пробы (main, tasks, numpy) и вывод importtime
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (ROOT, env.get("PYTHONPATH"))))
+    done = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=workdir, env=env, capture_output=True, text=True, check=False,
+    )
+    if done.returncode != 0:
+        raise RuntimeError(f"import main завершился с кодом {done.returncode}:\n{done.stderr[-2000:]}")
+    return json.loads(done.stdout.strip().splitlines()[-1]), done.stderr
+
+
+def _ms(us):
+    return f"{us / 1000:8.1f} мс"
+
+
+def print_report(runs, top_level, entries, top):
+    cold, warm = runs[0], runs[1:]
+    print(f"import main, первый запуск (без кэша таблицы переходов): {cold['main'] * 1000:.1f} мс")
+    if warm:
+        times = sorted(run["main"] * 1000 for run in warm)
+        print(f"import main, перезапуск: минимум {times[0]:.1f} мс, медиана {times[len(times) // 2]:.1f} мс")
+
+    main_entry = next((entry for entry in top_level if entry.name == "main"), None)
+    if main_entry is not None:
+        total = main_entry.cumulative_us
+        print(f"\nПрямые импорты main (всего {total / 1000:.1f} мс, собственное время main {_ms(main_entry.self_us).strip()}):")
+        for entry in sorted(main_entry.children, key=lambda e: e.cumulative_us, reverse=True)[:top]:
+            print(f"  {entry.name:<32}{_ms(entry.cumulative_us)}  {entry.cumulative_us / total:6.1%}")
+
+    # модули заданий, загруженные после import main, к запуску не относятся
+    startup = entries[:entries.index(main_entry) + 1] if main_entry is not None else entries
+    print("\nСамые медленные модули (собственное время):")
+    for entry in sorted(startup, key=lambda e: e.self_us, reverse=True)[:top]:
+        print(f"  {entry.name:<32}{_ms(entry.self_us)}")
+
+    last = runs[-1]
+    print("\nЗагрузка заданий при первом выборе:")
+    for task, seconds in sorted(last["tasks"].items()):
+        print(f"  {task:<32}{_ms(seconds * 1_000_000)}")
+    print(f"\nNumPy при запуске: {'загружен' if last['numpy'] else 'не загружен'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Куда уходит время запуска бота (-X importtime)")
+    parser.add_argument("--repeat", type=int, default=3, help="запусков (первый - без кэша таблицы переходов)")
+    parser.add_argument("--top", type=int, default=12, help="строк в таблицах")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="startup-") as workdir:
+        probes = [run_probe(workdir) for _ in range(max(1, args.repeat))]
+    # подробности - по самому быстрому перезапуску
+    _, stderr = min(probes[1:] or probes, key=lambda probe: probe[0]["main"])
+    top_level, entries = parse_importtime(stderr)
+    print_report([run for run, _ in probes], top_level, entries, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Реестр заданий с отложенной загрузкой
+
+Модули заданий (tasks.task1, tasks.task5, tasks.task8) и их зависимости не
+импортируются при запуске бота: TaskRegistry.get() загружает модуль задания,
+когда пользователь впервые выбирает это задание, и сразу строит таблицу
+обработчиков его FSM (TaskFSM.compile). Тяжёлые необязательные библиотеки
+(NumPy) и так подключаются только при первом обращении (tasks.optional)
+
+Сессии, восстановленные из хранилища, уже содержат объект FSM (pickle сам
+импортирует модуль задания), поэтому перед обработкой сообщения main.py тоже
+вызывает get() - таблица обработчиков строится один раз на класс
+"""
+
+import importlib
+import logging
+import threading
+import time
+
+
+class TaskRegistry:
+    """Задания: идентификатор -> класс FSM, загружаемый при первом обращении
+
+    Attributes:
+        table (dispatch.TransitionTable): Скомпилированный автомат бота
+        load_seconds (dict[str, float]): Время загрузки уже загруженных заданий, сек
+    """
+
+    def __init__(self, tasks, table, logger=None):
+        """
+        Args:
+            tasks (dict[str, str]): Идентификатор задания -> "модуль:класс FSM" ("tasks.task1:Task1FSM")
+            table (dispatch.TransitionTable): Скомпилированный автомат бота
+            logger (logging.Logger | None): Журнал
+        """
+        self.table = table
+        self.load_seconds = {}
+        self._paths = dict(tasks)
+        self._classes = {}
+        self._lock = threading.Lock()
+        self._logger = logger or logging.getLogger(__name__)
+
+    def __contains__(self, task):
+        return task in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def get(self, task):
+        """Класс FSM задания, готовый к работе
+
+        Args:
+            task (str): Идентификатор задания ("task1")
+
+        Returns:
+            type[TaskFSM]: Класс FSM с построенной таблицей обработчиков
+
+        Raises:
+            KeyError: Если задание не зарегистрировано
+        """
+        fsm_class = self._classes.get(task)
+        if fsm_class is None:
+            fsm_class = self._load(task)
+        return fsm_class
+
+    def loaded(self):
+        # уже загруженные задания
+        return list(self._classes)
+
+    def _load(self, task):
+        # импорт и компиляция под блокировкой: одно задание могут выбрать сразу несколько пользователей
+        with self._lock:
+            fsm_class = self._classes.get(task)
+            if fsm_class is not None:
+                return fsm_class
+            module_name, class_name = self._paths[task].split(":")
+            started = time.perf_counter()
+            fsm_class = getattr(importlib.import_module(module_name), class_name)
+            fsm_class.compile(self.table)
+            self.load_seconds[task] = time.perf_counter() - started
+            self._classes[task] = fsm_class
+        self._logger.debug(f"Задание {task} загружено за {self.load_seconds[task] * 1000:.1f} мс")
+        return fsm_class
@@ -0,0 +1,177 @@
+"""Общий кэш результатов заданий по содержимому входных данных
+
+Ключ - (задание, хеш содержимого массивов, параметры), поэтому одинаковые
+данные разных пользователей дают одну запись, а повторное "Выполнить" на
+неизменённых данных не пересчитывает алгоритм
+
+- Хеш массивов (blake2b) считается один раз на данные и хранится в контексте
+  задания; при смене данных контекст сбрасывает его (инвалидация)
+- Объём кэша ограничен в байтах, при превышении вытесняются давно не
+  использованные записи (LRU)
+- Списки целых чисел хранятся упакованными в array('q') (8 байт на число, размер
+  точен и считается за O(1)); из кэша возвращается новый список
+- hits / misses / evictions - счётчики для наблюдения за эффективностью
+
+Пример:
+    key = ("task1", data_digest(arr1, arr2))
+    result = result_cache.get_or_compute(key, lambda: solve(arr1, arr2))
+"""
+
+import hashlib
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+# максимальный объём кэша результатов, байт
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# оценка накладных расходов на одну запись (ключ, узел OrderedDict), байт
+_ENTRY_OVERHEAD = 200
+
+
+def data_digest(*arrays):
+    """Хеш содержимого массивов целых чисел
+
+    Массивы array('q') хешируются напрямую по буферу, остальные
+    последовательности сначала упаковываются в array('q')
+
+    Args:
+        *arrays: Массивы (array('q'), list[int] и т.п.)
+
+    Returns:
+        bytes: 16-байтовый хеш
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for values in arrays:
+        packed = _packed(values)
+        h.update(len(packed).to_bytes(8, "little"))
+        h.update(packed)
+    return h.digest()
+
+
+def _packed(values):
+    # байтовое представление массива с меткой формата (чтобы форматы не давали совпадающих байт)
+    if isinstance(values, array) and values.typecode == "q":
+        return b"q" + values.tobytes()
+    try:
+        return b"q" + array("q", values).tobytes()
+    except (OverflowError, TypeError):
+        # числа вне int64
+        return b"r" + repr(list(values)).encode()
+
+
+def _pack_result(value):
+    # (хранимое значение, упакован ли список) - список целых int64 хранится как array('q')
+    if isinstance(value, list):
+        try:
+            return array("q", value), True
+        except (OverflowError, TypeError):
+            pass
+    return value, False
+
+
+def _stored_size(stored):
+    # размер хранимого значения в байтах (для списков не int64 - приблизительно)
+    size = sys.getsizeof(stored)
+    if isinstance(stored, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in stored)
+    return size + _ENTRY_OVERHEAD
+
+
+class ResultCache:
+    """Потокобезопасный LRU-кэш с ограничением по объёму
+
+    Attributes:
+        max_bytes (int): Максимальный суммарный размер записей
+        hits (int): Сколько раз результат найден в кэше
+        misses (int): Сколько раз результата не было
+        evictions (int): Сколько записей вытеснено
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # ключ -> (значение, упаковано ли, размер); от давних к недавним
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        stored, packed, _ = entry
+        return stored.tolist() if packed else stored
+
+    def put(self, key, value):
+        """Сохраняет результат; слишком большой (больше четверти кэша) не сохраняется"""
+        stored, packed = _pack_result(value)
+        size = _stored_size(stored)
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (stored, packed, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Возвращает результат из кэша или вычисляет и сохраняет его
+
+        Args:
+            key (tuple): Ключ (задание, хеш данных, параметры)
+            compute (callable): Функция без аргументов, вычисляющая результат
+
+        Returns:
+            Результат (список чисел из кэша - новый список)
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            # вычисление - вне блокировки: другие пользователи не ждут
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Счётчики кэша
+
+        Returns:
+            dict: entries, bytes, max_bytes, hits, misses, evictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, key):
+        # проверка без учёта в счётчиках и без изменения порядка вытеснения
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# общий кэш для всех заданий и пользователей
+result_cache = ResultCache()
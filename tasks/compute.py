@@ -0,0 +1,77 @@
+"""Запросы на тяжёлые вычисления вне потока обработки сообщений
+
+Для больших массивов FSM не считает результат сам, а возвращает ComputeRequest:
+бот выполняет его в отдельном процессе (см. offload.ProcessOffloader) и, когда
+вычисление закончится, вызывает complete() в потоке пользователя. Небольшие
+массивы и результаты из кэша по-прежнему считаются сразу - без накладных
+расходов на межпроцессный обмен
+
+Пример:
+    request = ComputeRequest(solve, [arr1, arr2], key=key, result_items=len(arr1), apply=on_result)
+    response = request.complete(request.run())  # то же самое без отдельного процесса
+"""
+
+from .cache import result_cache
+from .errors import ComputeFailedError, ComputeTimeoutError
+from .messages import Messages
+
+# начиная с такого суммарного количества элементов вычисление выносится в отдельный процесс
+OFFLOAD_THRESHOLD = 200_000
+
+
+class ComputeRequest:
+    """Вычисление func(*arrays, *params), поручаемое боту
+
+    Attributes:
+        func (callable): Функция уровня модуля (в процесс передаётся по имени)
+        arrays (list): Входные массивы целых чисел
+        params (tuple): Остальные аргументы функции (после массивов)
+        result_items (int | None): Длина результата-массива; None - результат не массив
+        key (tuple | None): Ключ общего кэша результатов
+    """
+
+    __slots__ = ("func", "arrays", "params", "result_items", "key", "_apply")
+
+    def __init__(self, func, arrays, params=(), result_items=None, key=None, apply=None):
+        self.func = func
+        self.arrays = arrays
+        self.params = tuple(params)
+        self.result_items = result_items
+        self.key = key
+        self._apply = apply
+
+    @property
+    def size(self):
+        # суммарное количество входных элементов
+        return sum(len(values) for values in self.arrays)
+
+    def run(self):
+        # выполняет вычисление в текущем потоке
+        return self.func(*self.arrays, *self.params)
+
+    def complete(self, result):
+        """Сохраняет результат в кэш и передаёт его FSM
+
+        Returns:
+            str: Ответ пользователю
+        """
+        if self.key is not None:
+            result_cache.put(self.key, result)
+        if self._apply is None:
+            return Messages.ALGORITHM_DONE
+        return self._apply(result)
+
+    def fail(self, error):
+        """Ответ пользователю на ошибку вычисления
+
+        Args:
+            error (Exception): Исключение из функции или от исполнителя
+
+        Returns:
+            str: Ответ пользователю
+        """
+        if isinstance(error, ComputeTimeoutError):
+            return f"{Messages.COMPUTE_TIMEOUT}{error}"
+        if isinstance(error, ComputeFailedError):
+            return Messages.COMPUTE_FAILED
+        return f"{Messages.INVALID_INPUT}: {error}"
@@ -12,4 +12,20 @@ class NegativeNumberError(Exception):
 
 class InvalidInputError(Exception):
     # некорректный ввод
+    pass
+
+class InputFormatError(InvalidInputError):
+    # неверное количество частей, разделённых ';'
+    pass
+
+class ComputeTimeoutError(Exception):
+    # вычисление не уложилось в отведённое время
+    pass
+
+class ComputeCancelledError(Exception):
+    # вычисление отменено (запущено новое или сессия сброшена)
+    pass
+
+class ComputeFailedError(Exception):
+    # процесс, выполнявший вычисление, завершился аварийно
     pass
\ No newline at end of file
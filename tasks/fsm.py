@@ -0,0 +1,165 @@
+"""Общая часть конечных автоматов заданий
+
+TaskFSM.handle() не перебирает состояния и кнопки: обработчик выбирается по
+таблице, построенной compile() из скомпилированного автомата бота
+(dispatch.compile_fsm(fsm_bot.TelegramBotFSM)):
+    _rows[номер состояния][номер кнопки] -> обработчик (fsm, text)
+
+Обработчики строятся по соглашению об именах:
+- переход по кнопке в состояние задания: state = целевое состояние, затем _on_<действие>()
+  (действие - имя события без префикса задания: "manual", "exec", "target", ...)
+- переход в главное меню: ответ "exit"
+- текст (или кнопка без перехода) в состоянии X: метод _X(text), если он есть
+  (_input_manual для "input_manual"), иначе просьба пользоваться кнопками
+"""
+
+from .messages import Messages
+
+# ответ, по которому main.py возвращает пользователя в главное меню
+EXIT = "exit"
+
+
+class TaskContext:
+    """Базовый класс данных пользователя в задании
+
+    С сессией сохраняются только поля из PERSISTED; остальные слоты - кэш,
+    который дешевле построить заново. version увеличивается при каждом
+    присваивании сохраняемого поля, по нему хранилище сессий
+    (sessions.SessionStore.mark_dirty) понимает, что сессию нужно записать.
+    Изменение поля на месте (list.extend) отмечается вызовом touch()
+
+    Attributes:
+        version (int): Номер версии сохраняемых данных
+    """
+
+    __slots__ = ("version",)
+
+    PERSISTED = ()
+
+    def __init__(self):
+        self.version = 0
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.PERSISTED:
+            object.__setattr__(self, "version", self.version + 1)
+
+    def touch(self):
+        # сохраняемые данные изменены на месте
+        self.version += 1
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.PERSISTED}
+
+    def __setstate__(self, state):
+        self.__init__()
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class TaskFSM:
+    """Базовый класс FSM задания
+
+    Attributes:
+        state (str): Текущее состояние FSM (например, "menu", "input_manual")
+        context: Данные пользователя (массивы, результат)
+    """
+
+    __slots__ = ("state", "context")
+
+    TASK = None  # идентификатор задания в автомате бота ("task1")
+    MANUAL_PROMPT = None  # подсказка для ручного ввода
+
+    # строятся compile()
+    _state_index = None
+    _rows = None
+    _input_index = {}
+    _other = 0
+
+    @classmethod
+    def compile(cls, table):
+        """Строит таблицу обработчиков задания
+
+        Args:
+            table (dispatch.TransitionTable): Скомпилированный автомат бота
+
+        Raises:
+            AttributeError: Если для перехода по кнопке нет метода _on_<действие>
+        """
+        prefix = f"{cls.TASK}_"
+        states = table.task_states(cls.TASK)
+        rows = []
+        for state, local in states:
+            free_text = getattr(cls, f"_{local}", cls._unexpected)
+            row = []
+            for entry in table.transitions[table.state_index[state]]:
+                if entry is None:
+                    row.append(free_text)
+                elif not entry[1].startswith(prefix):
+                    row.append(cls._exit)
+                else:
+                    event, target = entry
+                    row.append(_transition(target[len(prefix):], getattr(cls, f"_on_{event[len(prefix):]}")))
+            rows.append(tuple(row))
+        cls._state_index = {local: i for i, (_, local) in enumerate(states)}
+        cls._rows = tuple(rows)
+        cls._input_index = table.input_index
+        cls._other = table.other
+
+    def handle(self, text):
+        """Обрабатывает текстовое сообщение от пользователя
+
+        Args:
+            text (str): Текст сообщения (обычно текст кнопки или ввод данных)
+
+        Returns:
+            str | Report | ComputeRequest: Ответ пользователю, EXIT или запрос вычисления
+        """
+        if self._rows is None:
+            raise RuntimeError(f"{type(self).__name__}.compile() не вызван")
+        index = self._state_index.get(self.state)
+        if index is None:
+            return Messages.UNKNOWN_STATE
+        return self._rows[index][self._input_index.get(text, self._other)](self, text)
+
+    # действия по кнопкам, общие для всех заданий
+
+    def _on_manual(self):
+        return self.MANUAL_PROMPT
+
+    def _on_random(self):
+        return Messages.INPUT_RANDOM_SIZE
+
+    def _on_exec(self):
+        return self._handle_execute()
+
+    def _on_result(self):
+        return self._handle_show_result()
+
+    # сообщения в промежуточных состояниях (выполнение и показ результата сразу возвращают в меню)
+
+    def _execute(self, text):
+        return self._handle_execute()
+
+    def _show_result(self, text):
+        return self._handle_show_result()
+
+    def _exit(self, text):
+        return EXIT
+
+    def _unexpected(self, text):
+        return Messages.PLEASE_USE_BUTTONS
+
+    def _handle_execute(self):
+        raise NotImplementedError
+
+    def _handle_show_result(self):
+        raise NotImplementedError
+
+
+def _transition(target, action):
+    # обработчик перехода по кнопке: смена состояния и действие
+    def handler(fsm, text):
+        fsm.state = target
+        return action(fsm)
+    return handler
@@ -0,0 +1,287 @@
+"""Индексы для проверки "число есть в массиве"
+
+set из n целых чисел занимает порядка 60+ байт на элемент. Для больших массивов
+индекс выбирается по данным:
+- BitmapIndex - битовая карта на bytearray для плотного диапазона значений
+  (1 бит на каждое число диапазона)
+- SortedIndex - отсортированный array('q') без повторов (8 байт на элемент),
+  поиск - bisect или векторизованный np.searchsorted; при желании перед ним
+  ставится фильтр Блума (BloomFilter), отсекающий большинство промахов
+- SetIndex - обычный set для небольших массивов и чисел вне int64
+
+Все индексы поддерживают "x in index" и contains_many(values) - проверку
+целого массива (для массива NumPy результат - булев массив NumPy). Если среди
+проверяемых чисел есть не помещающиеся в int64 (перевёрнутое 1999999999999999999
+больше 2**63), проверка идёт по одному числу, как в SetIndex
+"""
+
+from array import array
+from bisect import bisect_left
+from .optional import numpy
+
+# массивы короче этого размера индексируются обычным set (память не важна, поиск быстрее)
+SET_MAX_SIZE = 4096
+# битовая карта выбирается, если занимает не больше стольких байт на элемент
+BITMAP_MAX_BYTES_PER_ITEM = 4
+# бит фильтра Блума на элемент и количество хеш-функций (~1% ложных срабатываний)
+BLOOM_BITS_PER_ITEM = 10
+BLOOM_HASHES = 7
+# начиная с этой длины проверяемого массива contains_many векторизуется через NumPy
+NUMPY_THRESHOLD = 50_000
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+_MASK64 = 2 ** 64 - 1
+# нечётные 64-битные множители для мультипликативного хеширования (Fibonacci hashing)
+_BLOOM_MULTIPLIERS = (
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9,
+)
+
+
+def build_membership_index(values, bloom=False):
+    """Строит индекс, наиболее подходящий для данных
+
+    Args:
+        values (Iterable[int]): Целые числа (list, array('q') или массив NumPy)
+        bloom (bool): Ставить ли фильтр Блума перед отсортированным массивом
+
+    Returns:
+        SetIndex | BitmapIndex | SortedIndex: Индекс с проверкой "x in index"
+    """
+    if len(values) < SET_MAX_SIZE:
+        return SetIndex(values)
+    low, high = min(values), max(values)
+    if low < _INT64_MIN or high > _INT64_MAX:
+        return SetIndex(values)
+    span = high - low + 1
+    if span <= len(values) * BITMAP_MAX_BYTES_PER_ITEM * 8:
+        return BitmapIndex(values, low, high)
+    return SortedIndex(values, bloom=bloom)
+
+
+def _vectorized(values):
+    # модуль numpy, если проверку массива values выгодно векторизовать, иначе None
+    np = numpy()
+    if np is None:
+        return None
+    if isinstance(values, np.ndarray) or len(values) >= NUMPY_THRESHOLD:
+        return np
+    return None
+
+
+def _int64_buffer(values):
+    # array('q') или memoryview формата "q" (массив в общей памяти, см. offload) - читается без копии
+    return getattr(values, "typecode", None) == "q" or getattr(values, "format", None) == "q"
+
+
+def _as_int64(np, values):
+    if isinstance(values, np.ndarray):
+        return values.astype(np.int64, copy=False)
+    if _int64_buffer(values):
+        return np.frombuffer(values, dtype=np.int64)
+    return np.fromiter(values, dtype=np.int64, count=len(values))
+
+
+def _query_int64(np, values):
+    # проверяемые числа как массив int64 или None, если векторизовать нельзя (числа вне int64)
+    if np is None:
+        return None
+    try:
+        return _as_int64(np, values)
+    except (OverflowError, TypeError, ValueError):
+        return None
+
+
+class SetIndex:
+    """Индекс на обычном set"""
+
+    __slots__ = ("_items",)
+
+    def __init__(self, values):
+        self._items = set(values)
+
+    def __contains__(self, x):
+        return x in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def contains_many(self, values):
+        np = _vectorized(values)
+        if np is not None:
+            try:
+                items = np.fromiter(self._items, dtype=np.int64, count=len(self._items))
+                return np.isin(_as_int64(np, values), items)
+            except (OverflowError, TypeError, ValueError):
+                pass  # числа вне int64 - проверяем по одному
+        items = self._items
+        return [x in items for x in values]
+
+
+class BitmapIndex:
+    """Битовая карта для чисел из диапазона [low, high]
+
+    Attributes:
+        low (int): Наименьшее значение
+        span (int): Размер диапазона (high - low + 1)
+    """
+
+    __slots__ = ("low", "span", "_bits", "_count")
+
+    def __init__(self, values, low, high):
+        self.low = low
+        self.span = high - low + 1
+        bits = bytearray((self.span + 7) // 8)
+        np = _vectorized(values)
+        if np is not None:
+            offsets = _as_int64(np, values) - low
+            flags = np.zeros(self.span, dtype=np.bool_)
+            flags[offsets] = True
+            bits[:] = np.packbits(flags, bitorder="little").tobytes()
+            self._count = int(np.count_nonzero(flags))
+        else:
+            for x in values:
+                i = x - low
+                bits[i >> 3] |= 1 << (i & 7)
+            self._count = None
+        self._bits = bits
+
+    def __contains__(self, x):
+        i = x - self.low
+        return 0 <= i < self.span and bool(self._bits[i >> 3] & (1 << (i & 7)))
+
+    def __len__(self):
+        if self._count is None:
+            self._count = sum(bin(byte).count("1") for byte in self._bits)
+        return self._count
+
+    def contains_many(self, values):
+        low, span, bits = self.low, self.span, self._bits
+        np = _vectorized(values)
+        query = _query_int64(np, values)
+        if query is not None:
+            offsets = query - low
+            inside = (offsets >= 0) & (offsets < span)
+            offsets = np.where(inside, offsets, 0)
+            table = np.frombuffer(bits, dtype=np.uint8)
+            return inside & ((table[offsets >> 3] >> (offsets & 7).astype(np.uint8)) & 1).astype(np.bool_)
+        result = []
+        append = result.append
+        for x in values:
+            i = x - low
+            append(0 <= i < span and bool(bits[i >> 3] & (1 << (i & 7))))
+        return result
+
+
+class BloomFilter:
+    """Фильтр Блума для целых чисел int64
+
+    "x in filter" == False - числа точно нет; True - число, вероятно, есть
+
+    Attributes:
+        size_bits (int): Размер битового массива (степень двойки)
+        hashes (int): Количество хеш-функций
+    """
+
+    __slots__ = ("size_bits", "hashes", "_shift", "_bits")
+
+    def __init__(self, values, bits_per_item=BLOOM_BITS_PER_ITEM, hashes=BLOOM_HASHES):
+        wanted = max(64, len(values) * bits_per_item)
+        power = (wanted - 1).bit_length()
+        self.size_bits = 1 << power
+        self.hashes = min(hashes, len(_BLOOM_MULTIPLIERS))
+        self._shift = 64 - power
+        bits = bytearray(self.size_bits // 8)
+        np = _vectorized(values)
+        if np is not None:
+            flags = np.zeros(self.size_bits, dtype=np.bool_)
+            for positions in self._positions_many(np, _as_int64(np, values)):
+                flags[positions] = True
+            bits[:] = np.packbits(flags, bitorder="little").tobytes()
+        else:
+            for x in values:
+                for position in self._positions(x):
+                    bits[position >> 3] |= 1 << (position & 7)
+        self._bits = bits
+
+    def _positions(self, x):
+        # номера битов числа x: старшие биты произведения x * множитель (mod 2**64)
+        shift = self._shift
+        return [((x * multiplier) & _MASK64) >> shift for multiplier in _BLOOM_MULTIPLIERS[:self.hashes]]
+
+    def _positions_many(self, np, values):
+        keys = values.view(np.uint64)
+        shift = np.uint64(self._shift)
+        for multiplier in _BLOOM_MULTIPLIERS[:self.hashes]:
+            yield (keys * np.uint64(multiplier)) >> shift
+
+    def __contains__(self, x):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(x))
+
+    def contains_many(self, values):
+        np = _vectorized(values)
+        query = _query_int64(np, values)
+        if query is None:
+            return [x in self for x in values]
+        table = np.frombuffer(self._bits, dtype=np.uint8)
+        result = np.ones(len(values), dtype=np.bool_)
+        for positions in self._positions_many(np, query):
+            result &= ((table[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1) \
+                .astype(np.bool_)
+        return result
+
+
+class SortedIndex:
+    """Отсортированный массив различных чисел (array('q')) с бинарным поиском
+
+    Attributes:
+        bloom (BloomFilter | None): Фильтр, проверяемый перед бинарным поиском
+    """
+
+    __slots__ = ("_items", "bloom")
+
+    def __init__(self, values, bloom=False):
+        np = _vectorized(values)
+        if np is not None:
+            items = np.sort(_as_int64(np, values))
+            if len(items):
+                # np.unique заметно медленнее сортировки с отбрасыванием соседних повторов
+                items = items[np.concatenate(([True], items[1:] != items[:-1]))]
+            self._items = array("q", items.tobytes())
+        else:
+            self._items = array("q", sorted(set(values)))
+        self.bloom = BloomFilter(self._items) if bloom else None
+
+    def __contains__(self, x):
+        if self.bloom is not None and x not in self.bloom:
+            return False
+        items = self._items
+        i = bisect_left(items, x)
+        return i < len(items) and items[i] == x
+
+    def __len__(self):
+        return len(self._items)
+
+    def contains_many(self, values):
+        np = _vectorized(values)
+        query = _query_int64(np, values)
+        if query is None:
+            return [x in self for x in values]
+        values = query
+        items = np.frombuffer(self._items, dtype=np.int64)
+        if self.bloom is None:
+            return _searchsorted_member(np, items, values)
+        result = self.bloom.contains_many(values)
+        candidates = np.flatnonzero(result)
+        result[candidates] = _searchsorted_member(np, items, values[candidates])
+        return result
+
+
+def _searchsorted_member(np, items, values):
+    if len(items) == 0:
+        return np.zeros(len(values), dtype=np.bool_)
+    positions = np.searchsorted(items, values)
+    positions[positions == len(items)] = 0
+    return items[positions] == values
@@ -37,33 +37,65 @@ class Messages:
     INPUT_MANUAL_TASK5 = "Введите массив и цель через ';' (например: 1 2 3; 5)"
     INPUT_MANUAL_TASK8 = "Введите два массива через ';' (например: 12 34; 21 56)"
     INPUT_RANDOM_SIZE = "Введите размер массивов (целое число > 0):"
+    INPUT_TARGETS = "Введите одну или несколько целей через пробел (например: 5 -3 10):"
+    INPUT_APPEND = "Введите элементы, которые нужно добавить в конец массива (через пробел):"
 
     # успех
     DATA_SAVED = "Данные сохранены."
     GENERATED_SUCCESS = "Сгенерировано."
     ALGORITHM_DONE = "Алгоритм выполнен. Результат сохранён."
+    DOCUMENT_LOADED = "Данные загружены из файла. Элементов: "
+    ELEMENTS_APPENDED = "Элементы добавлены. Длина массива: "
 
     # ошибки
     INVALID_FORMAT = "Неверный формат. Используйте ';' для разделения данных."
     NO_DATA = "Сначала введите данные!"
     NOT_EXECUTED = "Сначала выполните алгоритм!"
     INVALID_INPUT = "Ошибка ввода."
+    INVALID_INPUT_SIZE = "Размер должен быть положительным целым числом."
+    INPUT_SIZE_TOO_LARGE = "Слишком большой размер. Максимум: "
+    INPUT_TOO_LONG = "Слишком длинный ввод. Максимум символов: "
+    INVALID_NUMBER = "Не целое число: "
+    NUMBER_OUT_OF_RANGE = "Число вне допустимого диапазона (64-битное целое)."
+    DOCUMENT_CHOOSE_TASK = "Сначала выберите задание, затем отправьте файл с данными."
+    DOCUMENT_UNSUPPORTED = "Поддерживаются файлы .txt, .csv и .npy."
+    DOCUMENT_TOO_LARGE = "Файл слишком большой. Максимум, МБ: "
+    DOCUMENT_TOO_MANY_ARRAYS = "Слишком много массивов в файле. Максимум: "
+    DOCUMENT_TOO_MANY_ITEMS = "Слишком много чисел в файле. Максимум: "
+    DOCUMENT_NOT_INTEGER = "Файл .npy должен содержать целые числа."
+    DOCUMENT_FAILED = "Не удалось загрузить файл. Попробуйте ещё раз."
+    DOCUMENT_STALE = "Пока загружался файл, вы вышли из задания - данные из файла не сохранены."
+    DOCUMENT_ARRAYS_EXPECTED = "В файле должно быть массивов: "
+    NUMPY_REQUIRED = "Для файлов .npy на сервере нужна библиотека NumPy."
+    TASK5_TARGET_REQUIRED = "Укажите цель после ';' в файле или в подписи к файлу."
+    COMPUTE_STILL_RUNNING = "Вычисление ещё идёт, результат придёт отдельным сообщением. Можно продолжать работу с ботом."
+    COMPUTE_ALREADY_RUNNING = "Вычисление на этих данных уже идёт, дождитесь результата."
+    COMPUTE_TIMEOUT = "Вычисление прервано: превышено время, сек: "
+    COMPUTE_STALE = "Данные изменились во время вычисления, результат не сохранён. Нажмите «Выполнить» ещё раз."
+    COMPUTE_FAILED = "Не удалось выполнить вычисление. Попробуйте ещё раз."
     UNKNOWN_STATE = "Неизвестное состояние."
     PLEASE_USE_BUTTONS = "Пожалуйста, используйте кнопки."
 
     # ошибки заданий
     TASK1_ARRAYS_LEN_MISMATCH = "Массивы должны быть одинаковой длины."
+    TASK1_NOT_INT64_FILE = "Размер файла не кратен 8 байтам: ожидается массив int64."
+    TASK1_SUM_OVERFLOW = "Числа слишком велики: сумма может не поместиться в int64."
     TASK5_EMPTY_ARRAY = "Массив не должен быть пустым."
     TASK8_EMPTY_ARRAY = "Массивы не должны быть пустыми."
     TASK8_NEGATIVE_NUMBER = "Отрицательные числа не допускаются."
+    TASK5_HISTOGRAM_TOO_LARGE = "Диапазон сумм слишком велик для построения распределения."
 
     # навигация
     ACTION_PROMPT = "Выберите действие:"
     NEXT_ACTION_PROMPT = "Выберите следующее действие:"
     BACK_TO_MAIN = "Возврат в главное меню."
     INVALID_MAIN_CHOICE = "Пожалуйста, используйте кнопки."
+    PAGE_EXPIRED = "Страница больше недоступна. Запросите результат заново."
 
     # результаты
     TASK1_RESULT = "Результат: "
     TASK5_RESULT_PREFIX = "Количество подмассивов с суммой "
+    TASK5_TARGETS_RESULT = "Количество подмассивов по целям (цель: количество):"
+    TASK5_HISTOGRAM_HEADER = "Самые частые суммы подмассивов (сумма: количество):"
+    TASK5_HISTOGRAM_DISTINCT = "Различных сумм: "
     TASK8_RESULT_PREFIX = "Количество общих элементов (с учётом перевёрнутых): "
\ No newline at end of file
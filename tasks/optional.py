@@ -0,0 +1,22 @@
+"""Необязательные зависимости
+
+NumPy не входит в requirements.txt: быстрые векторизованные ветки алгоритмов
+включаются, только если библиотека установлена. Импорт выполняется при первом
+обращении, а не при загрузке модуля задания
+"""
+
+_numpy = None
+_numpy_checked = False
+
+
+def numpy():
+    """Возвращает модуль numpy или None, если он не установлен"""
+    global _numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy = np
+        _numpy_checked = True
+    return _numpy
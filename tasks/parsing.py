@@ -0,0 +1,318 @@
+"""Разбор числового ввода пользователя, общий для всех заданий
+
+- Длина текста проверяется до любого разбора
+- Текст делится на секции по ';', каждая секция - на числа по пробелам;
+  количество секций и (при необходимости) равенство длин массивов проверяются
+  по количеству слов, ещё до преобразования в числа
+- Отрицательные числа ищутся только в секциях, где вообще встречается '-'
+- Числа сразу записываются в компактный array('q') (8 байт на число) без
+  промежуточного списка объектов int
+
+Файлы с данными (read_file_arrays) читаются потоково, без загрузки в одну строку:
+- .txt - формат ручного ввода (массивы через ';', числа через пробелы, запятые
+  или переводы строк), разбирается блоками по READ_CHUNK байт
+- .csv - по столбцу на массив, строка заголовка пропускается, пустые ячейки игнорируются;
+  разделитель (",", ";" или табуляция) определяется по первой строке
+- .npy - одномерный массив или две строки/два столбца целых чисел; файл
+  отображается в память (mmap) и копируется сразу в array('q')
+
+Пример:
+    arr1, arr2 = parse_arrays("1 2 3; 4 5 6", 2, equal_length=True)
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import os
+from array import array
+from .errors import ArraysLengthMismatchError, InputFormatError, InvalidInputError, NegativeNumberError
+from .messages import Messages
+from .optional import numpy
+
+# максимальная длина разбираемого текста, символов
+MAX_INPUT_LENGTH = 100_000
+# максимальный размер случайно генерируемого массива
+MAX_GENERATED_SIZE = 1_000_000
+# поддерживаемые форматы файлов с данными
+FILE_EXTENSIONS = (".txt", ".csv", ".npy")
+# допустимые разделители CSV
+CSV_DELIMITERS = ",;\t"
+# максимальное количество чисел в одном файле
+MAX_FILE_ITEMS = 20_000_000
+# размер блока чтения текстового файла, байт
+READ_CHUNK = 1 << 16
+# число не может быть длиннее (int64 - не больше 20 символов со знаком)
+_MAX_TOKEN_LENGTH = 64
+# байты, из которых может состоять число: на них нельзя разрезать блок
+_TOKEN_BYTES = frozenset(b"0123456789+-_")
+
+
+def parse_arrays(text, sections=2, non_negative=False, equal_length=False, max_length=MAX_INPUT_LENGTH):
+    """Разбирает несколько массивов целых чисел, разделённых ';'
+
+    Args:
+        text (str): Текст сообщения
+        sections (int): Ожидаемое количество массивов
+        non_negative (bool): Запрещать отрицательные числа
+        equal_length (bool): Требовать одинаковую длину массивов
+        max_length (int): Максимальная длина текста
+
+    Returns:
+        list[array]: Массивы array('q') в порядке следования
+
+    Raises:
+        InputFormatError: Если количество секций не совпадает с ожидаемым
+        ArraysLengthMismatchError: Если equal_length и длины массивов различаются
+        NegativeNumberError: Если non_negative и встретилось отрицательное число
+        InvalidInputError: Если текст слишком длинный или содержит не числа
+    """
+    _check_length(text, max_length)
+    parts = text.split(";")
+    if len(parts) != sections:
+        raise InputFormatError(Messages.INVALID_FORMAT)
+    tokens = [part.split() for part in parts]
+    if equal_length and any(len(words) != len(tokens[0]) for words in tokens):
+        raise ArraysLengthMismatchError(Messages.TASK1_ARRAYS_LEN_MISMATCH)
+    arrays = []
+    for part, words in zip(parts, tokens):
+        values = _to_array(words)
+        if non_negative and "-" in part and values and min(values) < 0:
+            raise NegativeNumberError(Messages.TASK8_NEGATIVE_NUMBER)
+        arrays.append(values)
+    return arrays
+
+
+def parse_array(text, non_negative=False, max_length=MAX_INPUT_LENGTH):
+    """Разбирает один массив целых чисел, разделённых пробелами
+
+    Returns:
+        array: Массив array('q')
+    """
+    return parse_arrays(text, 1, non_negative=non_negative, max_length=max_length)[0]
+
+
+def parse_size(text, limit=MAX_GENERATED_SIZE):
+    """Разбирает размер массива для генерации
+
+    Args:
+        text (str): Текст сообщения
+        limit (int): Наибольший допустимый размер
+
+    Returns:
+        int: Размер от 1 до limit
+
+    Raises:
+        InvalidInputError: Если текст не является целым числом из допустимого диапазона
+    """
+    text = text.strip()
+    # длинную строку цифр не преобразуем в int: она заведомо больше limit
+    if len(text) > len(str(limit)) + 1:
+        raise InvalidInputError(f"{Messages.INPUT_SIZE_TOO_LARGE}{limit}")
+    try:
+        n = int(text)
+    except ValueError:
+        raise InvalidInputError(Messages.INVALID_INPUT_SIZE) from None
+    if n <= 0:
+        raise InvalidInputError(Messages.INVALID_INPUT_SIZE)
+    if n > limit:
+        raise InvalidInputError(f"{Messages.INPUT_SIZE_TOO_LARGE}{limit}")
+    return n
+
+
+def _check_length(text, max_length):
+    if len(text) > max_length:
+        raise InvalidInputError(f"{Messages.INPUT_TOO_LONG}{max_length}")
+
+
+def read_file_arrays(path, file_name, max_sections=2, max_items=MAX_FILE_ITEMS):
+    """Читает массивы из файла с данными
+
+    Args:
+        path (str): Путь к файлу на диске
+        file_name (str): Исходное имя файла (по расширению выбирается формат)
+        max_sections (int): Сколько массивов может быть в файле
+        max_items (int): Максимальное общее количество чисел
+
+    Returns:
+        list[array]: Массивы array('q') в порядке следования
+
+    Raises:
+        InvalidInputError: Если формат не поддерживается или данные некорректны
+    """
+    extension = os.path.splitext(file_name or "")[1].lower()
+    if extension == ".npy":
+        return read_npy_arrays(path, max_sections, max_items)
+    if extension not in FILE_EXTENSIONS:
+        raise InvalidInputError(Messages.DOCUMENT_UNSUPPORTED)
+    with open(path, "rb") as f:
+        if extension == ".csv":
+            return read_csv_arrays(f, max_sections, max_items)
+        return read_text_arrays(f, max_sections, max_items)
+
+
+def read_text_arrays(f, max_sections=2, max_items=MAX_FILE_ITEMS, chunk_size=READ_CHUNK):
+    """Потоково разбирает текст в формате ручного ввода
+
+    Файл читается блоками; число, разрезанное границей блока, переносится в следующий
+
+    Args:
+        f (BinaryIO): Файл, открытый в двоичном режиме
+        max_sections (int): Сколько массивов (частей через ';') допускается
+        max_items (int): Максимальное общее количество чисел
+        chunk_size (int): Размер блока чтения, байт
+
+    Returns:
+        list[array]: Массивы array('q')
+    """
+    sections = [array("q")]
+    items = 0
+    tail = b""
+    chunk = f.read(max(chunk_size, len(codecs.BOM_UTF8)))
+    if chunk.startswith(codecs.BOM_UTF8):
+        chunk = chunk[len(codecs.BOM_UTF8):] + f.read(chunk_size)
+    while True:
+        data = tail + chunk
+        if chunk:
+            cut = len(data)
+            while cut and data[cut - 1] in _TOKEN_BYTES:
+                cut -= 1
+            tail, data = data[cut:], data[:cut]
+            if len(tail) > _MAX_TOKEN_LENGTH:
+                raise InvalidInputError(Messages.NUMBER_OUT_OF_RANGE)
+        for i, part in enumerate(data.split(b";")):
+            if i:
+                if len(sections) == max_sections:
+                    raise InvalidInputError(f"{Messages.DOCUMENT_TOO_MANY_ARRAYS}{max_sections}")
+                sections.append(array("q"))
+            words = part.replace(b",", b" ").split()
+            items += len(words)
+            if items > max_items:
+                raise InvalidInputError(f"{Messages.DOCUMENT_TOO_MANY_ITEMS}{max_items}")
+            sections[-1].extend(_to_array(words))
+        if not chunk:
+            return sections
+        chunk = f.read(chunk_size)
+
+
+def read_csv_arrays(f, max_sections=2, max_items=MAX_FILE_ITEMS):
+    """Потоково разбирает CSV: по столбцу на массив
+
+    Первая строка пропускается, если это заголовок (не все ячейки - числа);
+    пустые ячейки пропускаются, поэтому столбцы могут быть разной длины.
+    Разделитель определяется по первой строке (Excel с русской локалью пишет ";");
+    пустые ячейки в конце строки (лишний разделитель) столбцами не считаются
+
+    Args:
+        f (BinaryIO): Файл, открытый в двоичном режиме
+        max_sections (int): Сколько столбцов допускается
+        max_items (int): Максимальное общее количество чисел
+
+    Returns:
+        list[array]: Массивы array('q')
+    """
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    try:
+        first = text.readline()
+        try:
+            delimiter = csv.Sniffer().sniff(first, delimiters=CSV_DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = ","  # один столбец
+        columns = []
+        items = 0
+        for row_number, row in enumerate(csv.reader(itertools.chain((first,), text), delimiter=delimiter)):
+            cells = [cell.strip() for cell in row]
+            while cells and not cells[-1]:
+                cells.pop()
+            if row_number == 0 and not all(_is_int(cell) for cell in cells if cell):
+                continue  # заголовок
+            while len(columns) < len(cells):
+                if len(columns) == max_sections:
+                    raise InvalidInputError(f"{Messages.DOCUMENT_TOO_MANY_ARRAYS}{max_sections}")
+                columns.append(array("q"))
+            for column, cell in zip(columns, cells):
+                if cell:
+                    column.append(_to_int(cell))
+                    items += 1
+            if items > max_items:
+                raise InvalidInputError(f"{Messages.DOCUMENT_TOO_MANY_ITEMS}{max_items}")
+        return columns
+    except UnicodeDecodeError:
+        raise InvalidInputError(Messages.DOCUMENT_UNSUPPORTED) from None
+    finally:
+        text.detach()
+
+
+def read_npy_arrays(path, max_sections=2, max_items=MAX_FILE_ITEMS):
+    """Читает целочисленный массив NumPy (.npy), отображая файл в память
+
+    Одномерный массив - один массив; двумерный - по строке (или по столбцу,
+    если строк больше max_sections) на массив
+
+    Returns:
+        list[array]: Массивы array('q')
+    """
+    np = numpy()
+    if np is None:
+        raise InvalidInputError(Messages.NUMPY_REQUIRED)
+    try:
+        data = np.load(path, mmap_mode="r", allow_pickle=False)
+    except ValueError:
+        raise InvalidInputError(Messages.DOCUMENT_UNSUPPORTED) from None
+    if data.dtype.kind not in "iu":
+        raise InvalidInputError(Messages.DOCUMENT_NOT_INTEGER)
+    if data.size > max_items:
+        raise InvalidInputError(f"{Messages.DOCUMENT_TOO_MANY_ITEMS}{max_items}")
+    if data.ndim == 1:
+        columns = [data]
+    elif data.ndim == 2 and data.shape[0] <= max_sections:
+        columns = list(data)
+    elif data.ndim == 2 and data.shape[1] <= max_sections:
+        columns = list(data.T)
+    else:
+        raise InvalidInputError(f"{Messages.DOCUMENT_TOO_MANY_ARRAYS}{max_sections}")
+    if data.dtype.kind == "u" and data.size and int(data.max()) > 2 ** 63 - 1:
+        raise InvalidInputError(Messages.NUMBER_OUT_OF_RANGE)
+    arrays = []
+    for column in columns:
+        # копия из отображённого файла сразу в буфер array('q'), без промежуточных массивов
+        values = array("q", [0]) * len(column)
+        if len(column):
+            np.frombuffer(values, dtype=np.int64)[:] = column
+        arrays.append(values)
+    return arrays
+
+
+def _is_int(text):
+    try:
+        int(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _to_int(word):
+    try:
+        value = int(word)
+    except ValueError:
+        raise InvalidInputError(f"{Messages.INVALID_NUMBER}{word[:20]}") from None
+    if not -2 ** 63 <= value < 2 ** 63:
+        raise InvalidInputError(Messages.NUMBER_OUT_OF_RANGE)
+    return value
+
+
+def _to_array(words):
+    try:
+        return array("q", map(int, words))
+    except ValueError:
+        # медленный путь - только при ошибке: находим первое слово, которое не является числом
+        raise InvalidInputError(f"{Messages.INVALID_NUMBER}{_first_invalid(words)[:20]}") from None
+    except OverflowError:
+        raise InvalidInputError(Messages.NUMBER_OUT_OF_RANGE) from None
+
+
+def _first_invalid(words):
+    for word in words:
+        if not _is_int(word):
+            return word.decode(errors="replace") if isinstance(word, bytes) else word
+    return ""
@@ -0,0 +1,144 @@
+"""Отчёт с массивами для отправки пользователю
+
+Вместо того чтобы сразу собирать f-строку со всеми элементами массивов,
+обработчики FSM возвращают Report: заголовок и список секций (подпись, значение)
+Длину текста можно оценить без построения строки, а большой отчёт -
+выдать по страницам или записать в файл потоково, элемент за элементом
+
+Для небольших отчётов str(report) совпадает с прежним форматом сообщений:
+    Сгенерировано.
+    Массив 1: [1, 2, 3]
+    Массив 2: [4, 5, 6]
+"""
+
+import csv
+import io
+from itertools import zip_longest
+
+# разделитель элементов массива, как в str(list)
+_SEP = ", "
+
+
+def _is_array(value):
+    # массивом считается любая последовательность, кроме строк
+    return not isinstance(value, (str, bytes)) and hasattr(value, "__len__") and hasattr(value, "__iter__")
+
+
+def _iter_pieces(value):
+    # кусочки текстового представления значения: "[", "1", ", ", "2", "]"
+    if not _is_array(value):
+        yield str(value)
+        return
+    yield "["
+    first = True
+    for x in value:
+        if not first:
+            yield _SEP
+        first = False
+        yield str(x)
+    yield "]"
+
+
+class Report:
+    """Ответ пользователю, содержащий массивы
+
+    Attributes:
+        header (str | None): Первая строка отчёта (например, "Сгенерировано.")
+        sections (list[tuple[str, object]]): Пары (подпись, значение); подпись выводится как есть
+    """
+
+    __slots__ = ("header", "sections")
+
+    def __init__(self, header, sections):
+        self.header = header
+        self.sections = sections
+
+    def _lines(self):
+        # строки отчёта в виде последовательностей кусочков
+        if self.header:
+            yield iter((self.header,))
+        for label, value in self.sections:
+            yield _prefixed(label, value)
+
+    def length_exceeds(self, limit):
+        """Проверяет, длиннее ли текст отчёта limit символов
+
+        Останавливается, как только превышен предел, поэтому стоит O(limit),
+        а не O(размер массивов)
+        """
+        total = -1  # первая строка без символа перевода строки
+        for line in self._lines():
+            total += 1
+            for piece in line:
+                total += len(piece)
+                if total > limit:
+                    return True
+        return False
+
+    def __str__(self):
+        return "\n".join("".join(line) for line in self._lines())
+
+    def pages(self, page_size):
+        """Разбивает текст отчёта на страницы не длиннее page_size символов
+
+        Массивы разрезаются по границам элементов, строка целиком не строится;
+        кусочек длиннее страницы (огромное число, длинная подпись) режется по page_size
+
+        Yields:
+            str: Текст очередной страницы
+        """
+        page = []
+        size = 0
+        for line in self._lines():
+            if page:
+                page.append("\n")
+                size += 1
+            for piece in _bounded(line, page_size):
+                if size + len(piece) > page_size and page:
+                    yield "".join(page).rstrip()
+                    page = []
+                    size = 0
+                    if piece == _SEP:
+                        continue  # страница начинается с элемента, а не с ", "
+                page.append(piece)
+                size += len(piece)
+        if page:
+            yield "".join(page)
+
+    def scalars(self):
+        # заголовок и секции-скаляры одной строкой (подходит для подписи к файлу)
+        lines = [self.header] if self.header else []
+        lines.extend(f"{label}{value}" for label, value in self.sections if not _is_array(value))
+        return "\n".join(lines)
+
+    def to_csv(self):
+        """Записывает массивы отчёта в CSV в памяти: по столбцу на массив
+
+        Returns:
+            io.BytesIO: Буфер с содержимым файла (позиция в начале)
+        """
+        buffer = io.BytesIO()
+        text = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+        arrays = [(label, value) for label, value in self.sections if _is_array(value)]
+        writer = csv.writer(text)
+        writer.writerow(label.rstrip(": ") for label, _ in arrays)
+        writer.writerows(zip_longest(*(value for _, value in arrays), fillvalue=""))
+        text.flush()
+        text.detach()
+        buffer.seek(0)
+        return buffer
+
+
+def _bounded(pieces, size):
+    # кусочки не длиннее size: слишком длинные режутся на части
+    for piece in pieces:
+        if len(piece) <= size:
+            yield piece
+        else:
+            for start in range(0, len(piece), size):
+                yield piece[start:start + size]
+
+
+def _prefixed(label, value):
+    yield label
+    yield from _iter_pieces(value)
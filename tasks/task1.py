@@ -2,8 +2,7 @@
 
 Реализует алгоритм с использованием функционального программирования:
 - Чистые функции без побочных эффектов
-- Использование функций высшего порядка (zip_with, compose)
-- Отсутствие императивных циклов
+- Использование функций высшего порядка (zip_with)
 - Неизменяемость данных
 
 Алгоритм:
@@ -11,13 +10,36 @@
 2. Второй — по возрастанию
 3. Элементы складываются; если совпадают — обнуляются
 4. Результат сортируется по возрастанию
+
+solve() выбирает способ вычисления по данным:
+- значения из небольшого диапазона (сгенерированные данные - 1..20) - сортировка
+  подсчётом: массивы превращаются в серии (значение, количество), серии первого
+  массива по убыванию попарно сопоставляются с сериями второго по возрастанию,
+  и сразу накапливается количество каждой суммы - ни одной сортировки всего массива
+- большие массивы с широким диапазоном - векторизованно на NumPy (если установлен)
+- остальные - две сортировки и одна сортировка результата на месте
 """
 
-from .errors import ArraysLengthMismatchError, InvalidInputError
+from .cache import data_digest, result_cache
+from .compute import OFFLOAD_THRESHOLD, ComputeRequest
+from .errors import ArraysLengthMismatchError, InputFormatError, InvalidInputError
+from .fsm import TaskContext, TaskFSM
 from .messages import Messages
-from .functional_utils import zip_with, compose
+from .functional_utils import zip_with
+from .optional import numpy
+from .parsing import parse_arrays, parse_size
+from .report import Report
+from collections import Counter
+import functools
 import random
 
+# сортировка подсчётом, если диапазон значений каждого массива не шире этого
+COUNTING_MAX_SPAN = 4096
+# начиная с этой длины массивов используется ветка на NumPy
+NUMPY_THRESHOLD = 50_000
+# модуль значений, при котором сумма двух элементов гарантированно помещается в int64
+_INT64_SAFE_BOUND = 2 ** 62
+
 
 # функциональное ядро (чистые функции)
 
@@ -53,10 +75,11 @@ def sum_arrays_with_zero(a, b):
 
 
 def solve(arr1, arr2):
-    """Выполняет полный алгоритм задания 1 в функциональном стиле
+    """Выполняет полный алгоритм задания 1
 
-    Использует композицию функций для читаемости потока данных
-    Все функции — чистые, без побочных эффектов
+    Результат совпадает с последовательным применением sort_desc, sort_asc,
+    sum_arrays_with_zero и sort_asc, но сортировок и промежуточных списков
+    меньше: сложение с обнулением объединено с упорядочиванием результата
 
     Args:
         arr1 (list[int]): Первый массив
@@ -70,20 +93,134 @@ def solve(arr1, arr2):
     """
     if len(arr1) != len(arr2):
         raise ArraysLengthMismatchError(Messages.TASK1_ARRAYS_LEN_MISMATCH)
+    if len(arr1) == 0:
+        return []
+
+    if len(arr1) >= NUMPY_THRESHOLD:
+        np = numpy()
+        if np is not None:
+            result = _solve_numpy(np, arr1, arr2)
+            if result is not None:
+                return result
+    if max(arr1) - min(arr1) < COUNTING_MAX_SPAN and max(arr2) - min(arr2) < COUNTING_MAX_SPAN:
+        return _solve_counting(arr1, arr2)
+    return _solve_sorted(arr1, arr2)
+
+
+def _solve_counting(arr1, arr2):
+    # серии (значение, количество): первого массива - по убыванию, второго - по возрастанию
+    runs1 = sorted(Counter(arr1).items(), reverse=True)
+    runs2 = sorted(Counter(arr2).items())
+    return _expand(_pair_runs(runs1, runs2))
+
 
-    # композиция: сначала обработка, потом сортировка результата
-    pipeline = compose(sort_asc, sum_arrays_with_zero, sort_desc, sort_asc)
-    # но из-за двух аргументов в sum_arrays_with_zero - делаем по шагам:
-    a_desc = sort_desc(arr1)  # шаг 1
-    b_asc = sort_asc(arr2)  # шаг 2
-    summed = sum_arrays_with_zero(a_desc, b_asc)  # шаг 3
-    result = sort_asc(summed)  # шаг 4
+def _pair_runs(runs1, runs2):
+    """Сопоставляет серии двух отсортированных массивов одинаковой длины
+
+    Args:
+        runs1 (list[tuple[int, int]]): Серии первого массива по убыванию значений
+        runs2 (list[tuple[int, int]]): Серии второго массива по возрастанию значений
+
+    Returns:
+        Counter: Сумма с обнулением -> сколько раз она встречается в результате
+    """
+    totals = Counter()
+    i = j = 0
+    value1, left1 = runs1[0]
+    value2, left2 = runs2[0]
+    while True:
+        # следующие `pairs` позиций отсортированных массивов содержат value1 и value2
+        pairs = min(left1, left2)
+        totals[0 if value1 == value2 else value1 + value2] += pairs
+        left1 -= pairs
+        left2 -= pairs
+        if left1 == 0:
+            i += 1
+            if i == len(runs1):
+                break  # длины равны, поэтому серии второго массива тоже закончились
+            value1, left1 = runs1[i]
+        if left2 == 0:
+            j += 1
+            value2, left2 = runs2[j]
+    return totals
+
+
+def _expand(totals):
+    # отсортированный список, в котором каждое значение повторено нужное число раз
+    result = []
+    for value in sorted(totals):
+        result += [value] * totals[value]
     return result
 
 
+def _solve_sorted(arr1, arr2):
+    # сложение с обнулением - одним генератором списка, итоговая сортировка - на месте
+    summed = [0 if x == y else x + y for x, y in zip(sorted(arr1, reverse=True), sorted(arr2))]
+    summed.sort()
+    return summed
+
+
+def _as_int64(np, values):
+    # array('q') или memoryview формата "q" (массив в общей памяти, см. offload) - без копии
+    if getattr(values, "typecode", None) == "q" or getattr(values, "format", None) == "q":
+        return np.frombuffer(values, dtype=np.int64)
+    return np.fromiter(values, dtype=np.int64, count=len(values))
+
+
+def _solve_numpy(np, arr1, arr2):
+    # None - числа не помещаются в int64, решаем без NumPy
+    try:
+        a = _as_int64(np, arr1)
+        b = _as_int64(np, arr2)
+    except OverflowError:
+        return None
+    low1, high1 = int(a.min()), int(a.max())
+    low2, high2 = int(b.min()), int(b.max())
+    if max(-low1, high1, -low2, high2) >= _INT64_SAFE_BOUND:
+        return None
+    if high1 - low1 < COUNTING_MAX_SPAN and high2 - low2 < COUNTING_MAX_SPAN:
+        # сортировка подсчётом: серии из np.bincount вместо Counter
+        counts1 = np.bincount(a - low1)
+        counts2 = np.bincount(b - low2)
+        present1 = np.flatnonzero(counts1)[::-1]
+        present2 = np.flatnonzero(counts2)
+        runs1 = list(zip((present1 + low1).tolist(), counts1[present1].tolist()))
+        runs2 = list(zip((present2 + low2).tolist(), counts2[present2].tolist()))
+        return _expand(_pair_runs(runs1, runs2))
+    a_desc = np.sort(a)[::-1]
+    b_asc = np.sort(b)
+    summed = a_desc + b_asc
+    summed[a_desc == b_asc] = 0
+    summed.sort()
+    return summed.tolist()
+
+
 # FSM через словарь состояний (адаптирован под Telegram)
 
-class Task1FSM:
+class Task1Context(TaskContext):
+    # массивы и результат задания 1 (__slots__ - без словаря атрибутов на каждый объект)
+    # digest - хеш содержимого массивов для общего кэша результатов; сбрасывается при смене данных
+    __slots__ = ("arr1", "arr2", "result", "digest")
+
+    # хеш не сохраняется вместе с сессией: его дешевле посчитать заново
+    PERSISTED = ("arr1", "arr2", "result")
+
+    def __init__(self):
+        super().__init__()
+        self.arr1 = None
+        self.arr2 = None
+        self.result = None
+        self.digest = None
+
+    def set_arrays(self, arr1, arr2):
+        # новые данные: прежние результат и хеш больше не действительны
+        self.arr1 = arr1
+        self.arr2 = arr2
+        self.result = None
+        self.digest = None
+
+
+class Task1FSM(TaskFSM):
     """Конечный автомат для задания 1
 
     Управляет состояниями пользователя в Telegram-боте:
@@ -95,106 +232,79 @@ class Task1FSM:
 
     Attributes:
         state (str): Текущее состояние FSM (например, "menu", "input_manual")
-        context (dict): Хранит данные пользователя (массивы, результат)
+        context (Task1Context): Хранит данные пользователя (массивы, результат)
     """
 
+    __slots__ = ()
+
+    TASK = "task1"
+    MANUAL_PROMPT = Messages.INPUT_MANUAL_TASK1
+
     def __init__(self):
         # инициализирует FSM в состоянии "menu"
         self.state = "menu"
-        self.context = {"arr1": None, "arr2": None, "result": None}
+        self.context = Task1Context()
 
-    def handle(self, text):
-        """Обрабатывает текстовое сообщение от пользователя
+    def _input_manual(self, text):
+        """Обрабатывает ручной ввод двух массивов
 
         Args:
-            text (str): Текст сообщения (обычно текст кнопки или ввод данных)
+            text (str): Два массива, разделённые ';'
 
         Returns:
-            str: Ответное сообщение для отправки пользователю
+            str: Результат обработки или сообщение об ошибке
         """
-        if self.state == "menu":
-            return self._handle_menu(text)
-        elif self.state == "input_manual":
-            return self._handle_input_manual(text)
-        elif self.state == "input_random":
-            return self._handle_input_random(text)
-        elif self.state == "execute":
-            return self._handle_execute()
-        elif self.state == "show_result":
-            return self._handle_show_result()
-        else:
-            return Messages.UNKNOWN_STATE
-
-    def _handle_menu(self, text):
-        """Обрабатывает выбор действия в главном меню задания 1
-
-        Args:
-            text (str): Текст кнопки ("Ввести вручную", "Сгенерировать" и т.д.)
+        try:
+            arr1, arr2 = parse_arrays(text, 2, equal_length=True)
+            self.context.set_arrays(arr1, arr2)
+            self.state = "menu"
+            return Messages.DATA_SAVED
+        except InputFormatError:
+            return Messages.INVALID_FORMAT
+        except Exception as e:
+            self.state = "menu"
+            return f"{Messages.INVALID_INPUT}: {e}"
 
-        Returns:
-            str: Ответное сообщение
-        """
-        if text == "Ввести вручную":
-            self.state = "input_manual"
-            return Messages.INPUT_MANUAL_TASK1
-        elif text == "Сгенерировать":
-            self.state = "input_random"
-            return Messages.INPUT_RANDOM_SIZE
-        elif text == "Выполнить":
-            self.state = "execute"
-            return self._handle_execute()
-        elif text == "Результат":
-            self.state = "show_result"
-            return self._handle_show_result()
-        elif text == "Назад":
-            return "exit"
-        else:
-            return Messages.PLEASE_USE_BUTTONS
-
-    def _handle_input_manual(self, text):
-        """Обрабатывает ручной ввод двух массивов
+    def load_arrays(self, arrays, caption=None):
+        """Загружает массивы из файла с данными (см. tasks.parsing.read_file_arrays)
 
         Args:
-            text (str): Два массива, разделённые ';'
+            arrays (list[array]): Массивы из файла
+            caption (str | None): Подпись к файлу (не используется)
 
         Returns:
-            str: Результат обработки или сообщение об ошибке
+            str: Результат загрузки или сообщение об ошибке
         """
+        self.state = "menu"
         try:
-            parts = text.split(";")
-            if len(parts) != 2:
-                return Messages.INVALID_FORMAT
-            arr1 = list(map(int, parts[0].split()))
-            arr2 = list(map(int, parts[1].split()))
+            if len(arrays) != 2:
+                raise InvalidInputError(f"{Messages.DOCUMENT_ARRAYS_EXPECTED}2")
+            arr1, arr2 = arrays
             if len(arr1) != len(arr2):
                 raise ArraysLengthMismatchError(Messages.TASK1_ARRAYS_LEN_MISMATCH)
-            self.context["arr1"] = arr1
-            self.context["arr2"] = arr2
-            self.context["result"] = None
-            self.state = "menu"
-            return Messages.DATA_SAVED
         except Exception as e:
-            self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
+        self.context.set_arrays(arr1, arr2)
+        return f"{Messages.DOCUMENT_LOADED}{len(arr1) + len(arr2)}"
 
-    def _handle_input_random(self, text):
+    def _input_random(self, text):
         """Обрабатывает ввод размера для генерации случайных массивов
 
         Args:
             text (str): Размер массивов (целое число)
 
         Returns:
-            str: Результат генерации или сообщение об ошибке
+            str | Report: Сгенерированные данные или сообщение об ошибке
         """
         try:
-            n = int(text)
-            if n <= 0:
-                raise InvalidInputError(Messages.INVALID_INPUT_SIZE)
-            self.context["arr1"] = [random.randint(1, 20) for _ in range(n)]
-            self.context["arr2"] = [random.randint(1, 20) for _ in range(n)]
-            self.context["result"] = None
+            n = parse_size(text)
+            self.context.set_arrays([random.randint(1, 20) for _ in range(n)],
+                                    [random.randint(1, 20) for _ in range(n)])
             self.state = "menu"
-            return f"{Messages.GENERATED_SUCCESS}\nМассив 1: {self.context['arr1']}\nМассив 2: {self.context['arr2']}"
+            return Report(Messages.GENERATED_SUCCESS, [
+                ("Массив 1: ", self.context.arr1),
+                ("Массив 2: ", self.context.arr2),
+            ])
         except Exception as e:
             self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
@@ -205,29 +315,49 @@ class Task1FSM:
         Returns:
             str: Результат выполнения или сообщение об ошибке
         """
-        if self.context["arr1"] is None or self.context["arr2"] is None:
+        if self.context.arr1 is None or self.context.arr2 is None:
             self.state = "menu"
             return Messages.NO_DATA
         try:
-            self.context["result"] = solve(self.context["arr1"], self.context["arr2"])
+            # одинаковые данные (повторное выполнение, те же данные у другого пользователя) не пересчитываются
+            arr1, arr2 = self.context.arr1, self.context.arr2
+            key = ("task1", self._digest())
             self.state = "menu"
+            if len(arr1) + len(arr2) >= OFFLOAD_THRESHOLD and key not in result_cache:
+                # большие массивы считаются вне обработчика сообщений (см. tasks.compute)
+                return ComputeRequest(solve, [arr1, arr2], key=key, result_items=len(arr1),
+                                      apply=functools.partial(self._apply_result, key[1]))
+            self.context.result = result_cache.get_or_compute(key, lambda: solve(arr1, arr2))
             return Messages.ALGORITHM_DONE
         except Exception as e:
             self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
 
+    def _apply_result(self, digest, result):
+        # результат вычисления вне обработчика сохраняется, только если данные за это время не изменились
+        if self.context.digest != digest:
+            return Messages.COMPUTE_STALE
+        self.context.result = result
+        return Messages.ALGORITHM_DONE
+
+    def _digest(self):
+        # хеш текущих массивов (считается один раз на данные)
+        if self.context.digest is None:
+            self.context.digest = data_digest(self.context.arr1, self.context.arr2)
+        return self.context.digest
+
     def _handle_show_result(self):
         """Возвращает результат выполнения алгоритма
 
         Returns:
-            str: Результат или сообщение об ошибке
+            str | Report: Результат или сообщение об ошибке
         """
-        if self.context["result"] is None:
+        if self.context.result is None:
             self.state = "menu"
             return Messages.NOT_EXECUTED
-        result = self.context["result"]
+        result = self.context.result
         self.state = "menu"
-        return f"{Messages.TASK1_RESULT}{result}"
+        return Report(None, [(Messages.TASK1_RESULT, result)])
 
 # тестирование чистой логики
 if __name__ == "__main__":
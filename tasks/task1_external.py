@@ -0,0 +1,305 @@
+"""Задание 1 для массивов, не помещающихся в оперативную память
+
+Массивы хранятся в двоичных файлах: подряд идущие int64 в порядке байтов машины
+(как array('q').tofile или numpy.ndarray.tofile). Память ограничена размером
+блока chunk_items, а не длиной массивов:
+
+1. Каждый файл сортируется внешней сортировкой слиянием: файл читается через
+   mmap кусками по chunk_items элементов, каждый кусок сортируется в памяти и
+   записывается во временный файл-серию, затем серии сливаются (не больше
+   MERGE_FAN_IN серий за проход; с NumPy - поблочно, без него - heapq.merge)
+2. Оба массива сортируются по возрастанию; "первый массив по убыванию" - это
+   чтение отсортированного файла с конца, отдельная сортировка не нужна
+3. Сложение с обнулением выполняется потоково, блок за блоком; из сумм сразу
+   формируются отсортированные серии (без промежуточного файла)
+4. Серии сумм сливаются в итоговый файл, который записывается через mmap
+
+Пример:
+    write_array("a.bin", [5, 7, 4])
+    write_array("b.bin", [4, 9, 3])
+    solve_files("a.bin", "b.bin", "result.bin")
+    list(iter_array("result.bin"))  # [9, 10, 13] - как solve([5, 7, 4], [4, 9, 3])
+"""
+
+import heapq
+import mmap
+import os
+import tempfile
+from array import array
+from .errors import ArraysLengthMismatchError, InvalidInputError
+from .messages import Messages
+from .optional import numpy
+
+ITEM_SIZE = array("q").itemsize
+# сколько элементов сортируется в памяти за раз (8 МБ данных int64)
+CHUNK_ITEMS = 1 << 20
+# размер блока чтения и записи при слиянии, элементов
+BLOCK_ITEMS = 1 << 14
+# сколько серий сливается за один проход
+MERGE_FAN_IN = 64
+# модуль значений, при котором сумма двух элементов гарантированно помещается в int64
+_INT64_SAFE_BOUND = 2 ** 62
+
+
+def write_array(path, values):
+    """Записывает целые числа в двоичный файл int64
+
+    Args:
+        path (str): Путь к файлу
+        values (Iterable[int]): Числа
+    """
+    with open(path, "wb") as f:
+        block = array("q")
+        for x in values:
+            block.append(x)
+            if len(block) >= BLOCK_ITEMS:
+                block.tofile(f)
+                block = array("q")
+        block.tofile(f)
+
+
+def array_length(path):
+    """Возвращает количество элементов в двоичном файле int64
+
+    Raises:
+        InvalidInputError: Если размер файла не кратен 8 байтам
+    """
+    size = os.path.getsize(path)
+    if size % ITEM_SIZE:
+        raise InvalidInputError(Messages.TASK1_NOT_INT64_FILE)
+    return size // ITEM_SIZE
+
+
+def iter_blocks(path, reverse=False, block_items=None):
+    """Читает двоичный файл int64 блоками через mmap
+
+    Args:
+        path (str): Путь к файлу
+        reverse (bool): Читать с конца (элементы каждого блока тоже в обратном порядке)
+        block_items (int | None): Размер блока, элементов (по умолчанию BLOCK_ITEMS)
+
+    Yields:
+        array: Очередной блок (array('q'))
+    """
+    n = array_length(path)
+    if n == 0:
+        return
+    block_items = block_items or BLOCK_ITEMS
+    # при чтении с конца блоки отсчитываются от конца файла: неполным оказывается последний
+    # прочитанный блок, поэтому блоки двух файлов одной длины, читаемых навстречу, совпадают по размеру
+    if reverse:
+        bounds = ((max(0, stop - block_items), stop) for stop in range(n, 0, -block_items))
+    else:
+        bounds = ((start, min(start + block_items, n)) for start in range(0, n, block_items))
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start, stop in bounds:
+            block = array("q")
+            block.frombytes(mm[start * ITEM_SIZE:stop * ITEM_SIZE])
+            if reverse:
+                block.reverse()
+            yield block
+
+
+def iter_array(path, reverse=False):
+    # все элементы файла по одному (по возрастанию позиции или с конца)
+    for block in iter_blocks(path, reverse):
+        yield from block
+
+
+def external_sort(path, out_path, chunk_items=CHUNK_ITEMS, tmp_dir=None):
+    """Сортирует двоичный файл int64 по возрастанию, используя не больше chunk_items элементов памяти
+
+    Args:
+        path (str): Исходный файл
+        out_path (str): Файл для результата (может совпадать с path)
+        chunk_items (int): Сколько элементов сортировать в памяти за раз
+        tmp_dir (str | None): Каталог для временных серий
+
+    Returns:
+        int: Количество элементов
+    """
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as work:
+        runs = _RunWriter(work, chunk_items)
+        for block in iter_blocks(path, block_items=chunk_items):
+            runs.add(block)
+        runs.finish()
+        return _merge_runs(runs.paths, out_path, work)
+
+
+def solve_files(path1, path2, out_path, chunk_items=CHUNK_ITEMS, tmp_dir=None):
+    """Выполняет алгоритм задания 1 над массивами из файлов
+
+    Результат совпадает с tasks.task1.solve для тех же массивов
+
+    Args:
+        path1 (str): Файл первого массива (int64)
+        path2 (str): Файл второго массива (int64)
+        out_path (str): Файл для отсортированного по возрастанию результата (int64)
+        chunk_items (int): Сколько элементов обрабатывать в памяти за раз
+        tmp_dir (str | None): Каталог для временных файлов
+
+    Returns:
+        int: Длина результата
+
+    Raises:
+        ArraysLengthMismatchError: Если длины массивов не совпадают
+        InvalidInputError: Если файл не является массивом int64 или сумма может не поместиться в int64
+    """
+    n = array_length(path1)
+    if n != array_length(path2):
+        raise ArraysLengthMismatchError(Messages.TASK1_ARRAYS_LEN_MISMATCH)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as work:
+        sorted1 = os.path.join(work, "sorted1.bin")
+        sorted2 = os.path.join(work, "sorted2.bin")
+        external_sort(path1, sorted1, chunk_items, work)
+        external_sort(path2, sorted2, chunk_items, work)
+
+        # i-й элемент первого массива по убыванию складывается с i-м второго по возрастанию
+        runs = _RunWriter(work, chunk_items)
+        for a_desc, b_asc in zip(iter_blocks(sorted1, reverse=True), iter_blocks(sorted2)):
+            runs.add(_sum_with_zero(a_desc, b_asc))
+        runs.finish()
+        return _merge_runs(runs.paths, out_path, work)
+
+
+def _sum_with_zero(a, b):
+    # поэлементная сумма с обнулением совпадений для двух блоков одной длины
+    np = numpy()
+    if np is not None:
+        x = np.frombuffer(a, dtype=np.int64)
+        y = np.frombuffer(b, dtype=np.int64)
+        if len(x) and max(-int(x.min()), int(x.max()), -int(y.min()), int(y.max())) >= _INT64_SAFE_BOUND:
+            raise InvalidInputError(Messages.TASK1_SUM_OVERFLOW)
+        summed = x + y
+        summed[x == y] = 0
+        return array("q", summed.tobytes())
+    try:
+        return array("q", [0 if x == y else x + y for x, y in zip(a, b)])
+    except OverflowError:
+        raise InvalidInputError(Messages.TASK1_SUM_OVERFLOW) from None
+
+
+class _RunWriter:
+    """Собирает блоки в куски по chunk_items, сортирует каждый и пишет во временный файл-серию"""
+
+    def __init__(self, work, chunk_items):
+        self.work = work
+        self.chunk_items = chunk_items
+        self.paths = []
+        self._pending = array("q")
+
+    def add(self, block):
+        self._pending.extend(block)
+        if len(self._pending) >= self.chunk_items:
+            self._flush()
+
+    def finish(self):
+        if self._pending:
+            self._flush()
+
+    def _flush(self):
+        path = os.path.join(self.work, f"run{len(self.paths)}_{id(self)}.bin")
+        with open(path, "wb") as f:
+            _sorted_array(self._pending).tofile(f)
+        self.paths.append(path)
+        self._pending = array("q")
+
+
+def _sorted_array(values):
+    np = numpy()
+    if np is not None:
+        return array("q", np.sort(np.frombuffer(values, dtype=np.int64)).tobytes())
+    return array("q", sorted(values))
+
+
+def _merge_runs(paths, out_path, work):
+    # сливает отсортированные серии в out_path, при необходимости в несколько проходов
+    generation = 0
+    while len(paths) > MERGE_FAN_IN:
+        merged = []
+        for i in range(0, len(paths), MERGE_FAN_IN):
+            group = paths[i:i + MERGE_FAN_IN]
+            target = os.path.join(work, f"merge{generation}_{i}.bin")
+            with open(target, "wb") as f:
+                for block in _merged_blocks(group):
+                    block.tofile(f)
+            for path in group:
+                os.remove(path)
+            merged.append(target)
+        paths = merged
+        generation += 1
+
+    total = sum(array_length(path) for path in paths)
+    with open(out_path, "w+b") as f:
+        f.truncate(total * ITEM_SIZE)
+        if total == 0:
+            return 0
+        with mmap.mmap(f.fileno(), total * ITEM_SIZE) as mm:
+            position = 0
+            for block in _merged_blocks(paths):
+                data = block.tobytes()
+                mm[position:position + len(data)] = data
+                position += len(data)
+            mm.flush()
+    return total
+
+
+def _merged_blocks(paths):
+    # результат слияния серий блоками (array('q') или массивы NumPy)
+    if len(paths) == 1:
+        yield from iter_blocks(paths[0])
+        return
+    np = numpy()
+    if np is not None:
+        yield from _merged_blocks_numpy(np, paths)
+        return
+    merged = heapq.merge(*(iter_array(path) for path in paths))
+    block = array("q")
+    for x in merged:
+        block.append(x)
+        if len(block) >= BLOCK_ITEMS:
+            yield block
+            block = array("q")
+    if block:
+        yield block
+
+
+def _merged_blocks_numpy(np, paths):
+    # поблочное слияние: из буфера каждой серии забираются все элементы, не превосходящие
+    # наименьшего из последних элементов буферов, - они гарантированно идут раньше
+    # всего, что ещё не прочитано; забранное сортируется вместе одним вызовом
+    sources = [iter_blocks(path) for path in paths]
+    buffers = [_next_block(np, source) for source in sources]
+    while True:
+        active = [i for i, buffer in enumerate(buffers) if buffer is not None]
+        if not active:
+            return
+        bound = min(buffers[i][-1] for i in active)
+        parts = []
+        for i in active:
+            buffer = buffers[i]
+            cut = int(np.searchsorted(buffer, bound, side="right"))
+            parts.append(buffer[:cut])
+            buffers[i] = buffer[cut:] if cut < len(buffer) else _next_block(np, sources[i])
+        block = np.concatenate(parts)
+        block.sort()
+        yield block
+
+
+def _next_block(np, source):
+    block = next(source, None)
+    return None if block is None else np.frombuffer(block, dtype=np.int64)
+
+
+# запуск из командной строки: python -m tasks.task1_external arr1.bin arr2.bin result.bin
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) != 4:
+        print("Использование: python -m tasks.task1_external arr1.bin arr2.bin result.bin")
+        sys.exit(1)
+    start_time = time.time()
+    length = solve_files(*sys.argv[1:])
+    print(f"Готово: {length} элементов за {time.time() - start_time:.2f} сек")
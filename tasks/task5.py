@@ -13,8 +13,14 @@
 с использованием техники префиксных сумм (согласно "Приёмы эффективного кода на Python.pdf").
 """
 
-from .errors import EmptyArrayError
+from .errors import EmptyArrayError, InvalidInputError
 from .messages import Messages
+from .optional import numpy
+
+# начиная с этой длины массива используется векторизованный подсчёт на NumPy
+NUMPY_THRESHOLD = 50_000
+# предел модуля префиксных сумм, при котором int64 гарантированно не переполняется
+_INT64_SAFE_BOUND = 2 ** 62
 
 # функциональное ядро (чистая, эффективная функция)
 
@@ -27,6 +33,10 @@ def count_subarrays_with_sum(arr, target):
     - использование эффективных структур данных (dict)
     - минимизация потребления памяти
 
+    Для массивов длиннее NUMPY_THRESHOLD (если установлен NumPy) считает
+    векторизованно; если префиксные суммы могут не поместиться в int64 -
+    точно, на целых числах Python
+
     Args:
         arr (list[int]): Исходный массив целых чисел
         target (int): Целевая сумма
@@ -37,9 +47,20 @@ def count_subarrays_with_sum(arr, target):
     Raises:
         EmptyArrayError: Если входной массив пуст
     """
-    if not arr:
+    if len(arr) == 0:
         raise EmptyArrayError(Messages.TASK5_EMPTY_ARRAY)
 
+    if len(arr) >= NUMPY_THRESHOLD:
+        np = numpy()
+        if np is not None:
+            count = _count_subarrays_numpy(np, arr, target)
+            if count is not None:
+                return count
+    return _count_subarrays_python(arr, target)
+
+
+def _count_subarrays_python(arr, target):
+    # префиксные суммы + словарь частот, O(n)
     prefix_sum = 0
     count = 0
     # словарь: {префиксная_сумма: количество_встречаний}
@@ -55,13 +76,444 @@ def count_subarrays_with_sum(arr, target):
     return count
 
 
+def _int64_buffer(values):
+    # array('q') или memoryview формата "q" (массив в общей памяти, см. offload) - читается без копии
+    return getattr(values, "typecode", None) == "q" or getattr(values, "format", None) == "q"
+
+
+def _as_int64(np, arr):
+    # массив NumPy int64 без лишних копий (None, если числа не помещаются в int64)
+    try:
+        if isinstance(arr, np.ndarray):
+            return arr.astype(np.int64, copy=False)
+        if _int64_buffer(arr):
+            return np.frombuffer(arr, dtype=np.int64)
+        return np.fromiter(arr, dtype=np.int64, count=len(arr))
+    except (OverflowError, TypeError, ValueError):
+        return None
+
+
+def _count_subarrays_numpy(np, arr, target):
+    """Векторизованный подсчёт: префиксные суммы через cumsum, пары - через одну сортировку
+
+    Нужно посчитать пары i < j с prefix[i] == prefix[j] - target. Каждая позиция даёт
+    два ключа: "вставку" (prefix[i], i) и "запрос" (prefix[j] - target, j), упакованные
+    в одно int64: значение * 2(n + 1) + 2 * позиция + тип. После сортировки ключи
+    сгруппированы по значению, а внутри группы идут по позиции, причём вставка i
+    оказывается раньше запроса j ровно при i < j. Ответ на запрос - число вставок
+    перед ним в его группе, его дают накопленные суммы. Итого O(n log n) без циклов на Python
+
+    Returns:
+        int | None: Количество подмассивов или None, если возможно переполнение int64
+    """
+    values = _as_int64(np, arr)
+    if values is None:
+        return None
+    n = len(values)
+    largest = max(abs(int(values.max())), abs(int(values.min())))
+    if largest * n + abs(target) >= _INT64_SAFE_BOUND:
+        return None
+
+    inserts = np.empty(n + 1, dtype=np.int64)
+    inserts[0] = 0
+    np.cumsum(values, out=inserts[1:])
+    queries = inserts - target
+
+    low = min(int(inserts.min()), int(queries.min()))
+    high = max(int(inserts.max()), int(queries.max()))
+    width = 2 * (n + 1)
+    if (high - low + 1) * width >= _INT64_SAFE_BOUND:
+        # слишком широкий диапазон значений - заменяем значения их рангами
+        levels = np.unique(np.concatenate((inserts, queries)))
+        inserts = np.searchsorted(levels, inserts)
+        queries = np.searchsorted(levels, queries)
+        low = 0
+
+    positions = 2 * np.arange(n + 1, dtype=np.int64)
+    keys = np.concatenate(((inserts - low) * width + positions + 1,
+                           (queries - low) * width + positions))
+    keys.sort()
+
+    is_insert = keys & 1
+    inserts_upto = np.cumsum(is_insert)  # вставок левее ключа (для запроса - включительно)
+    group = keys // width
+    starts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+    group_queries = np.diff(np.append(starts, len(keys))) - np.add.reduceat(is_insert, starts)
+    group_base = inserts_upto[starts] - is_insert[starts]  # вставок левее начала группы
+    # сумма по запросам (вставок левее запроса) - (вставок левее начала его группы)
+    return int(np.dot(inserts_upto, 1 - is_insert) - np.dot(group_base, group_queries))
+
+
+class SubarraySumCounter:
+    """Потоковый счётчик подмассивов с заданной суммой
+
+    Хранит текущую префиксную сумму, словарь частот и ответ, поэтому добавление
+    элемента в конец массива обновляет ответ за O(1), без пересчёта с начала
+    (тот же алгоритм, что в count_subarrays_with_sum, но с сохранённым состоянием)
+
+    Attributes:
+        target (int): Целевая сумма
+        length (int): Сколько элементов уже учтено
+        count (int): Количество подмассивов учтённой части с суммой target
+    """
+
+    __slots__ = ("target", "length", "count", "_prefix_sum", "_sum_freq")
+
+    def __init__(self, target, arr=()):
+        self.target = target
+        self.length = 0
+        self.count = 0
+        self._prefix_sum = 0
+        self._sum_freq = {0: 1}
+        self.extend(arr)
+
+    def append(self, num):
+        # учитывает один новый элемент в конце массива
+        self._prefix_sum += num
+        self.count += self._sum_freq.get(self._prefix_sum - self.target, 0)
+        self._sum_freq[self._prefix_sum] = self._sum_freq.get(self._prefix_sum, 0) + 1
+        self.length += 1
+
+    def extend(self, nums):
+        # учитывает несколько элементов подряд (локальные переменные - быстрее атрибутов)
+        prefix_sum, count, target = self._prefix_sum, self.count, self.target
+        sum_freq = self._sum_freq
+        added = 0
+        for num in nums:
+            prefix_sum += num
+            count += sum_freq.get(prefix_sum - target, 0)
+            sum_freq[prefix_sum] = sum_freq.get(prefix_sum, 0) + 1
+            added += 1
+        self._prefix_sum, self.count = prefix_sum, count
+        self.length += added
+
+
+# несколько целей и распределение сумм
+
+# распределение сумм строится, только если все суммы подмассивов укладываются в этот диапазон
+HISTOGRAM_MAX_RANGE = 4_000_000
+# без NumPy распределение считается перебором O(n²) - только для коротких массивов
+HISTOGRAM_PYTHON_MAX_LEN = 3000
+# размер блока, суммы внутри которого считаются напрямую
+_HISTOGRAM_LEAF = 32
+# короче этого свёртка выполняется напрямую, длиннее - через БПФ
+_DIRECT_CONVOLVE_LEN = 64
+
+
+class PrefixSumIndex:
+    """Индекс префиксных сумм массива для быстрых ответов на разные цели
+
+    Строится один раз и хранится в контексте FSM: при смене цели на тех же данных
+    массив заново не суммируется. С NumPy (для длинных массивов) хранит отсортированные
+    ключи (prefix[i], i), и ответ на новую цель - это два searchsorted без сортировки.
+    Уже посчитанные цели запоминаются
+
+    Attributes:
+        length (int): Длина исходного массива
+    """
+
+    __slots__ = ("length", "_prefix", "_keys", "_levels", "_level_sizes", "_level_starts", "_answers")
+
+    def __init__(self, arr):
+        if len(arr) == 0:
+            raise EmptyArrayError(Messages.TASK5_EMPTY_ARRAY)
+        self.length = len(arr)
+        self._prefix = None
+        self._keys = None
+        self._levels = self._level_sizes = self._level_starts = None
+        self._answers = {}
+        np = numpy() if len(arr) >= NUMPY_THRESHOLD else None
+        if np is not None and self._build_numpy(np, arr):
+            return
+        prefix = [0]
+        running = 0
+        for num in arr:
+            running += num
+            prefix.append(running)
+        self._prefix = prefix
+
+    def _build_numpy(self, np, arr):
+        values = _as_int64(np, arr)
+        if values is None:
+            return False
+        n = len(values)
+        largest = max(abs(int(values.max())), abs(int(values.min())))
+        if largest * n * (n + 1) >= _INT64_SAFE_BOUND:
+            return False
+        prefix = np.empty(n + 1, dtype=np.int64)
+        prefix[0] = 0
+        np.cumsum(values, out=prefix[1:])
+        width = n + 1
+        # ключ (значение, позиция): внутри одного значения позиции идут по возрастанию
+        keys = (prefix - int(prefix.min())) * width + np.arange(width, dtype=np.int64)
+        keys.sort()
+        # различные значения префиксных сумм, сколько раз каждое встречается и где начинается
+        values = keys // width
+        starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+        self._keys = keys
+        self._levels = values[starts]
+        self._level_sizes = np.diff(np.append(starts, width))
+        self._level_starts = np.append(starts, width)
+        return True
+
+    def count(self, target):
+        # количество подмассивов с суммой target
+        return self.count_many((target,))[target]
+
+    def count_many(self, targets):
+        """Количество подмассивов для каждой из целей
+
+        Args:
+            targets (Iterable[int]): Цели
+
+        Returns:
+            dict[int, int]: {цель: количество подмассивов}
+        """
+        targets = list(dict.fromkeys(targets))
+        missing = [t for t in targets if t not in self._answers]
+        if missing:
+            if self._keys is not None:
+                for target in missing:
+                    self._answers[target] = self._count_numpy(target)
+            else:
+                self._answers.update(self._count_python(missing))
+        return {t: self._answers[t] for t in targets}
+
+    def _count_python(self, targets):
+        # один проход по префиксным суммам сразу для всех целей
+        sum_freq = {}
+        counts = dict.fromkeys(targets, 0)
+        for prefix_sum in self._prefix:
+            for target in targets:
+                counts[target] += sum_freq.get(prefix_sum - target, 0)
+            sum_freq[prefix_sum] = sum_freq.get(prefix_sum, 0) + 1
+        return counts
+
+    def _count_numpy(self, target):
+        np = numpy()
+        width = self.length + 1
+        if abs(target) * width >= _INT64_SAFE_BOUND:
+            return 0  # такой суммы быть не может: |сумма| не больше n * max|a|
+        # ключ запроса для позиции j - ключ вставки j, сдвинутый на target значений вниз;
+        # сдвиг не меняет порядок, поэтому запросы уже отсортированы
+        queries = self._keys - target * width
+        # ключей меньше запроса j: все значения меньше нужного + нужное значение с i < j
+        below = int(np.searchsorted(self._keys, queries).sum())
+        # ключей со значением меньше нужного - считается по различным значениям, а не по позициям
+        smaller = self._level_starts[np.searchsorted(self._levels, self._levels - target)]
+        return below - int(np.dot(self._level_sizes, smaller))
+
+
+def count_subarrays_for_targets(arr, targets):
+    """Подсчитывает подмассивы сразу для нескольких целей за один проход
+
+    Args:
+        arr (list[int]): Исходный массив целых чисел
+        targets (Iterable[int]): Цели
+
+    Returns:
+        dict[int, int]: {цель: количество подмассивов с такой суммой}
+
+    Raises:
+        EmptyArrayError: Если входной массив пуст
+    """
+    return PrefixSumIndex(arr).count_many(targets)
+
+
+class SumHistogram:
+    """Распределение сумм всех непрерывных подмассивов
+
+    Attributes:
+        low (int): Наименьшая сумма, которой соответствует counts[0]
+        counts (list[int]): counts[k] - количество подмассивов с суммой low + k
+    """
+
+    __slots__ = ("low", "counts")
+
+    def __init__(self, low, counts):
+        self.low = low
+        self.counts = counts
+
+    def get(self, total):
+        # количество подмассивов с суммой total
+        k = total - self.low
+        return self.counts[k] if 0 <= k < len(self.counts) else 0
+
+    def distinct(self):
+        # количество различных сумм
+        return sum(1 for c in self.counts if c)
+
+    def most_common(self, k):
+        # k самых частых сумм: [(сумма, количество), ...]
+        top = sorted(((c, -i) for i, c in enumerate(self.counts) if c), reverse=True)[:k]
+        return [(self.low - i, c) for c, i in top]
+
+
+def subarray_sum_histogram(arr):
+    """Строит распределение сумм всех n(n+1)/2 подмассивов
+
+    Для массивов с ограниченными значениями (сгенерированные лежат в -10..10) суммы
+    занимают узкий диапазон. С NumPy используется "разделяй и властвуй": суммы внутри
+    блоков по 32 элемента считаются напрямую, а подмассивы, пересекающие середину
+    блока, - свёрткой гистограмм суффиксных сумм левой половины и префиксных сумм
+    правой (БПФ для длинных гистограмм). Это O(R log² n) вместо O(n²), где R - диапазон сумм
+
+    Args:
+        arr (list[int]): Исходный массив целых чисел
+
+    Returns:
+        SumHistogram: Распределение сумм
+
+    Raises:
+        EmptyArrayError: Если входной массив пуст
+        InvalidInputError: Если диапазон сумм слишком широк для построения распределения
+    """
+    if len(arr) == 0:
+        raise EmptyArrayError(Messages.TASK5_EMPTY_ARRAY)
+    low = high = running = 0
+    for num in arr:
+        running += num
+        low = min(low, running)
+        high = max(high, running)
+    span = high - low  # любая сумма подмассива лежит в [-span, span]
+    if 2 * span + 1 > HISTOGRAM_MAX_RANGE:
+        raise InvalidInputError(Messages.TASK5_HISTOGRAM_TOO_LARGE)
+    np = numpy()
+    if np is None:
+        if len(arr) > HISTOGRAM_PYTHON_MAX_LEN:
+            raise InvalidInputError(Messages.TASK5_HISTOGRAM_TOO_LARGE)
+        return _histogram_python(arr, span)
+    return _histogram_numpy(np, _as_int64(np, arr), span)
+
+
+def _histogram_python(arr, span):
+    # перебор всех подмассивов, O(n²)
+    counts = [0] * (2 * span + 1)
+    n = len(arr)
+    for start in range(n):
+        total = 0
+        for end in range(start, n):
+            total += arr[end]
+            counts[total + span] += 1
+    return _trimmed(counts, -span)
+
+
+def _histogram_numpy(np, values, span):
+    n = len(values)
+    prefix = np.empty(n + 1, dtype=np.int64)
+    prefix[0] = 0
+    np.cumsum(values, out=prefix[1:])
+    counts = np.zeros(2 * span + 1, dtype=np.int64)
+
+    def add(sums):
+        # добавляет суммы в гистограмму
+        if len(sums):
+            lo = int(sums.min())
+            binned = np.bincount(sums - lo)
+            counts[lo + span: lo + span + len(binned)] += binned
+
+    # подмассивы внутри блоков длины _HISTOGRAM_LEAF
+    starts = np.arange(n, dtype=np.int64)
+    for length in range(1, min(_HISTOGRAM_LEAF, n) + 1):
+        first = starts[: n - length + 1]
+        inside = first // _HISTOGRAM_LEAF == (first + length - 1) // _HISTOGRAM_LEAF
+        add(prefix[first[inside] + length] - prefix[first[inside]])
+
+    # подмассивы, пересекающие середину блока, - свёрткой по уровням снизу вверх
+    block = _HISTOGRAM_LEAF
+    while block < n:
+        for start in range(0, n - block, 2 * block):
+            mid = start + block
+            end = min(start + 2 * block, n)
+            left = prefix[mid] - prefix[start:mid]  # суммы a[k:mid]
+            right = prefix[mid + 1:end + 1] - prefix[mid]  # суммы a[mid:m+1]
+            left_low, right_low = int(left.min()), int(right.min())
+            crossed = _convolve(np, np.bincount(left - left_low), np.bincount(right - right_low))
+            offset = left_low + right_low + span
+            counts[offset: offset + len(crossed)] += crossed
+        block *= 2
+    return _trimmed(counts.tolist(), -span)
+
+
+def _convolve(np, a, b):
+    # точная свёртка целочисленных гистограмм
+    if min(len(a), len(b)) <= _DIRECT_CONVOLVE_LEN:
+        return np.convolve(a, b)
+    size = len(a) + len(b) - 1
+    fft_size = 1 << (size - 1).bit_length()
+    product = np.fft.rfft(a, fft_size) * np.fft.rfft(b, fft_size)
+    return np.rint(np.fft.irfft(product, fft_size)[:size]).astype(np.int64)
+
+
+def _trimmed(counts, low):
+    # отбрасывает нулевые края гистограммы
+    first = next(i for i, c in enumerate(counts) if c)
+    last = len(counts) - next(i for i, c in enumerate(reversed(counts)) if c)
+    return SumHistogram(low + first, counts[first:last])
+
+
 # FSM через словарь состояний (адаптирован под Telegram)
 
-from .errors import InvalidInputError
+from .cache import data_digest, result_cache
+from .compute import OFFLOAD_THRESHOLD, ComputeRequest
+from .errors import InputFormatError, InvalidInputError
+from .fsm import TaskContext, TaskFSM
 from .messages import Messages
+from .parsing import parse_array, parse_arrays, parse_size
+from .report import Report
+import functools
 import random
 
-class Task5FSM:
+# сколько самых частых сумм показывать в распределении
+HISTOGRAM_TOP = 10
+
+
+class Task5Context(TaskContext):
+    # массив, цель и результат задания 5 (__slots__ - без словаря атрибутов на каждый объект)
+    # index, histogram, counter и digest (хеш arr для общего кэша результатов) - кэш,
+    # построенный по arr; сбрасывается при смене массива
+    __slots__ = ("arr", "target", "result", "index", "histogram", "counter", "digest")
+
+    # кэш не сохраняется вместе с сессией: его дешевле построить заново
+    PERSISTED = ("arr", "target", "result")
+
+    def __init__(self):
+        super().__init__()
+        self.arr = None
+        self.target = None
+        self.result = None
+        self.index = None
+        self.histogram = None
+        self.counter = None
+        self.digest = None
+
+    def set_array(self, arr):
+        # новые данные: кэш по старому массиву больше не действителен
+        self.arr = arr
+        self.result = None
+        self.index = None
+        self.histogram = None
+        self.counter = None
+        self.digest = None
+
+    def append(self, nums):
+        """Добавляет элементы в конец массива
+
+        Потоковый счётчик обновляется за O(1) на элемент; индекс и распределение
+        сумм относятся ко всему массиву и сбрасываются
+        """
+        if self.counter is None or self.counter.target != self.target:
+            self.counter = SubarraySumCounter(self.target, self.arr)
+        self.arr.extend(nums)
+        self.touch()
+        self.counter.extend(nums)
+        self.result = None
+        self.index = None
+        self.histogram = None
+        self.digest = None
+
+
+class Task5FSM(TaskFSM):
     """Конечный автомат для задания 5
 
     Управляет состояниями пользователя в Telegram-боте:
@@ -70,66 +522,43 @@ class Task5FSM:
     - генерация случайных данных
     - выполнение алгоритма
     - показ результата
+    - подсчёт для новых целей на тех же данных
+    - добавление элементов в конец массива без пересчёта с начала
+    - распределение сумм подмассивов
 
     Attributes:
         state (str): Текущее состояние FSM (например, "menu", "input_manual")
-        context (dict): Хранит данные пользователя (массив, цель, результат)
+        context (Task5Context): Хранит данные пользователя (массив, цель, результат)
     """
 
+    __slots__ = ()
+
+    TASK = "task5"
+    MANUAL_PROMPT = Messages.INPUT_MANUAL_TASK5
+
     def __init__(self):
         # инициализирует FSM в состоянии "menu"
         self.state = "menu"
-        self.context = {"arr": None, "target": None, "result": None}
-
-    def handle(self, text):
-        """Обрабатывает текстовое сообщение от пользователя
+        self.context = Task5Context()
 
-        Args:
-            text (str): Текст сообщения (обычно текст кнопки или ввод данных)
+    def _on_target(self):
+        # «Новая цель»: ответ для других целей на тех же данных
+        if self.context.arr is None:
+            self.state = "menu"
+            return Messages.NO_DATA
+        return Messages.INPUT_TARGETS
 
-        Returns:
-            str: Ответное сообщение для отправки пользователю
-        """
-        if self.state == "menu":
-            return self._handle_menu(text)
-        elif self.state == "input_manual":
-            return self._handle_input_manual(text)
-        elif self.state == "input_random":
-            return self._handle_input_random(text)
-        elif self.state == "execute":
-            return self._handle_execute()
-        elif self.state == "show_result":
-            return self._handle_show_result()
-        else:
-            return Messages.UNKNOWN_STATE
-
-    def _handle_menu(self, text):
-        """Обрабатывает выбор действия в главном меню задания 5
+    def _on_append(self):
+        # «Добавить элементы»: дописывание в конец массива
+        if self.context.arr is None:
+            self.state = "menu"
+            return Messages.NO_DATA
+        return Messages.INPUT_APPEND
 
-        Args:
-            text (str): Текст кнопки ("Ввести вручную", "Сгенерировать" и т.д.)
+    def _on_histogram(self):
+        return self._handle_histogram()
 
-        Returns:
-            str: Ответное сообщение
-        """
-        if text == "Ввести вручную":
-            self.state = "input_manual"
-            return Messages.INPUT_MANUAL_TASK5
-        elif text == "Сгенерировать":
-            self.state = "input_random"
-            return Messages.INPUT_RANDOM_SIZE
-        elif text == "Выполнить":
-            self.state = "execute"
-            return self._handle_execute()
-        elif text == "Результат":
-            self.state = "show_result"
-            return self._handle_show_result()
-        elif text == "Назад":
-            return "exit"
-        else:
-            return Messages.PLEASE_USE_BUTTONS
-
-    def _handle_input_manual(self, text):
+    def _input_manual(self, text):
         """Обрабатывает ручной ввод массива и цели
 
         Args:
@@ -139,40 +568,74 @@ class Task5FSM:
             str: Результат обработки или сообщение об ошибке
         """
         try:
-            parts = text.split(";")
-            if len(parts) != 2:
-                return Messages.INVALID_FORMAT
-            arr = list(map(int, parts[0].split()))
-            target = int(parts[1])
+            arr, target = parse_arrays(text, 2)
             if not arr:
                 raise EmptyArrayError(Messages.TASK5_EMPTY_ARRAY)
-            self.context["arr"] = arr
-            self.context["target"] = target
-            self.context["result"] = None
+            if len(target) != 1:
+                raise InvalidInputError(Messages.INVALID_FORMAT)
+            self.context.set_array(arr)
+            self.context.target = target[0]
             self.state = "menu"
             return Messages.DATA_SAVED
+        except InputFormatError:
+            return Messages.INVALID_FORMAT
         except Exception as e:
             self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
 
-    def _handle_input_random(self, text):
+    def load_arrays(self, arrays, caption=None):
+        """Загружает массив (и цель) из файла с данными (см. tasks.parsing.read_file_arrays)
+
+        Цель берётся из файла (после ';' или вторым столбцом), иначе из подписи
+        к файлу, иначе остаётся прежней
+
+        Args:
+            arrays (list[array]): Массив и, возможно, цель из файла
+            caption (str | None): Подпись к файлу
+
+        Returns:
+            str: Результат загрузки или сообщение об ошибке
+        """
+        self.state = "menu"
+        try:
+            arr = arrays[0] if arrays else None
+            if not arr:
+                raise EmptyArrayError(Messages.TASK5_EMPTY_ARRAY)
+            if len(arrays) == 2 and len(arrays[1]) == 1:
+                target = arrays[1][0]
+            elif len(arrays) == 1 and caption and caption.strip():
+                values = parse_array(caption)
+                if len(values) != 1:
+                    raise InvalidInputError(Messages.TASK5_TARGET_REQUIRED)
+                target = values[0]
+            elif len(arrays) == 1 and self.context.target is not None:
+                target = self.context.target
+            else:
+                raise InvalidInputError(Messages.TASK5_TARGET_REQUIRED)
+        except Exception as e:
+            return f"{Messages.INVALID_INPUT}: {e}"
+        self.context.set_array(arr)
+        self.context.target = target
+        return f"{Messages.DOCUMENT_LOADED}{len(arr)}"
+
+    def _input_random(self, text):
         """Обрабатывает ввод размера для генерации случайных данных
 
         Args:
             text (str): Размер массива (целое число)
 
         Returns:
-            str: Результат генерации или сообщение об ошибке
+            str | Report: Сгенерированные данные или сообщение об ошибке
         """
         try:
-            n = int(text)
-            if n <= 0:
-                raise InvalidInputError(Messages.INVALID_INPUT_SIZE)
-            self.context["arr"] = [random.randint(-10, 10) for _ in range(n)]
-            self.context["target"] = random.randint(-5, 10)
-            self.context["result"] = None
+            n = parse_size(text)
+            self.context.set_array([random.randint(-10, 10) for _ in range(n)])
+            self.context.target = random.randint(-5, 10)
             self.state = "menu"
-            return f"{Messages.GENERATED_SUCCESS}\nМассив: {self.context['arr']}\nЦель: {self.context['target']}"
+            return Report(Messages.GENERATED_SUCCESS, [
+                ("Массив: ", self.context.arr),
+                ("Цель: ", self.context.target),
+            ])
         except Exception as e:
             self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
@@ -183,28 +646,122 @@ class Task5FSM:
         Returns:
             str: Результат выполнения или сообщение об ошибке
         """
-        if self.context["arr"] is None or self.context["target"] is None:
+        if self.context.arr is None or self.context.target is None:
             self.state = "menu"
             return Messages.NO_DATA
         try:
-            self.context["result"] = count_subarrays_with_sum(self.context["arr"], self.context["target"])
+            counter = self.context.counter
+            if counter is not None and counter.target == self.context.target:
+                # после добавления элементов ответ уже посчитан потоковым счётчиком
+                self.context.result = counter.count
+            else:
+                # одинаковые массив и цель (повторное выполнение, другой пользователь) не пересчитываются
+                target = self.context.target
+                key = ("task5", self._digest(), target)
+                if (self.context.index is None and len(self.context.arr) >= OFFLOAD_THRESHOLD
+                        and key not in result_cache):
+                    # большой массив без готового индекса считается вне обработчика сообщений (см. tasks.compute)
+                    self.state = "menu"
+                    return ComputeRequest(count_subarrays_with_sum, [self.context.arr], (target,), key=key,
+                                          apply=functools.partial(self._apply_result, key[1], target))
+                self.context.result = result_cache.get_or_compute(key, lambda: self._index().count(target))
             self.state = "menu"
             return Messages.ALGORITHM_DONE
         except Exception as e:
             self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
 
+    def _index(self):
+        # индекс префиксных сумм текущего массива (строится при первом обращении)
+        if self.context.index is None:
+            self.context.index = PrefixSumIndex(self.context.arr)
+        return self.context.index
+
+    def _apply_result(self, digest, target, result):
+        # результат вычисления вне обработчика сохраняется, только если массив и цель за это время не изменились
+        if self.context.digest != digest or self.context.target != target:
+            return Messages.COMPUTE_STALE
+        self.context.result = result
+        return Messages.ALGORITHM_DONE
+
+    def _digest(self):
+        # хеш текущего массива (считается один раз на данные)
+        if self.context.digest is None:
+            self.context.digest = data_digest(self.context.arr)
+        return self.context.digest
+
+    def _input_target(self, text):
+        """Считает подмассивы для одной или нескольких новых целей на тех же данных
+
+        Args:
+            text (str): Цели через пробел
+
+        Returns:
+            str | Report: Количество подмассивов по целям или сообщение об ошибке
+        """
+        self.state = "menu"
+        try:
+            targets = parse_array(text)
+            if not targets:
+                raise InvalidInputError(Messages.INVALID_FORMAT)
+            counts = self._index().count_many(targets)
+        except Exception as e:
+            return f"{Messages.INVALID_INPUT}: {e}"
+        if len(counts) == 1:
+            self.context.target = targets[0]
+            self.context.result = counts[targets[0]]
+            return f"{Messages.TASK5_RESULT_PREFIX}{targets[0]}: {counts[targets[0]]}"
+        return Report(Messages.TASK5_TARGETS_RESULT,
+                      [(f"{target}: ", count) for target, count in counts.items()])
+
+    def _input_append(self, text):
+        """Добавляет введённые элементы в конец текущего массива
+
+        Args:
+            text (str): Элементы через пробел
+
+        Returns:
+            str: Новая длина массива или сообщение об ошибке
+        """
+        self.state = "menu"
+        try:
+            nums = parse_array(text)
+            if not nums:
+                raise EmptyArrayError(Messages.TASK5_EMPTY_ARRAY)
+            self.context.append(nums)
+        except Exception as e:
+            return f"{Messages.INVALID_INPUT}: {e}"
+        return f"{Messages.ELEMENTS_APPENDED}{len(self.context.arr)}"
+
+    def _handle_histogram(self):
+        """Возвращает самые частые суммы подмассивов текущего массива
+
+        Returns:
+            str | Report: Распределение сумм или сообщение об ошибке
+        """
+        if self.context.arr is None:
+            return Messages.NO_DATA
+        try:
+            if self.context.histogram is None:
+                self.context.histogram = subarray_sum_histogram(self.context.arr)
+        except Exception as e:
+            return f"{Messages.INVALID_INPUT}: {e}"
+        histogram = self.context.histogram
+        sections = [(f"{total}: ", count) for total, count in histogram.most_common(HISTOGRAM_TOP)]
+        sections.append((Messages.TASK5_HISTOGRAM_DISTINCT, histogram.distinct()))
+        return Report(Messages.TASK5_HISTOGRAM_HEADER, sections)
+
     def _handle_show_result(self):
         """Возвращает результат выполнения алгоритма
 
         Returns:
             str: Результат или сообщение об ошибке
         """
-        if self.context["result"] is None:
+        if self.context.result is None:
             self.state = "menu"
             return Messages.NOT_EXECUTED
-        result = self.context["result"]
-        target = self.context["target"]
+        result = self.context.result
+        target = self.context.target
         self.state = "menu"
         return f"{Messages.TASK5_RESULT_PREFIX}{target}: {result}"
 
@@ -247,4 +804,23 @@ if __name__ == "__main__":
 
     print(f"\nРезультат для массива из 1000 элементов: {res}")
     print(f"Время выполнения: {end_time - start_time:.6f} секунд")
-    print(f"Пик использования памяти: {peak / 1024:.2f} KB")
\ No newline at end of file
+    print(f"Пик использования памяти: {peak / 1024:.2f} KB")
+
+    # сравнение с векторизованной версией на большом массиве
+    np = numpy()
+    if np is None:
+        print("\nNumPy не установлен - векторизованная версия недоступна")
+    else:
+        big_arr = [random.randint(-10, 10) for _ in range(1_000_000)]
+
+        start_time = time.perf_counter()
+        res_python = _count_subarrays_python(big_arr, 5)
+        python_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        res_numpy = _count_subarrays_numpy(np, big_arr, 5)
+        numpy_time = time.perf_counter() - start_time
+
+        assert res_python == res_numpy
+        print(f"\nМассив из 1 000 000 элементов: {res_numpy}")
+        print(f"Python: {python_time:.3f} с, NumPy: {numpy_time:.3f} с, ускорение x{python_time / numpy_time:.1f}")
\ No newline at end of file
@@ -2,24 +2,41 @@
 
 Реализует алгоритм с использованием функционального программирования и приёмов эффективного кода:
 - Чистая функция без побочных эффектов
-- Использование set для O(1) поиска (вместо list -> O(n))
-- Генераторное выражение для ленивой фильтрации
-- Отсутствие императивных циклов
+- Индекс принадлежности по данным: set, битовая карта или отсортированный массив (вместо list -> O(n))
+- Таблица перевёрнутых чисел вместо int(str(n)[::-1]) для каждого элемента
+- Векторизованный переворот и поиск на NumPy для больших массивов
 - Неизменяемость данных
 
 Алгоритм:
 Для каждого числа в первом массиве проверяется, встречается ли оно или его перевёрнутая версия во втором массиве
-Используется set для эффективного поиска
+Используется индекс для эффективного поиска; число переворачивается, только если его самого во втором массиве нет
 """
 
 from .errors import EmptyArrayError, NegativeNumberError
+from .membership import build_membership_index
 from .messages import Messages
+from .optional import numpy
+from functools import lru_cache, partial
+
+# перевёрнутые числа 0..REVERSE_TABLE_SIZE-1 считаются заранее (сгенерированные данные - 10..999)
+REVERSE_TABLE_SIZE = 10_000
+# сколько перевёрнутых чисел вне таблицы запоминать
+REVERSE_CACHE_SIZE = 65_536
+# начиная с этой длины первого массива используется векторизованная ветка на NumPy
+NUMPY_THRESHOLD = 50_000
+# числа меньше этого предела и их перевёрнутые версии гарантированно помещаются в int64
+_INT64_DIGITS_BOUND = 10 ** 18
+
+_REVERSE_TABLE = [int(str(n)[::-1]) for n in range(REVERSE_TABLE_SIZE)]
 
 # функциональное ядро (чистые, эффективные функции)
 
 def reverse_number(n):
     """Возвращает перевёрнутое число без лидирующих нулей (чистая функция)
 
+    Небольшие числа берутся из заранее посчитанной таблицы, для остальных
+    запоминаются последние результаты (ограниченный кэш)
+
     Args:
         n (int): Исходное неотрицательное целое число
 
@@ -31,14 +48,87 @@ def reverse_number(n):
     """
     if n < 0:
         raise NegativeNumberError(Messages.TASK8_NEGATIVE_NUMBER)
+    if n < REVERSE_TABLE_SIZE:
+        return _REVERSE_TABLE[n]
+    return _reverse_large(n)
+
+
+def _reverse_digits(n):
+    # в CPython перевод int -> str -> int выполняется в C и быстрее цикла divmod по цифрам
     return int(str(n)[::-1])
 
 
+# запоминание для одиночных вызовов; пакетные функции обходят его, чтобы миллион
+# разных чисел не вытеснял кэш впустую
+_reverse_large = lru_cache(maxsize=REVERSE_CACHE_SIZE)(_reverse_digits)
+
+
+def reverse_numbers(values):
+    """Переворачивает все числа массива (векторизованно, если установлен NumPy)
+
+    Args:
+        values (list[int]): Неотрицательные целые числа
+
+    Returns:
+        list[int]: Перевёрнутые числа в том же порядке
+
+    Raises:
+        NegativeNumberError: Если в массиве есть отрицательное число
+    """
+    np = numpy() if len(values) >= NUMPY_THRESHOLD else None
+    if np is not None:
+        array = _as_int64(np, values)
+        if array is not None and len(array) and int(array.max()) < _INT64_DIGITS_BOUND:
+            if int(array.min()) < 0:
+                raise NegativeNumberError(Messages.TASK8_NEGATIVE_NUMBER)
+            return _reverse_numpy(np, array).tolist()
+    if any(x < 0 for x in values):
+        raise NegativeNumberError(Messages.TASK8_NEGATIVE_NUMBER)
+    table = _REVERSE_TABLE
+    return [table[x] if x < REVERSE_TABLE_SIZE else _reverse_digits(x) for x in values]
+
+
+def _int64_buffer(values):
+    # array('q') или memoryview формата "q" (массив в общей памяти, см. offload) - читается без копии
+    return getattr(values, "typecode", None) == "q" or getattr(values, "format", None) == "q"
+
+
+def _as_int64(np, values):
+    # массив NumPy int64 без лишних копий (None, если числа не помещаются в int64)
+    try:
+        if isinstance(values, np.ndarray):
+            return values.astype(np.int64, copy=False)
+        if _int64_buffer(values):
+            return np.frombuffer(values, dtype=np.int64)
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    except (OverflowError, TypeError, ValueError):
+        return None
+
+
+def _reverse_numpy(np, values):
+    # переворот неотрицательных int64 (< 10**18): выборка из таблицы или поразрядно
+    if int(values.max()) < REVERSE_TABLE_SIZE:
+        return np.asarray(_REVERSE_TABLE, dtype=np.int64)[values]
+    rest = values.copy()
+    result = np.zeros_like(values)
+    active = rest > 0
+    while active.any():
+        result[active] = result[active] * 10 + rest[active] % 10
+        rest //= 10
+        active = rest > 0
+    return result
+
+
 def count_common_with_reverse(arr1, arr2):
     """Считает количество общих элементов с учётом перевёрнутых чисел (оптимизированная версия)
 
-    Использует set для O(1) поиска, что соответствует рекомендации из
-    "Приёмы эффективного кода на Python.pdf": "используйте ключевое слово in с set"
+    Для arr2 строится индекс принадлежности, выбранный по данным (см. tasks.membership):
+    небольшой массив - set (O(1) поиск, как в "Приёмы эффективного кода на Python.pdf"),
+    плотный диапазон - битовая карта, разреженный - отсортированный array('q')
+    Большой arr2 так занимает в разы меньше памяти, чем set
+
+    Перевёрнутое число нужно, только если самого числа во втором массиве нет;
+    для больших массивов (с NumPy) проверка и переворот выполняются векторизованно
 
     Args:
         arr1 (list[int]): Первый массив целых чисел (только положительные)
@@ -50,26 +140,75 @@ def count_common_with_reverse(arr1, arr2):
     Raises:
         EmptyArrayError: Если хотя бы один из массивов пуст
     """
-    if not arr1 or not arr2:
+    if len(arr1) == 0 or len(arr2) == 0:
         raise EmptyArrayError(Messages.TASK8_EMPTY_ARRAY)
 
-    # преобразуем arr2 в set для O(1) поиска (вместо O(n) для list)
-    arr2_set = set(arr2)
-
-    # декларативный подсчёт с генераторным выражением
-    return sum(
-        1 for x in arr1
-        if x in arr2_set or reverse_number(x) in arr2_set
-    )
+    index = build_membership_index(arr2)
+
+    if len(arr1) >= NUMPY_THRESHOLD:
+        np = numpy()
+        if np is not None:
+            count = _count_common_numpy(np, arr1, index)
+            if count is not None:
+                return count
+
+    # перевёрнутое число ищем, только если самого числа в arr2 нет
+    found = index.contains_many(arr1)
+    missing = [x for x, hit in zip(arr1, found) if not hit]
+    return len(arr1) - len(missing) + sum(index.contains_many(reverse_numbers(missing)))
+
+
+def _count_common_numpy(np, arr1, index):
+    # векторизованная версия; нужен лишь подсчёт, поэтому порядок элементов arr1
+    # не важен, а поиск отсортированных значений дружелюбен к кэшу
+    first = _as_int64(np, arr1)
+    if first is None or int(first.max()) >= _INT64_DIGITS_BOUND:
+        return None
+    first = np.sort(first)
+    missing = first[~np.asarray(index.contains_many(first), dtype=np.bool_)]
+    if len(missing) == 0:
+        return len(first)
+    if int(missing[0]) < 0:
+        raise NegativeNumberError(Messages.TASK8_NEGATIVE_NUMBER)
+    reversed_missing = np.sort(_reverse_numpy(np, missing))
+    return len(first) - len(missing) + int(np.count_nonzero(index.contains_many(reversed_missing)))
 
 
 # FSM через словарь состояний (адаптирован под Telegram)
 
-from .errors import InvalidInputError
+from .cache import data_digest, result_cache
+from .compute import OFFLOAD_THRESHOLD, ComputeRequest
+from .errors import InputFormatError, InvalidInputError
+from .fsm import TaskContext, TaskFSM
 from .messages import Messages
+from .parsing import parse_arrays, parse_size
+from .report import Report
 import random
 
-class Task8FSM:
+class Task8Context(TaskContext):
+    # массивы и результат задания 8 (__slots__ - без словаря атрибутов на каждый объект)
+    # digest - хеш содержимого массивов для общего кэша результатов; сбрасывается при смене данных
+    __slots__ = ("arr1", "arr2", "result", "digest")
+
+    # хеш не сохраняется вместе с сессией: его дешевле посчитать заново
+    PERSISTED = ("arr1", "arr2", "result")
+
+    def __init__(self):
+        super().__init__()
+        self.arr1 = None
+        self.arr2 = None
+        self.result = None
+        self.digest = None
+
+    def set_arrays(self, arr1, arr2):
+        # новые данные: прежние результат и хеш больше не действительны
+        self.arr1 = arr1
+        self.arr2 = arr2
+        self.result = None
+        self.digest = None
+
+
+class Task8FSM(TaskFSM):
     """Конечный автомат для задания 8
 
     Управляет состояниями пользователя в Telegram-боте:
@@ -81,109 +220,84 @@ class Task8FSM:
 
     Attributes:
         state (str): Текущее состояние FSM (например, "menu", "input_manual")
-        context (dict): Хранит данные пользователя (массивы, результат)
+        context (Task8Context): Хранит данные пользователя (массивы, результат)
     """
 
+    __slots__ = ()
+
+    TASK = "task8"
+    MANUAL_PROMPT = Messages.INPUT_MANUAL_TASK8
+
     def __init__(self):
         # инициализирует FSM в состоянии "menu"
         self.state = "menu"
-        self.context = {"arr1": None, "arr2": None, "result": None}
+        self.context = Task8Context()
 
-    def handle(self, text):
-        """Обрабатывает текстовое сообщение от пользователя
+    def _input_manual(self, text):
+        """Обрабатывает ручной ввод двух массивов
 
         Args:
-            text (str): Текст сообщения (обычно текст кнопки или ввод данных)
+            text (str): Два массива, разделённые ';'
 
         Returns:
-            str: Ответное сообщение для отправки пользователю
+            str: Результат обработки или сообщение об ошибке
         """
-        if self.state == "menu":
-            return self._handle_menu(text)
-        elif self.state == "input_manual":
-            return self._handle_input_manual(text)
-        elif self.state == "input_random":
-            return self._handle_input_random(text)
-        elif self.state == "execute":
-            return self._handle_execute()
-        elif self.state == "show_result":
-            return self._handle_show_result()
-        else:
-            return Messages.UNKNOWN_STATE
-
-    def _handle_menu(self, text):
-        """Обрабатывает выбор действия в главном меню задания 8
+        try:
+            arr1, arr2 = parse_arrays(text, 2, non_negative=True)
+            if not arr1 or not arr2:
+                raise EmptyArrayError(Messages.TASK8_EMPTY_ARRAY)
+            self.context.set_arrays(arr1, arr2)
+            self.state = "menu"
+            return Messages.DATA_SAVED
+        except InputFormatError:
+            return Messages.INVALID_FORMAT
+        except Exception as e:
+            self.state = "menu"
+            return f"{Messages.INVALID_INPUT}: {e}"
 
-        Args:
-            text (str): Текст кнопки ("Ввести вручную", "Сгенерировать" и т.д.)
-
-        Returns:
-            str: Ответное сообщение
-        """
-        if text == "Ввести вручную":
-            self.state = "input_manual"
-            return Messages.INPUT_MANUAL_TASK8
-        elif text == "Сгенерировать":
-            self.state = "input_random"
-            return Messages.INPUT_RANDOM_SIZE
-        elif text == "Выполнить":
-            self.state = "execute"
-            return self._handle_execute()
-        elif text == "Результат":
-            self.state = "show_result"
-            return self._handle_show_result()
-        elif text == "Назад":
-            return "exit"
-        else:
-            return Messages.PLEASE_USE_BUTTONS
-
-    def _handle_input_manual(self, text):
-        """Обрабатывает ручной ввод двух массивов
+    def load_arrays(self, arrays, caption=None):
+        """Загружает массивы из файла с данными (см. tasks.parsing.read_file_arrays)
 
         Args:
-            text (str): Два массива, разделённые ';'
+            arrays (list[array]): Массивы из файла
+            caption (str | None): Подпись к файлу (не используется)
 
         Returns:
-            str: Результат обработки или сообщение об ошибке
+            str: Результат загрузки или сообщение об ошибке
         """
+        self.state = "menu"
         try:
-            parts = text.split(";")
-            if len(parts) != 2:
-                return Messages.INVALID_FORMAT
-            arr1 = list(map(int, parts[0].split()))
-            arr2 = list(map(int, parts[1].split()))
+            if len(arrays) != 2:
+                raise InvalidInputError(f"{Messages.DOCUMENT_ARRAYS_EXPECTED}2")
+            arr1, arr2 = arrays
             if not arr1 or not arr2:
                 raise EmptyArrayError(Messages.TASK8_EMPTY_ARRAY)
-            if any(x < 0 for x in arr1 + arr2):
+            if min(arr1) < 0 or min(arr2) < 0:
                 raise NegativeNumberError(Messages.TASK8_NEGATIVE_NUMBER)
-            self.context["arr1"] = arr1
-            self.context["arr2"] = arr2
-            self.context["result"] = None
-            self.state = "menu"
-            return Messages.DATA_SAVED
         except Exception as e:
-            self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
+        self.context.set_arrays(arr1, arr2)
+        return f"{Messages.DOCUMENT_LOADED}{len(arr1) + len(arr2)}"
 
-    def _handle_input_random(self, text):
+    def _input_random(self, text):
         """Обрабатывает ввод размера для генерации случайных массивов
 
         Args:
             text (str): Размер массивов (целое число)
 
         Returns:
-            str: Результат генерации или сообщение об ошибке
+            str | Report: Сгенерированные данные или сообщение об ошибке
         """
         try:
-            n = int(text)
-            if n <= 0:
-                raise InvalidInputError(Messages.INVALID_INPUT_SIZE)
+            n = parse_size(text)
             # генерируем ТОЛЬКО положительные числа (для корректного reverse)
-            self.context["arr1"] = [random.randint(10, 999) for _ in range(n)]
-            self.context["arr2"] = [random.randint(10, 999) for _ in range(n)]
-            self.context["result"] = None
+            self.context.set_arrays([random.randint(10, 999) for _ in range(n)],
+                                    [random.randint(10, 999) for _ in range(n)])
             self.state = "menu"
-            return f"{Messages.GENERATED_SUCCESS}\nМассив 1: {self.context['arr1']}\nМассив 2: {self.context['arr2']}"
+            return Report(Messages.GENERATED_SUCCESS, [
+                ("Массив 1: ", self.context.arr1),
+                ("Массив 2: ", self.context.arr2),
+            ])
         except Exception as e:
             self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
@@ -194,27 +308,47 @@ class Task8FSM:
         Returns:
             str: Результат выполнения или сообщение об ошибке
         """
-        if self.context["arr1"] is None or self.context["arr2"] is None:
+        if self.context.arr1 is None or self.context.arr2 is None:
             self.state = "menu"
             return Messages.NO_DATA
         try:
-            self.context["result"] = count_common_with_reverse(self.context["arr1"], self.context["arr2"])
+            # одинаковые данные (повторное выполнение, те же данные у другого пользователя) не пересчитываются
+            arr1, arr2 = self.context.arr1, self.context.arr2
+            key = ("task8", self._digest())
             self.state = "menu"
+            if len(arr1) + len(arr2) >= OFFLOAD_THRESHOLD and key not in result_cache:
+                # большие массивы считаются вне обработчика сообщений (см. tasks.compute)
+                return ComputeRequest(count_common_with_reverse, [arr1, arr2], key=key,
+                                      apply=partial(self._apply_result, key[1]))
+            self.context.result = result_cache.get_or_compute(key, lambda: count_common_with_reverse(arr1, arr2))
             return Messages.ALGORITHM_DONE
         except Exception as e:
             self.state = "menu"
             return f"{Messages.INVALID_INPUT}: {e}"
 
+    def _apply_result(self, digest, result):
+        # результат вычисления вне обработчика сохраняется, только если данные за это время не изменились
+        if self.context.digest != digest:
+            return Messages.COMPUTE_STALE
+        self.context.result = result
+        return Messages.ALGORITHM_DONE
+
+    def _digest(self):
+        # хеш текущих массивов (считается один раз на данные)
+        if self.context.digest is None:
+            self.context.digest = data_digest(self.context.arr1, self.context.arr2)
+        return self.context.digest
+
     def _handle_show_result(self):
         """Возвращает результат выполнения алгоритма
 
         Returns:
             str: Результат или сообщение об ошибке
         """
-        if self.context["result"] is None:
+        if self.context.result is None:
             self.state = "menu"
             return Messages.NOT_EXECUTED
-        result = self.context["result"]
+        result = self.context.result
         self.state = "menu"
         return f"{Messages.TASK8_RESULT_PREFIX}{result}"
 
@@ -246,6 +380,18 @@ if __name__ == "__main__":
     except EmptyArrayError:
         print("Поймана ожидаемая ошибка")
 
+    # перевёрнутое число больше int64 (1999999999999999999 -> 9999999999999999991):
+    # векторизованная проверка индекса должна перейти на проверку по одному числу
+    try:
+        big = [1999999999999999999 + i * 10 for i in range(60000)]
+        res = count_common_with_reverse(big, list(range(5000)))
+        assert res == 0
+        res = count_common_with_reverse(big, list(range(5000)) + [9999999999999999991])
+        assert res == 1
+        print("Успешно (числа вне int64):", res)
+    except Exception as e:
+        print("Ошибка:", e)
+
     # тест производительности
     arr1 = list(range(1000, 2000))       # 1000 элементов
     arr2 = list(range(1, 1001))           # 1000 элементов (включая перевёрнутые: 1001 - 1001, но 1200 - 21 и т.д.)
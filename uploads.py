@@ -0,0 +1,84 @@
+"""Приём файлов с данными от пользователей
+
+Документ скачивается с серверов Telegram потоково, блоками по chunk_size байт,
+во временный файл на диске - в памяти не оказывается ни содержимое файла
+целиком, ни его текст одной строкой. Размер проверяется и до скачивания
+(по сведениям Telegram), и во время него. Временный файл удаляется сразу
+после разбора (см. tasks.parsing.read_file_arrays)
+"""
+
+import contextlib
+import logging
+import os
+import tempfile
+import requests
+from telebot import apihelper
+from tasks.errors import InvalidInputError
+from tasks.messages import Messages
+
+# размер блока скачивания, байт
+DOWNLOAD_CHUNK = 1 << 16
+# Bot API не отдаёт ботам файлы больше 20 МБ
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
+
+class DocumentDownloader:
+    """Скачивает документы пользователей во временные файлы
+
+    Attributes:
+        bot (telebot.TeleBot): Бот (для getFile и токена)
+        chunk_size (int): Размер блока скачивания, байт
+        max_size (int): Максимальный размер файла, байт
+        tmp_dir (str | None): Каталог временных файлов
+        timeout (float): Таймаут соединения и чтения, сек
+    """
+
+    def __init__(self, bot, chunk_size=DOWNLOAD_CHUNK, max_size=MAX_UPLOAD_SIZE, tmp_dir=None, timeout=60,
+                 logger=None):
+        self.bot = bot
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.tmp_dir = tmp_dir
+        self.timeout = timeout
+        self._logger = logger or logging.getLogger(__name__)
+
+    @contextlib.contextmanager
+    def download(self, document):
+        """Скачивает документ; путь к временному файлу действителен внутри блока with
+
+        Args:
+            document (telebot.types.Document): Документ из сообщения
+
+        Yields:
+            str: Путь к скачанному файлу
+
+        Raises:
+            InvalidInputError: Если файл больше max_size
+        """
+        self._check_size(document.file_size)
+        file_info = self.bot.get_file(document.file_id)
+        self._check_size(file_info.file_size)
+        suffix = os.path.splitext(document.file_name or "")[1]
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._fetch(file_info.file_path, f)
+            yield path
+        finally:
+            os.remove(path)
+
+    def _fetch(self, file_path, f):
+        url = (apihelper.FILE_URL or "https://api.telegram.org/file/bot{0}/{1}").format(self.bot.token, file_path)
+        with requests.get(url, stream=True, timeout=self.timeout, proxies=apihelper.proxy) as response:
+            if response.status_code != 200:
+                raise apihelper.ApiHTTPException("Download file", response)
+            size = 0
+            for chunk in response.iter_content(self.chunk_size):
+                size += len(chunk)
+                self._check_size(size)
+                f.write(chunk)
+        self._logger.debug(f"Скачан файл {file_path}: {size} байт")
+
+    def _check_size(self, size):
+        if size and size > self.max_size:
+            raise InvalidInputError(f"{Messages.DOCUMENT_TOO_LARGE}{self.max_size // (1024 * 1024)}")
@@ -0,0 +1,229 @@
+"""Приём обновлений через webhook вместо long polling
+
+Telegram сам отправляет каждое обновление POST-запросом на адрес бота, поэтому
+не нужен цикл getUpdates и ожидание очередного опроса:
+- WebhookServer - встроенный HTTP-сервер (ThreadingHTTPServer); проверяет
+  секрет из заголовка X-Telegram-Bot-Api-Secret-Token (передаётся Telegram
+  в setWebhook) и сразу отвечает 200, не дожидаясь обработки
+- Тело запроса кладётся в ограниченную очередь; один поток-диспетчер разбирает
+  накопившиеся обновления и передаёт их пачкой в bot.process_new_updates,
+  откуда они, как и при опросе, попадают в очереди пользователей
+  (executor.UserOrderedExecutor) - порядок сообщений пользователя сохраняется
+- Очередь переполнена - ответ 503: Telegram повторит доставку позже
+- Без запросов сервер и диспетчер только ждут (select и queue.get) и
+  процессор не расходуют
+
+Telegram принимает webhook только по HTTPS (порты 443, 80, 88, 8443): сервер
+либо стоит за обратным прокси, который снимает TLS, либо получает certfile и
+keyfile; самоподписанный сертификат передаётся в setWebhook (set_webhook)
+
+Пример:
+    server = WebhookServer(bot, port=8443, secret_token=secrets.token_urlsafe(32))
+    server.set_webhook("https://bot.example.com:8443/telegram")
+    server.serve_forever()
+"""
+
+import hmac
+import json
+import logging
+import queue
+import ssl
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from telebot.types import Update
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# обновления, которые обрабатывает бот: сообщения (в том числе файлы) и нажатия inline-кнопок
+ALLOWED_UPDATES = ["message", "callback_query"]
+# больше этого Telegram не присылает (сообщение - до 4096 символов, файлы - ссылкой)
+MAX_BODY_SIZE = 1024 * 1024
+
+# маркер остановки диспетчера
+_STOP = object()
+
+
+class WebhookServer:
+    """HTTP-сервер для обновлений Telegram
+
+    Attributes:
+        bot (telebot.TeleBot): Бот, которому передаются обновления
+        path (str): Путь, на который Telegram отправляет обновления
+        secret_token (str | None): Ожидаемое значение заголовка X-Telegram-Bot-Api-Secret-Token
+            (None - не проверять, только за доверенным прокси)
+        batch_size (int): Сколько обновлений диспетчер передаёт боту за раз
+        received (int): Принято обновлений
+        rejected (int): Отклонено из-за переполнения очереди
+        unauthorized (int): Запросов с неверным секретом
+    """
+
+    def __init__(self, bot, host="0.0.0.0", port=8443, path="/telegram", secret_token=None, queue_size=1024,
+                 batch_size=100, certfile=None, keyfile=None, logger=None):
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self.batch_size = batch_size
+        self.received = 0
+        self.rejected = 0
+        self.unauthorized = 0
+        self._certfile = certfile
+        self._logger = logger or logging.getLogger(__name__)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            # рукопожатие - в потоке запроса, а не в потоке, принимающем соединения
+            self._server.socket = context.wrap_socket(
+                self._server.socket, server_side=True, do_handshake_on_connect=False,
+            )
+        self._server_thread = None
+        self._dispatcher = threading.Thread(target=self._dispatch, name="webhook-dispatch", daemon=True)
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def pending(self):
+        # обновлений, ожидающих передачи боту
+        return self._queue.qsize()
+
+    def set_webhook(self, url, max_connections=40, drop_pending_updates=False):
+        """Регистрирует адрес в Telegram (setWebhook) вместе с секретом
+
+        Args:
+            url (str): Публичный HTTPS-адрес, ведущий на path этого сервера
+            max_connections (int): Одновременных соединений со стороны Telegram (1-100)
+            drop_pending_updates (bool): Отбросить обновления, накопившиеся до вызова
+
+        Returns:
+            bool: Ответ Bot API
+        """
+        certificate = open(self._certfile, "rb") if self._certfile else None
+        try:
+            return self.bot.set_webhook(
+                url=url, certificate=certificate, max_connections=max_connections,
+                allowed_updates=ALLOWED_UPDATES, drop_pending_updates=drop_pending_updates,
+                secret_token=self.secret_token,
+            )
+        finally:
+            if certificate is not None:
+                certificate.close()
+
+    def start(self):
+        # сервер и диспетчер в фоновых потоках
+        self._dispatcher.start()
+        self._server_thread = threading.Thread(target=self._server.serve_forever, name="webhook", daemon=True)
+        self._server_thread.start()
+        self._log_started()
+        return self
+
+    def serve_forever(self):
+        # диспетчер в фоне, сервер - в текущем потоке (до shutdown или KeyboardInterrupt)
+        self._dispatcher.start()
+        self._server_thread = threading.current_thread()
+        self._log_started()
+        self._server.serve_forever()
+
+    def shutdown(self):
+        # перестаёт принимать запросы и передаёт боту всё, что уже принято
+        # serve_forever, прерванный в этом же потоке (KeyboardInterrupt), уже завершился
+        if self._server_thread is not None and self._server_thread is not threading.current_thread():
+            self._server.shutdown()
+        self._server.server_close()
+        if self._dispatcher.is_alive():
+            self._queue.put(_STOP)
+            self._dispatcher.join()
+
+    def submit(self, body):
+        """Ставит тело запроса в очередь диспетчера
+
+        Returns:
+            bool: False, если очередь переполнена
+        """
+        try:
+            self._queue.put_nowait(body)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.received += 1
+        return True
+
+    def check_secret(self, value):
+        if self.secret_token is None:
+            return True
+        if value is not None and hmac.compare_digest(value.encode("utf-8"), self.secret_token.encode("utf-8")):
+            return True
+        with self._lock:
+            self.unauthorized += 1
+        return False
+
+    def _log_started(self):
+        host, port = self.address
+        self._logger.debug(f"Webhook принимает обновления на {host}:{port}{self.path}")
+
+    def _dispatch(self):
+        # разбирает накопившиеся обновления и передаёт их боту пачкой
+        while True:
+            bodies = [self._queue.get()]
+            while len(bodies) < self.batch_size:
+                try:
+                    bodies.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(body is _STOP for body in bodies)
+            updates = []
+            for body in bodies:
+                if body is _STOP:
+                    continue
+                try:
+                    updates.append(Update.de_json(json.loads(body)))
+                except (ValueError, TypeError, KeyError) as e:
+                    self._logger.warning(f"Некорректное обновление webhook: {e}")
+            if updates:
+                try:
+                    self.bot.process_new_updates(updates)
+                except Exception as e:
+                    self._logger.error(f"Ошибка обработки обновлений webhook: {e}", exc_info=True)
+            if stop:
+                return
+
+
+def _handler(server):
+    # класс обработчика запросов, привязанный к экземпляру WebhookServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Telegram переиспользует соединения
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_SIZE:
+                self.close_connection = True
+                self._reply(413)
+                return
+            body = self.rfile.read(length) if length else b""
+            if self.path.split("?", 1)[0] != server.path:
+                self._reply(404)
+            elif not server.check_secret(self.headers.get(SECRET_HEADER)):
+                self._reply(403)
+            elif not body:
+                self._reply(400)
+            elif not server.submit(body):
+                self._reply(503, retry_after=1)
+            else:
+                self._reply(200)
+
+        def _reply(self, status, retry_after=None):
+            self.send_response(status)
+            if retry_after is not None:
+                self.send_header("Retry-After", str(retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass  # каждое обновление в журнал бота не пишем
+
+    return Handler